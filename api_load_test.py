@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Load Test for the Bank Management System HTTP API
+Drives api_server.py with many concurrent keep-alive clients and reports
+throughput and latency percentiles
+
+Each client holds one connection and sends its requests back to back, cycling
+through the request mix. Read-only by default; --deposit-account adds small
+deposits to that account to exercise the write path.
+
+Usage:
+    python api_load_test.py --clients 50 --requests 200 --account 123456789012
+    python api_load_test.py --path /loans?limit=20 --path /customers?search=ra
+"""
+
+from collections import Counter
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+
+class Client:
+    """One keep-alive HTTP connection to the API"""
+    
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+    
+    async def request(self, method, path, body=None):
+        """
+        Send one request and read the whole response
+        Returns:
+            int: HTTP status
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        
+        payload = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n".encode('latin-1')
+            + payload
+        )
+        await self.writer.drain()
+        
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        status = int(status_line.split()[1])
+        
+        length = 0
+        keep_alive = True
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+            elif name.strip().lower() == 'connection':
+                keep_alive = value.strip().lower() != 'close'
+        await self.reader.readexactly(length)
+        
+        if not keep_alive:
+            self.close()
+        return status
+    
+    def close(self):
+        """Drop the connection; the next request reconnects"""
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def build_mix(args):
+    """List of (method, path, body) requests the clients cycle through"""
+    mix = [('GET', '/health', None)]
+    if args.account:
+        mix += [('GET', f'/accounts/{args.account}', None),
+                ('GET', f'/accounts/{args.account}/transactions?limit=20', None)]
+    if args.deposit_account:
+        mix.append(('POST', '/transactions', {'type': 'DEPOSIT', 'account_number': args.deposit_account,
+                                              'amount': 1, 'description': 'Load test'}))
+    mix += [('GET', path, None) for path in args.path or []]
+    return mix
+
+
+async def run_client(client_number, args, mix, latencies, statuses):
+    """Send this client's share of the requests"""
+    client = Client(args.host, args.port)
+    try:
+        for i in range(args.requests):
+            method, path, body = mix[(client_number + i) % len(mix)]
+            started = time.perf_counter()
+            try:
+                status = await client.request(method, path, body)
+            except (ConnectionError, asyncio.IncompleteReadError, OSError) as e:
+                client.close()
+                status = type(e).__name__
+            latencies[f"{method} {path.split('?')[0]}"].append((time.perf_counter() - started) * 1000)
+            statuses[status] += 1
+    finally:
+        client.close()
+
+
+def percentile(values, fraction):
+    """Value at a fraction of a sorted list"""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def load_test(args):
+    """Run all clients at once and print the results"""
+    mix = build_mix(args)
+    latencies = {f"{method} {path.split('?')[0]}": [] for method, path, _ in mix}
+    statuses = Counter()
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client(n, args, mix, latencies, statuses) for n in range(args.clients)))
+    elapsed = time.perf_counter() - started
+    
+    total = sum(statuses.values())
+    print(f"Clients:    {args.clients}")
+    print(f"Requests:   {total:,}")
+    print(f"Elapsed:    {elapsed:.2f}s")
+    print(f"Throughput: {total / elapsed:,.1f} req/s")
+    print(f"Statuses:   {', '.join(f'{k}: {v:,}' for k, v in sorted(statuses.items(), key=str))}")
+    print()
+    print(f"{'Route':<45} {'Count':>7} {'Mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'Max':>8}")
+    for route, values in latencies.items():
+        if not values:
+            continue
+        values.sort()
+        print(f"{route:<45} {len(values):>7,} {statistics.fmean(values):>8.1f} {percentile(values, 0.5):>8.1f} "
+              f"{percentile(values, 0.95):>8.1f} {percentile(values, 0.99):>8.1f} {values[-1]:>8.1f}")
+    print("(latencies in ms)")
+    
+    return 0 if all(isinstance(s, int) and s < 500 for s in statuses) else 1
+
+
+def main():
+    """Command line entry point for the load test"""
+    parser = argparse.ArgumentParser(description='Concurrent load test for api_server.py')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--clients', type=int, default=20, help='Concurrent connections')
+    parser.add_argument('--requests', type=int, default=100, help='Requests per client')
+    parser.add_argument('--account', help='Account number for the account read requests')
+    parser.add_argument('--deposit-account', help='Also post 1.00 deposits to this account')
+    parser.add_argument('--path', action='append', help='Extra GET path to include (repeatable)')
+    args = parser.parse_args()
+    
+    return asyncio.run(load_test(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
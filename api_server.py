@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+"""
+Bank Management System - HTTP API Server
+Serves accounts, customers, transactions and loans as JSON on a local port
+
+One asyncio event loop accepts connections and parses requests. Model calls
+block, so they run on a bounded thread pool no larger than the shared
+connection pool, and each call leases a pooled connection for its duration.
+Every client shares one process and one pool.
+
+With --shards, postings go through a PostingDispatcher instead: the worker
+thread queues the posting and waits, and postings to the same hot account are
+coalesced into one locked batch.
+
+Usage:
+    python api_server.py --port 8765 --workers 10
+    python api_server.py --workers 6 --shards 4
+
+Endpoints:
+    GET  /health
+    GET  /metrics
+    GET  /accounts/{account_number}
+    GET  /accounts/{account_number}/transactions?limit=100
+    PUT  /accounts/{account_number}/status         {"status": "INACTIVE"}
+    GET  /customers?search=term
+    GET  /customers/{customer_id}
+    GET  /customers/{customer_id}/loans
+    POST /customers                                {"first_name", "last_name", "phone", ...}
+    POST /transactions                             {"type", "account_number", "amount",
+                                                    "to_account_number", "description",
+                                                    "idempotency_key"}
+    GET  /loans?status=&loan_type=&branch_id=&limit=50&after=
+    GET  /loans/{loan_id}
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs, unquote
+import argparse
+import asyncio
+import json
+import logging
+import re
+import time
+
+from mysql.connector import Error
+from models.database import DatabaseConnection, get_pooled_connection
+from utils.constants import DB_SETTINGS, MAX_TRANSACTION_AMOUNT
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+REQUEST_TIMEOUT = 30
+KEEPALIVE_TIMEOUT = 15
+ACCOUNT_STATUSES = ('ACTIVE', 'INACTIVE', 'CLOSED', 'FROZEN')
+
+# Set by ApiServer.serve when postings go through shard queues
+posting_dispatcher = None
+
+
+class ApiError(Exception):
+    """Error returned to the client with an HTTP status"""
+    
+    def __init__(self, status, message):
+        self.status = status
+        self.message = message
+        super().__init__(message)
+
+
+def _json_default(value):
+    """Money stays exact as a string; dates use ISO format"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+@contextmanager
+def leased(model_class):
+    """
+    Model instance bound to a pooled connection for one call
+    Models that use self.connection and models that use self.db both get the
+    leased connection, and it goes back to the pool afterwards. Only model
+    methods that leave closing to their caller may be used through a lease
+    """
+    connection = get_pooled_connection()
+    model = model_class()
+    model.connection = connection
+    db = DatabaseConnection()
+    db.connection = connection
+    db.cursor = connection.cursor(dictionary=True)
+    model.db = db
+    try:
+        yield model
+    finally:
+        db.cursor.close()
+        model.connection = None
+        db.connection = None
+        connection.close()
+
+
+class RequestMetrics:
+    """Request counts and latency per route, safe to update from the event loop"""
+    
+    def __init__(self, window=1000):
+        self.window = window
+        self.started = time.time()
+        self.routes = {}
+        self.in_flight = 0
+    
+    def record(self, route, status, elapsed):
+        """Add one finished request"""
+        stats = self.routes.setdefault(route, {
+            'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'recent': deque(maxlen=self.window)
+        })
+        elapsed_ms = elapsed * 1000
+        stats['count'] += 1
+        stats['errors'] += status >= 500
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+        stats['recent'].append(elapsed_ms)
+    
+    def snapshot(self):
+        """Metrics as a JSON-ready dict, with percentiles over the recent window"""
+        routes = {}
+        for route, stats in sorted(self.routes.items()):
+            recent = sorted(stats['recent'])
+            routes[route] = {
+                'count': stats['count'],
+                'errors': stats['errors'],
+                'mean_ms': round(stats['total_ms'] / stats['count'], 2),
+                'p50_ms': round(recent[len(recent) // 2], 2),
+                'p95_ms': round(recent[min(len(recent) - 1, int(len(recent) * 0.95))], 2),
+                'p99_ms': round(recent[min(len(recent) - 1, int(len(recent) * 0.99))], 2),
+                'max_ms': round(stats['max_ms'], 2)
+            }
+        return {
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'in_flight': self.in_flight,
+            'requests': sum(s['count'] for s in self.routes.values()),
+            'routes': routes
+        }
+
+
+# Handlers run on the worker threads: (params, query, body) -> JSON-ready result
+
+def _int(value, name):
+    """Parse an integer path or query parameter"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+
+
+def _account_id(account, account_number):
+    """Resolve an account number or fail with 404"""
+    account_id = account.get_account_ids([account_number]).get(account_number)
+    if account_id is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Account {account_number} not found")
+    return account_id
+
+
+def get_account(params, query, body):
+    """Account details by account number"""
+    from models.account import Account
+    with leased(Account) as account:
+        result = account.get_account_by_number(params['account_number'])
+    if not result:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Account {params['account_number']} not found")
+    return result
+
+
+def get_account_transactions(params, query, body):
+    """Latest transactions of an account"""
+    from models.account import Account
+    from models.transaction import Transaction
+    limit = min(_int(query.get('limit', 100), 'limit'), 1000)
+    with leased(Account) as account:
+        account_id = _account_id(account, params['account_number'])
+    with leased(Transaction) as transaction:
+        return transaction.get_account_transactions(account_id, limit)
+
+
+def set_account_status(params, query, body):
+    """Change an account status"""
+    from models.account import Account
+    status = str(body.get('status', '')).upper()
+    if status not in ACCOUNT_STATUSES:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"status must be one of {', '.join(ACCOUNT_STATUSES)}")
+    with leased(Account) as account:
+        account_id = _account_id(account, params['account_number'])
+    # update_statuses takes its own pooled connection
+    summary = Account().update_statuses([(account_id, status)])
+    if not summary['results'][0]['success']:
+        raise ApiError(HTTPStatus.INTERNAL_SERVER_ERROR, summary['results'][0]['message'])
+    return {'account_number': params['account_number'], 'status': status}
+
+
+def search_customers(params, query, body):
+    """Customers matching a name, phone, email or customer number"""
+    from models.customer import Customer
+    search = query.get('search', '').strip()
+    if len(search) < 2:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "search must be at least 2 characters")
+    with leased(Customer) as customer:
+        return customer.search_customers(search)
+
+
+def get_customer(params, query, body):
+    """Customer details by ID"""
+    from models.customer import Customer
+    with leased(Customer) as customer:
+        result = customer.get_customer_by_id(_int(params['customer_id'], 'customer_id'))
+    if not result:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Customer {params['customer_id']} not found")
+    return result
+
+
+def get_customer_loans(params, query, body):
+    """Loans of a customer"""
+    from models.loan import Loan
+    with leased(Loan) as loan:
+        return loan.get_customer_loans(_int(params['customer_id'], 'customer_id'))
+
+
+def create_customer(params, query, body):
+    """Create a customer"""
+    from models.customer import Customer
+    missing = [f for f in ('first_name', 'last_name', 'phone') if not body.get(f)]
+    if missing:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Missing {', '.join(missing)}")
+    with leased(Customer) as customer:
+        customer_number = customer.create_customer(dict(body))
+    return {'customer_number': customer_number}
+
+
+def post_transaction(params, query, body):
+    """Post a deposit, withdrawal or transfer"""
+    from models.account import Account
+    from models.transaction import Transaction
+    op_type = str(body.get('type', '')).upper()
+    if op_type not in ('DEPOSIT', 'WITHDRAWAL', 'TRANSFER'):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "type must be DEPOSIT, WITHDRAWAL or TRANSFER")
+    try:
+        amount = float(body['amount'])
+    except (KeyError, TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "amount must be a number")
+    if not 0 < amount <= MAX_TRANSACTION_AMOUNT:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"amount must be positive and at most {MAX_TRANSACTION_AMOUNT:,.2f}")
+    
+    with leased(Account) as account:
+        account_id = _account_id(account, str(body.get('account_number', '')))
+        to_account_id = None
+        if op_type == 'TRANSFER':
+            to_account_id = _account_id(account, str(body.get('to_account_number', '')))
+    
+    description = body.get('description')
+    # Clients retrying after a timeout send the same key so the transaction posts once
+    key = body.get('idempotency_key')
+    if posting_dispatcher is not None:
+        result = posting_dispatcher.post({
+            'type': op_type, 'account_id': account_id, 'to_account_id': to_account_id, 'amount': amount,
+            'description': description, 'idempotency_key': key
+        })
+        if not result['success']:
+            raise ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, result['message'])
+        return result
+    
+    with leased(Transaction) as transaction:
+        if op_type == 'DEPOSIT':
+            result = transaction.deposit(account_id, amount, description or "Deposit", idempotency_key=key)
+        elif op_type == 'WITHDRAWAL':
+            result = transaction.withdraw(account_id, amount, description or "Withdrawal", idempotency_key=key)
+        else:
+            result = transaction.transfer(account_id, to_account_id, amount, description or "Fund Transfer",
+                                          idempotency_key=key)
+    
+    if not result['success']:
+        raise ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, result['message'])
+    return result
+
+
+def list_loans(params, query, body):
+    """One page of loans, newest first; pass next_cursor back as after"""
+    from models.loan import Loan
+    after = None
+    if query.get('after'):
+        # Cursor is "<application_date>,<loan_id>" from the previous page
+        try:
+            after_date, after_id = query['after'].split(',')
+            after = (date.fromisoformat(after_date[:10]), int(after_id))
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "after must be <application_date>,<loan_id>")
+    with leased(Loan) as loan:
+        page = loan.list_loans(
+            status=query.get('status'), loan_type=query.get('loan_type'),
+            branch_id=_int(query['branch_id'], 'branch_id') if query.get('branch_id') else None,
+            after=after, limit=min(_int(query.get('limit', 50), 'limit'), 500)
+        )
+    next_cursor = page['next_cursor']
+    return {
+        'loans': page['loans'],
+        'next_cursor': f"{_json_default(next_cursor[0])},{next_cursor[1]}" if next_cursor else None
+    }
+
+
+def get_loan(params, query, body):
+    """Loan details by ID"""
+    from models.loan import Loan
+    with leased(Loan) as loan:
+        result = loan.get_loan_by_id(_int(params['loan_id'], 'loan_id'))
+    if not result:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Loan {params['loan_id']} not found")
+    return result
+
+
+ROUTES = [
+    ('GET', '/accounts/{account_number}', get_account),
+    ('GET', '/accounts/{account_number}/transactions', get_account_transactions),
+    ('PUT', '/accounts/{account_number}/status', set_account_status),
+    ('GET', '/customers', search_customers),
+    ('POST', '/customers', create_customer),
+    ('GET', '/customers/{customer_id}', get_customer),
+    ('GET', '/customers/{customer_id}/loans', get_customer_loans),
+    ('POST', '/transactions', post_transaction),
+    ('GET', '/loans', list_loans),
+    ('GET', '/loans/{loan_id}', get_loan)
+]
+
+
+def compile_routes(routes):
+    """Turn '/accounts/{account_number}' patterns into regular expressions"""
+    compiled = []
+    for method, pattern, handler in routes:
+        regex = re.sub(r'\{(\w+)\}', r'(?P<\1>[^/]+)', pattern)
+        compiled.append((method, pattern, re.compile(f'^{regex}$'), handler))
+    return compiled
+
+
+class ApiServer:
+    """
+    Asyncio HTTP/1.1 server that dispatches JSON requests to model calls
+    Keep-alive connections are supported; each request body must carry a
+    Content-Length (chunked uploads are not accepted)
+    """
+    
+    def __init__(self, host='127.0.0.1', port=8765, workers=None, request_timeout=REQUEST_TIMEOUT, shards=0):
+        self.host = host
+        self.port = port
+        # More workers than pooled connections would only fail with pool exhausted errors;
+        # each posting shard also holds a connection while it posts
+        self.shards = min(shards, DB_SETTINGS['CONNECTION_POOL_SIZE'] - 1)
+        self.workers = min(workers or DB_SETTINGS['CONNECTION_POOL_SIZE'],
+                           DB_SETTINGS['CONNECTION_POOL_SIZE'] - self.shards)
+        self.request_timeout = request_timeout
+        self.routes = compile_routes(ROUTES)
+        self.metrics = RequestMetrics()
+        self.executor = None
+        self.dispatcher = None
+        self.server = None
+    
+    def match(self, method, path):
+        """
+        Find the handler for a request
+        Returns:
+            tuple: (route pattern, handler, path parameters)
+        """
+        allowed = False
+        for route_method, pattern, regex, handler in self.routes:
+            found = regex.match(path)
+            if found:
+                if route_method == method:
+                    return pattern, handler, {k: unquote(v) for k, v in found.groupdict().items()}
+                allowed = True
+        if allowed:
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}")
+        raise ApiError(HTTPStatus.NOT_FOUND, f"No route for {path}")
+    
+    async def dispatch(self, method, target, body):
+        """
+        Run one request
+        Returns:
+            tuple: (route for metrics, HTTP status, JSON-ready payload)
+        """
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        # Unknown paths share one metrics entry so clients cannot grow the table
+        route = f"{method} (unmatched)"
+        try:
+            if method == 'GET' and path in ('/health', '/metrics'):
+                route = f"GET {path}"
+                if path == '/health':
+                    return route, HTTPStatus.OK, {'status': 'ok', 'workers': self.workers}
+                snapshot = self.metrics.snapshot()
+                from models.fraud_screen import fraud_screen
+                snapshot['fraud_screen'] = fraud_screen.metrics()
+                if self.dispatcher is not None:
+                    snapshot['posting'] = self.dispatcher.metrics()
+                return route, HTTPStatus.OK, snapshot
+            
+            route, handler, params = self.match(method, path)
+            route = f"{method} {route}"
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                payload = json.loads(body) if body else {}
+            except ValueError:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "Body is not valid JSON")
+            if not isinstance(payload, dict):
+                raise ApiError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+            
+            loop = asyncio.get_running_loop()
+            result = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, handler, params, query, payload),
+                self.request_timeout
+            )
+            status = HTTPStatus.CREATED if method == 'POST' else HTTPStatus.OK
+            return route, status, result
+        
+        except ApiError as e:
+            return route, e.status, {'error': e.message}
+        except asyncio.TimeoutError:
+            # The worker keeps running; only the client stops waiting
+            return route, HTTPStatus.GATEWAY_TIMEOUT, {'error': f"Request took longer than {self.request_timeout}s"}
+        except Error as e:
+            logger.error(f"Database error on {method} {path}: {e}")
+            return route, HTTPStatus.SERVICE_UNAVAILABLE, {'error': f"Database error: {e}"}
+        except Exception as e:
+            logger.exception(f"Unhandled error on {method} {path}")
+            return route, HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+    
+    async def read_request(self, reader):
+        """
+        Read one request off a connection
+        Returns:
+            tuple: (method, target, version, headers, body), or None when the client is done
+        """
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+        if not request_line.strip():
+            return None
+        
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        
+        length = _int(headers.get('content-length', 0), 'Content-Length')
+        if length > MAX_BODY_BYTES:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, version, headers, body
+    
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one client connection until it closes"""
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    request = await self.read_request(reader)
+                except ApiError as e:
+                    self.write_response(writer, e.status, {'error': e.message}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                
+                method, target, version, headers, body = request
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              if version == 'HTTP/1.1' else headers.get('connection', '').lower() == 'keep-alive')
+                
+                self.metrics.in_flight += 1
+                try:
+                    route, status, payload = await self.dispatch(method, target, body)
+                finally:
+                    self.metrics.in_flight -= 1
+                
+                self.write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                elapsed = time.perf_counter() - started
+                self.metrics.record(route, int(status), elapsed)
+                logger.debug(f"{method} {target} {int(status)} {elapsed * 1000:.1f}ms")
+                
+                if not keep_alive:
+                    break
+        
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    def write_response(self, writer, status, payload, keep_alive):
+        """Write a JSON response"""
+        status = HTTPStatus(status)
+        body = json.dumps(payload, default=_json_default).encode('utf-8')
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+    
+    async def serve(self, stop_event=None):
+        """Accept connections until cancelled or stop_event is set"""
+        global posting_dispatcher
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='api-worker')
+        if self.shards > 0:
+            from models.posting_dispatcher import PostingDispatcher
+            self.dispatcher = posting_dispatcher = PostingDispatcher(shards=self.shards)
+            self.dispatcher.start()
+        # Daily limit totals load with one query now instead of on the first posting
+        from models.daily_limits import daily_limits
+        await asyncio.get_running_loop().run_in_executor(self.executor, daily_limits.warm)
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        logger.info(f"API listening on http://{self.host}:{self.port} with {self.workers} workers")
+        try:
+            async with self.server:
+                if stop_event is None:
+                    await self.server.serve_forever()
+                else:
+                    await stop_event.wait()
+        finally:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            if self.dispatcher is not None:
+                self.dispatcher.stop()
+                posting_dispatcher = None
+            logger.info("API server stopped")
+
+
+def main():
+    """Command line entry point for the API server"""
+    parser = argparse.ArgumentParser(description='Local JSON HTTP API over the bank models')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to bind (default: localhost only)')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=DB_SETTINGS['CONNECTION_POOL_SIZE'],
+                        help='Concurrent model calls, at most the connection pool size')
+    parser.add_argument('--shards', type=int, default=0,
+                        help='Post transactions through this many account shard queues (default: direct)')
+    parser.add_argument('--fraud-rules', help='JSON file of fraud screening rules (default: built-in rules)')
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT, help='Seconds before a request gets 504')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(threadName)s - %(message)s')
+    
+    if args.fraud_rules:
+        from models.fraud_screen import fraud_screen, load_rules
+        try:
+            fraud_screen.configure(load_rules(args.fraud_rules))
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    
+    server = ApiServer(args.host, args.port, args.workers, args.timeout, args.shards)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Bank Management System - Command Line Interface
+Runs single and bulk operations against the database without starting the GUI
+
+Input files are CSV with a header row, or JSON lines (.jsonl), and are read as a
+stream in chunks, so file size is bounded only by disk. Use - to read stdin.
+
+Usage:
+    python bank_cli.py deposit 123456789012 5000 --description "Cash deposit"
+    python bank_cli.py transfer 123456789012 210987654321 1500
+    python bank_cli.py status 123456789012 INACTIVE
+    python bank_cli.py post transactions.csv --rejects rejected.csv
+    python bank_cli.py statuses dormant.csv
+    python bank_cli.py import-customers customers.jsonl --batch-size 1000
+
+Columns:
+    post              type, account_number, amount [, to_account_number, description, reference,
+                      idempotency_key]
+    statuses          account_number, status
+    import-customers  first_name, last_name, phone [, any other customers column]
+"""
+
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_STATUSES = ('ACTIVE', 'INACTIVE', 'CLOSED', 'FROZEN')
+REQUIRED_CUSTOMER_FIELDS = ('first_name', 'last_name', 'phone')
+
+
+def read_rows(path, file_format=None):
+    """
+    Yield (line_number, row) pairs from a CSV or JSON lines file without loading it
+    Args:
+        path (str): File path, or - for stdin
+        file_format (str): csv or jsonl; guessed from the extension when None
+    """
+    if file_format is None:
+        file_format = 'jsonl' if path.endswith(('.jsonl', '.json')) else 'csv'
+    
+    stream = sys.stdin if path == '-' else open(path, 'r', newline='', encoding='utf-8')
+    try:
+        if file_format == 'jsonl':
+            for line_number, line in enumerate(stream, start=1):
+                if line.strip():
+                    yield line_number, json.loads(line)
+        else:
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, {k.strip(): (v.strip() if isinstance(v, str) else v)
+                                        for k, v in row.items() if k}
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def chunked(rows, size):
+    """Yield lists of up to size items from an iterator"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BulkRun:
+    """Counts rows through a bulk command, writes rejects and reports throughput"""
+    
+    def __init__(self, name, rejects_path=None, quiet=False):
+        self.name = name
+        self.quiet = quiet
+        self.rows = 0
+        self.ok = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self.rejects_file = None
+        self.rejects = None
+        if rejects_path:
+            self.rejects_file = open(rejects_path, 'w', newline='', encoding='utf-8')
+            self.rejects = csv.writer(self.rejects_file)
+            self.rejects.writerow(['line', 'message', 'row'])
+    
+    def record(self, line_number, row, success, message=None):
+        """Count one processed row, keeping it in the rejects file if it failed"""
+        self.rows += 1
+        if success:
+            self.ok += 1
+            return
+        self.failed += 1
+        if self.rejects:
+            self.rejects.writerow([line_number, message, json.dumps(row, default=str)])
+        else:
+            logger.warning(f"Line {line_number}: {message}")
+    
+    def progress(self):
+        """Print a running total after each chunk"""
+        if not self.quiet:
+            elapsed = time.perf_counter() - self.started
+            print(f"{self.name}: {self.rows:,} rows, {self.ok:,} ok, {self.failed:,} failed "
+                  f"({self.rows / elapsed if elapsed else 0:,.0f} rows/s)", file=sys.stderr)
+    
+    def finish(self):
+        """Print the final throughput summary and close the rejects file"""
+        if self.rejects_file:
+            self.rejects_file.close()
+        elapsed = time.perf_counter() - self.started
+        print(f"{self.name} complete")
+        print(f"  Rows:      {self.rows:,}")
+        print(f"  Succeeded: {self.ok:,}")
+        print(f"  Failed:    {self.failed:,}")
+        print(f"  Elapsed:   {elapsed:.2f}s")
+        print(f"  Rate:      {self.rows / elapsed if elapsed else 0:,.1f} rows/s")
+        return 1 if self.failed else 0
+
+
+def parse_amount(text):
+    """Argument type for amounts: kept as an exact Decimal; the model checks the range"""
+    try:
+        return Decimal(text)
+    except InvalidOperation:
+        raise argparse.ArgumentTypeError(f"invalid amount: {text}")
+
+
+def resolve_account(number):
+    """Look up one account ID by account number, exiting if it does not exist"""
+    from models.account import Account
+    
+    account = Account()
+    account_id = account.get_account_ids([number]).get(str(number).strip())
+    account.close_connection()
+    if account_id is None:
+        raise SystemExit(f"Account {number} not found")
+    return account_id
+
+
+def print_result(result):
+    """Print the result dict of a single operation and return its exit code"""
+    print(result['message'])
+    if result.get('success'):
+        if result.get('reference'):
+            print(f"  Reference:   {result['reference']}")
+        if result.get('new_balance') is not None:
+            print(f"  New balance: {float(result['new_balance']):,.2f}")
+        return 0
+    return 1
+
+
+def cmd_single_transaction(args):
+    """deposit / withdraw / transfer: one transaction through the Transaction model"""
+    from models.transaction import Transaction
+    
+    transaction = Transaction()
+    try:
+        account_id = resolve_account(args.account)
+        key = args.idempotency_key
+        if args.command == 'deposit':
+            result = transaction.deposit(account_id, args.amount, args.description or "Deposit",
+                                         idempotency_key=key)
+        elif args.command == 'withdraw':
+            result = transaction.withdraw(account_id, args.amount, args.description or "Withdrawal",
+                                          idempotency_key=key)
+        else:
+            result = transaction.transfer(account_id, resolve_account(args.to_account), args.amount,
+                                          args.description or "Fund Transfer", idempotency_key=key)
+        if result.get('duplicate'):
+            print("Already posted by an earlier attempt with this idempotency key")
+        return print_result(result)
+    finally:
+        transaction.close_connection()
+
+
+def cmd_single_status(args):
+    """status: change one account's status"""
+    from models.account import Account
+    
+    account = Account()
+    if account.update_account_status(resolve_account(args.account), args.status):
+        print(f"Account {args.account} is now {args.status}")
+        return 0
+    print(f"Could not update account {args.account}")
+    return 1
+
+
+def cmd_post(args):
+    """post: deposits, withdrawals and transfers from a file, in file order"""
+    from models.account import Account
+    from models.transaction import Transaction
+    
+    account = Account()
+    transaction = Transaction()
+    run = BulkRun("Transactions", args.rejects, args.quiet)
+    
+    for chunk in chunked(read_rows(args.file, args.format), args.chunk_size):
+        account_ids = account.get_account_ids(
+            n for _, row in chunk for n in (row.get('account_number'), row.get('to_account_number'))
+        )
+        
+        operations = []
+        pending = []
+        for line_number, row in chunk:
+            account_id = account_ids.get(str(row.get('account_number', '')).strip())
+            to_number = row.get('to_account_number')
+            to_account_id = account_ids.get(str(to_number).strip()) if to_number else None
+            if account_id is None or (to_number and to_account_id is None):
+                run.record(line_number, row, False, "Account not found")
+                continue
+            operations.append({
+                'type': row.get('type', ''),
+                'account_id': account_id,
+                'to_account_id': to_account_id,
+                'amount': row.get('amount'),
+                'description': row.get('description'),
+                'reference': row.get('reference') or None,
+                'idempotency_key': row.get('idempotency_key') or None,
+                'key': line_number
+            })
+            pending.append((line_number, row))
+        
+        if operations:
+            summary = transaction.post_batch(operations, args.batch_size, screen=not args.no_screen)
+            for (line_number, row), result in zip(pending, summary['results']):
+                run.record(line_number, row, result['success'], result.get('message'))
+        run.progress()
+    
+    account.close_connection()
+    return run.finish()
+
+
+def cmd_statuses(args):
+    """statuses: account status changes from a file"""
+    from models.account import Account
+    
+    account = Account()
+    run = BulkRun("Account statuses", args.rejects, args.quiet)
+    
+    for chunk in chunked(read_rows(args.file, args.format), args.chunk_size):
+        account_ids = account.get_account_ids(row.get('account_number') for _, row in chunk)
+        
+        updates = []
+        for line_number, row in chunk:
+            account_id = account_ids.get(str(row.get('account_number', '')).strip())
+            status = str(row.get('status', '')).strip().upper()
+            if account_id is None:
+                run.record(line_number, row, False, "Account not found")
+            elif status not in ACCOUNT_STATUSES:
+                run.record(line_number, row, False, f"Invalid status: {row.get('status')}")
+            else:
+                updates.append(((line_number, row), (account_id, status)))
+        
+        if updates:
+            summary = account.update_statuses([u for _, u in updates], args.batch_size)
+            for ((line_number, row), _), result in zip(updates, summary['results']):
+                run.record(line_number, row, result['success'], result.get('message'))
+        run.progress()
+    
+    account.close_connection()
+    return run.finish()
+
+
+def cmd_import_customers(args):
+    """import-customers: new customers from a file"""
+    from models.customer import Customer
+    
+    customer = Customer()
+    run = BulkRun("Customer import", args.rejects, args.quiet)
+    
+    for chunk in chunked(read_rows(args.file, args.format), args.chunk_size):
+        valid = []
+        for line_number, row in chunk:
+            row = {k: v for k, v in row.items() if v not in ('', None)}
+            missing = [field for field in REQUIRED_CUSTOMER_FIELDS if not row.get(field)]
+            if missing:
+                run.record(line_number, row, False, f"Missing {', '.join(missing)}")
+            else:
+                valid.append((line_number, row))
+        
+        if valid:
+            summary = customer.create_customers([row for _, row in valid], args.batch_size)
+            for (line_number, row), result in zip(valid, summary['results']):
+                run.record(line_number, row, result['success'], result.get('message'))
+        run.progress()
+    
+    return run.finish()
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Bank operations without the GUI')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log model activity')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    for name, help_text in (('deposit', 'Deposit into an account'), ('withdraw', 'Withdraw from an account')):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('account', help='Account number')
+        sub.add_argument('amount', type=parse_amount)
+        sub.add_argument('--description')
+        sub.add_argument('--idempotency-key', help='Reuse when retrying so the transaction posts once')
+        sub.set_defaults(handler=cmd_single_transaction)
+    
+    sub = subparsers.add_parser('transfer', help='Transfer between two accounts')
+    sub.add_argument('account', help='Source account number')
+    sub.add_argument('to_account', help='Destination account number')
+    sub.add_argument('amount', type=parse_amount)
+    sub.add_argument('--description')
+    sub.add_argument('--idempotency-key', help='Reuse when retrying so the transaction posts once')
+    sub.set_defaults(handler=cmd_single_transaction)
+    
+    sub = subparsers.add_parser('status', help='Change an account status')
+    sub.add_argument('account', help='Account number')
+    sub.add_argument('status', type=str.upper, choices=ACCOUNT_STATUSES)
+    sub.set_defaults(handler=cmd_single_status)
+    
+    for name, handler, help_text in (('post', cmd_post, 'Post transactions from a file'),
+                                     ('statuses', cmd_statuses, 'Change account statuses from a file'),
+                                     ('import-customers', cmd_import_customers, 'Create customers from a file')):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('file', help='CSV or JSON lines file, - for stdin')
+        sub.add_argument('--format', choices=('csv', 'jsonl'), help='Input format (default: from extension)')
+        sub.add_argument('--batch-size', type=int, default=500, help='Rows per database commit')
+        sub.add_argument('--chunk-size', type=int, default=5000, help='Rows read from the file at a time')
+        sub.add_argument('--rejects', help='Write failed rows to this CSV file')
+        sub.add_argument('--quiet', action='store_true', help='No progress lines')
+        sub.set_defaults(handler=handler)
+        if name == 'post':
+            sub.add_argument('--no-screen', action='store_true',
+                             help='Skip fraud screening, for trusted files such as payroll runs')
+    
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    if getattr(args, 'file', '-') != '-' and not os.path.exists(args.file):
+        parser.error(f"File not found: {args.file}")
+    
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
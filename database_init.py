@@ -7,12 +7,19 @@ import mysql.connector
 from mysql.connector import Error
 import logging
 from config import DB_CONFIG
+from models.partition_manager import TransactionPartitionManager, initial_partition_clause
+from migrations.engine import MigrationEngine, MigrationError
 from pathlib import Path
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Table creation order, respecting foreign key dependencies
+TABLE_ORDER = ['branches', 'customers', 'accounts', 'transactions', 'transaction_references',
+               'idempotency_keys', 'account_balance_snapshots', 'daily_transaction_stats', 'rollup_watermarks',
+               'loans', 'loan_payments', 'emi_schedule', 'loan_dpd_snapshots', 'staff']
+
 class DatabaseInitializer:
     """Handles automatic database and table creation"""
     
@@ -114,7 +121,9 @@ class DatabaseInitializer:
                     INDEX idx_customer_phone (phone),
                     INDEX idx_customer_email (email),
                     INDEX idx_customer_pan (pan_number),
-                    INDEX idx_customer_branch (branch_id)
+                    INDEX idx_customer_branch (branch_id),
+                    INDEX idx_customer_status_name (status, first_name, last_name),
+                    INDEX idx_customer_created (created_date)
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
             """,
             
@@ -137,33 +146,94 @@ class DatabaseInitializer:
                     INDEX idx_account_number (account_number),
                     INDEX idx_account_customer (customer_id),
                     INDEX idx_account_type (account_type),
-                    INDEX idx_account_status (status)
+                    INDEX idx_account_status (status),
+                    INDEX idx_account_created (created_date)
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
             """,
             
             'transactions': """
                 CREATE TABLE transactions (
-                    transaction_id INT AUTO_INCREMENT PRIMARY KEY,
-                    transaction_number VARCHAR(20) UNIQUE NOT NULL,
+                    transaction_id INT AUTO_INCREMENT,
+                    transaction_number VARCHAR(20) NOT NULL,
                     account_id INT NOT NULL,
                     transaction_type ENUM('DEPOSIT', 'WITHDRAWAL', 'TRANSFER_IN', 'TRANSFER_OUT', 'INTEREST_CREDIT', 'FEE_DEBIT') NOT NULL,
                     amount DECIMAL(15,2) NOT NULL,
                     balance_before DECIMAL(15,2) NOT NULL,
                     balance_after DECIMAL(15,2) NOT NULL,
-                    transaction_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    transaction_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
                     description TEXT,
                     reference_account_id INT NULL,
                     processed_by INT NULL,
                     status ENUM('PENDING', 'COMPLETED', 'FAILED', 'CANCELLED') DEFAULT 'COMPLETED',
                     created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (account_id) REFERENCES accounts(account_id) ON DELETE RESTRICT ON UPDATE CASCADE,
-                    FOREIGN KEY (reference_account_id) REFERENCES accounts(account_id) ON DELETE RESTRICT ON UPDATE CASCADE,
-                    INDEX idx_transaction_number (transaction_number),
-                    INDEX idx_transaction_account (account_id),
+                    -- Partitioned tables cannot have foreign keys, and every unique key
+                    -- must include the partitioning column transaction_date. Every posting
+                    -- path locks its accounts rows FOR UPDATE before inserting here and
+                    -- accounts are never deleted, which stands in for the foreign keys;
+                    -- transaction_references keeps transaction_number unique across dates
+                    PRIMARY KEY (transaction_id, transaction_date),
+                    UNIQUE KEY idx_transaction_number_date (transaction_number, transaction_date),
+                    INDEX idx_transaction_account_date (account_id, transaction_date),
                     INDEX idx_transaction_date (transaction_date),
                     INDEX idx_transaction_type (transaction_type),
                     INDEX idx_transaction_status (status)
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+            """ + initial_partition_clause(),
+            
+            'transaction_references': """
+                CREATE TABLE transaction_references (
+                    transaction_number VARCHAR(20) NOT NULL,
+                    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (transaction_number)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+            """,
+            
+            'idempotency_keys': """
+                CREATE TABLE idempotency_keys (
+                    idempotency_key VARCHAR(64) NOT NULL,
+                    request_fingerprint VARCHAR(100) NOT NULL,
+                    transaction_number VARCHAR(20) NULL,
+                    response TEXT NULL,
+                    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (idempotency_key),
+                    INDEX idx_idempotency_created (created_date)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+            """,
+            
+            'account_balance_snapshots': """
+                CREATE TABLE account_balance_snapshots (
+                    account_id INT NOT NULL,
+                    snapshot_date DATE NOT NULL,
+                    balance DECIMAL(15,2) NOT NULL,
+                    last_transaction_id INT NOT NULL,
+                    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (account_id, snapshot_date),
+                    FOREIGN KEY (account_id) REFERENCES accounts(account_id) ON DELETE RESTRICT ON UPDATE CASCADE,
+                    INDEX idx_snapshot_date (snapshot_date)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+            """,
+            
+            'daily_transaction_stats': """
+                CREATE TABLE daily_transaction_stats (
+                    stat_date DATE NOT NULL,
+                    account_type VARCHAR(20) NOT NULL,
+                    branch_id INT NOT NULL,
+                    transaction_type VARCHAR(20) NOT NULL,
+                    transaction_count INT NOT NULL DEFAULT 0,
+                    total_amount DECIMAL(18,2) NOT NULL DEFAULT 0.00,
+                    updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    PRIMARY KEY (stat_date, account_type, branch_id, transaction_type),
+                    INDEX idx_stats_type_date (transaction_type, stat_date)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+            """,
+            
+            'rollup_watermarks': """
+                CREATE TABLE rollup_watermarks (
+                    rollup_name VARCHAR(50) PRIMARY KEY,
+                    last_transaction_id INT NOT NULL DEFAULT 0,
+                    processed_through DATE NULL,
+                    updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
             """,
             
             'loans': """
@@ -171,6 +241,7 @@ class DatabaseInitializer:
                     loan_id INT AUTO_INCREMENT PRIMARY KEY,
                     loan_number VARCHAR(20) UNIQUE NOT NULL,
                     customer_id INT NOT NULL,
+                    branch_id INT NOT NULL,
                     loan_type ENUM('PERSONAL', 'HOME', 'CAR', 'EDUCATION', 'BUSINESS') NOT NULL,
                     principal_amount DECIMAL(15,2) NOT NULL,
                     interest_rate DECIMAL(5,2) NOT NULL,
@@ -185,14 +256,17 @@ class DatabaseInitializer:
                     approved_by INT NULL,
                     purpose TEXT,
                     collateral_details TEXT,
-                    status ENUM('APPLIED', 'APPROVED', 'DISBURSED', 'CLOSED', 'DEFAULTED') DEFAULT 'APPLIED',
+                    status ENUM('APPLIED', 'APPROVED', 'DISBURSED', 'CLOSED', 'DEFAULTED', 'REJECTED') DEFAULT 'APPLIED',
                     created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                     FOREIGN KEY (customer_id) REFERENCES customers(customer_id) ON DELETE RESTRICT ON UPDATE CASCADE,
+                    FOREIGN KEY (branch_id) REFERENCES branches(branch_id) ON DELETE RESTRICT ON UPDATE CASCADE,
                     INDEX idx_loan_number (loan_number),
                     INDEX idx_loan_customer (customer_id),
                     INDEX idx_loan_type (loan_type),
-                    INDEX idx_loan_status (status)
+                    INDEX idx_loan_status_date (status, application_date),
+                    INDEX idx_loan_branch_status (branch_id, status, application_date),
+                    INDEX idx_loan_application_date (application_date)
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
             """,
             
@@ -214,10 +288,47 @@ class DatabaseInitializer:
                     INDEX idx_payment_loan (loan_id),
                     INDEX idx_payment_date (payment_date),
                     INDEX idx_payment_status (status),
+                    INDEX idx_payment_reference (reference_number),
                     UNIQUE KEY unique_loan_payment (loan_id, payment_number)
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
             """,
             
+            'emi_schedule': """
+                CREATE TABLE emi_schedule (
+                    schedule_id INT AUTO_INCREMENT PRIMARY KEY,
+                    loan_id INT NOT NULL,
+                    installment_number INT NOT NULL,
+                    due_date DATE NOT NULL,
+                    emi_amount DECIMAL(15,2) NOT NULL,
+                    status ENUM('DUE', 'PAID', 'OVERDUE') DEFAULT 'DUE',
+                    paid_date DATE NULL,
+                    attempts INT NOT NULL DEFAULT 0,
+                    last_attempt_date DATE NULL,
+                    failure_reason VARCHAR(255),
+                    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    FOREIGN KEY (loan_id) REFERENCES loans(loan_id) ON DELETE RESTRICT ON UPDATE CASCADE,
+                    UNIQUE KEY unique_loan_installment (loan_id, installment_number),
+                    INDEX idx_emi_status_due (status, due_date)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+            """,
+            
+            'loan_dpd_snapshots': """
+                CREATE TABLE loan_dpd_snapshots (
+                    snapshot_date DATE NOT NULL,
+                    loan_id INT NOT NULL,
+                    days_past_due INT NOT NULL,
+                    dpd_bucket ENUM('STANDARD', 'SMA-0', 'SMA-1', 'SMA-2', 'NPA') NOT NULL,
+                    outstanding_amount DECIMAL(15,2) NOT NULL,
+                    overdue_amount DECIMAL(15,2) NOT NULL DEFAULT 0.00,
+                    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    PRIMARY KEY (snapshot_date, loan_id),
+                    FOREIGN KEY (loan_id) REFERENCES loans(loan_id) ON DELETE RESTRICT ON UPDATE CASCADE,
+                    INDEX idx_dpd_snapshot_bucket (snapshot_date, dpd_bucket)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+            """,
+            
             'staff': """
                 CREATE TABLE staff (
                     staff_id INT AUTO_INCREMENT PRIMARY KEY,
@@ -263,9 +374,7 @@ class DatabaseInitializer:
             cursor = connection.cursor()
             
             # Create missing tables in order (respecting foreign key dependencies)
-            table_order = ['branches', 'customers', 'accounts', 'transactions', 'loans', 'loan_payments', 'staff']
-            
-            for table_name in table_order:
+            for table_name in TABLE_ORDER:
                 if table_name in missing_tables:
                     logger.info(f"Creating table: {table_name}")
                     cursor.execute(required_tables[table_name])
@@ -355,6 +464,38 @@ class DatabaseInitializer:
         except Error as e:
             logger.error(f"❌ Error creating triggers: {e}")
     
+    def apply_migrations(self, baseline=False):
+        """Apply pending online schema migrations"""
+        try:
+            engine = MigrationEngine()
+            if baseline:
+                engine.baseline()
+            summary = engine.migrate()
+            engine.close_connection()
+            
+            if summary['applied']:
+                logger.info(f"✅ Schema migrations applied: {summary['applied']}")
+            elif not summary['blocked']:
+                logger.info("✅ Schema is up to date")
+            return True
+            
+        except (Error, MigrationError) as e:
+            logger.error(f"❌ Error applying schema migrations: {e}")
+            return False
+    
+    def roll_transaction_partitions(self):
+        """Create the upcoming monthly partitions of the transactions table"""
+        try:
+            manager = TransactionPartitionManager()
+            created = manager.roll_ahead()
+            manager.close_connection()
+            
+            if created:
+                logger.info(f"✅ Transaction partitions created: {', '.join(created)}")
+            
+        except Error as e:
+            logger.warning(f"⚠️ Could not roll transaction partitions ahead: {e}")
+    
     def load_initial_data(self):
         """Load initial data if tables are empty"""
         try:
@@ -401,14 +542,22 @@ class DatabaseInitializer:
             if not self.check_and_create_database():
                 return False
             
-            # Step 2: Create missing tables
+            # Step 2: Create missing tables; a new install starts at the migration baseline
+            new_install = not self.get_existing_tables()
             if not self.create_missing_tables():
                 return False
             
-            # Step 3: Create triggers
+            # Step 3: Bring existing installs up to date
+            if not self.apply_migrations(baseline=new_install):
+                return False
+            
+            # Step 4: Keep monthly transaction partitions ahead of the calendar
+            self.roll_transaction_partitions()
+            
+            # Step 5: Create triggers
             self.create_triggers()
             
-            # Step 4: Load initial data
+            # Step 6: Load initial data
             self.load_initial_data()
             
             logger.info("🎉 Database initialization completed successfully!")
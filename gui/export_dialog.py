@@ -0,0 +1,133 @@
+"""
+Export Dialog for Bank Management System
+Runs a streaming query export on a worker thread with a progress bar and cancel button
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from models.export import QueryExporter
+from datetime import datetime
+import logging
+import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FILE_TYPES = [
+    ("Excel Workbook", "*.xlsx"),
+    ("CSV", "*.csv"),
+    ("Compressed CSV", "*.csv.gz"),
+    ("Columnar Compressed CSV", "*.columnar.csv.gz")
+]
+
+
+def export_query(parent, title, query, params=()):
+    """
+    Ask for a destination file and export a query to it
+    Args:
+        parent: Parent window
+        title (str): Export title, used for the default file name and sheet name
+        query (str): SELECT statement
+        params (tuple): Query parameters
+    Returns:
+        ExportDialog: The running export, or None if the user cancelled
+    """
+    reports_dir = "reports"
+    os.makedirs(reports_dir, exist_ok=True)
+    
+    path = filedialog.asksaveasfilename(
+        parent=parent,
+        title=f"Export {title}",
+        initialdir=reports_dir,
+        initialfile=f"{title.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+        defaultextension=".xlsx",
+        filetypes=EXPORT_FILE_TYPES
+    )
+    if not path:
+        return None
+    return ExportDialog(parent, title, query, params, path)
+
+
+class ExportDialog:
+    """Progress window for one export; the worker thread never touches Tk widgets"""
+    
+    def __init__(self, parent, title, query, params, path):
+        self.title = title
+        self.path = path
+        self.cancelled = threading.Event()
+        self.events = queue.Queue()
+        
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title(f"Exporting {title}")
+        self.dialog.geometry("420x150")
+        self.dialog.resizable(False, False)
+        self.dialog.transient(parent)
+        self.dialog.protocol("WM_DELETE_WINDOW", self.cancel)
+        
+        ttk.Label(self.dialog, text=os.path.basename(path)).pack(pady=(15, 5))
+        
+        self.progress_bar = ttk.Progressbar(self.dialog, mode='indeterminate', length=380)
+        self.progress_bar.pack(padx=20, pady=5)
+        self.progress_bar.start(10)
+        
+        self.status_label = ttk.Label(self.dialog, text="Starting export...")
+        self.status_label.pack(pady=5)
+        
+        self.cancel_button = ttk.Button(self.dialog, text="Cancel", command=self.cancel)
+        self.cancel_button.pack(pady=5)
+        
+        threading.Thread(target=self._run, args=(query, params), daemon=True).start()
+        self.dialog.after(100, self._poll)
+    
+    def cancel(self):
+        """Stop the export after the current chunk"""
+        self.cancelled.set()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.status_label.config(text="Cancelling...")
+    
+    def _progress(self, rows_written, total):
+        self.events.put(('progress', rows_written, total))
+        return not self.cancelled.is_set()
+    
+    def _run(self, query, params):
+        try:
+            result = QueryExporter().export(query, params, self.path, progress=self._progress,
+                                            sheet_title=self.title)
+        except Exception as e:
+            logger.error(f"Error exporting {self.title}: {e}")
+            result = {"success": False, "message": f"Export failed: {str(e)}"}
+        self.events.put(('done', result))
+    
+    def _poll(self):
+        try:
+            while True:
+                event = self.events.get_nowait()
+                if event[0] == 'done':
+                    self._finish(event[1])
+                    return
+                self._show_progress(event[1], event[2])
+        except queue.Empty:
+            pass
+        self.dialog.after(100, self._poll)
+    
+    def _show_progress(self, rows_written, total):
+        if total:
+            if self.progress_bar['mode'] != 'determinate':
+                self.progress_bar.stop()
+                self.progress_bar.config(mode='determinate', maximum=total)
+            self.progress_bar['value'] = rows_written
+            self.status_label.config(text=f"{rows_written:,} of {total:,} rows")
+        else:
+            self.status_label.config(text=f"{rows_written:,} rows")
+    
+    def _finish(self, result):
+        parent = self.dialog.master
+        self.dialog.destroy()
+        
+        if result['success']:
+            messagebox.showinfo("Export", result['message'], parent=parent)
+        elif self.cancelled.is_set():
+            messagebox.showinfo("Export", "Export cancelled", parent=parent)
+        else:
+            messagebox.showerror("Error", result['message'], parent=parent)
@@ -1,11 +1,13 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-from gui.customer_window import CustomerWindow
-from gui.account_window import AccountWindow
-from gui.transaction_window import TransactionWindow
-from gui.reports_window import ReportsWindow
-from models.database import db
 from config import APP_CONFIG
+from datetime import datetime
+
+
+def get_db():
+    """Shared database helper, imported on first use so startup does not load mysql.connector"""
+    from models.database import db
+    return db
 
 class MainWindow:
     """Main application window for Bank Management System"""
@@ -15,7 +17,8 @@ class MainWindow:
         self.setup_window()
         self.create_menu()
         self.create_main_interface()
-        self.test_database_connection()
+        # Database work waits until the window has been drawn
+        self.root.after(0, self.load_startup_data)
     
     def setup_window(self):
         """Setup main window properties"""
@@ -147,9 +150,6 @@ class MainWindow:
             self.stat_labels[key] = ttk.Label(frame, text="Loading...", 
                                             font=('Arial', 14, 'bold'))
             self.stat_labels[key].pack()
-        
-        # Load statistics
-        self.load_dashboard_stats()
     
     def create_recent_activity(self, parent):
         """Create recent activity section"""
@@ -186,14 +186,18 @@ class MainWindow:
         refresh_btn = ttk.Button(activity_frame, text="Refresh", 
                                command=self.load_recent_activity)
         refresh_btn.grid(row=0, column=0, sticky=tk.W, pady=(0, 10))
-        
-        # Load recent activity
-        self.load_recent_activity()
+    
+    def load_startup_data(self):
+        """Check the database and fill the dashboard once the window is showing"""
+        self.root.update_idletasks()
+        if self.test_database_connection():
+            self.load_dashboard_stats()
+            self.load_recent_activity()
     
     def load_dashboard_stats(self):
         """Load dashboard statistics from database"""
         try:
-            if not db.test_connection():
+            if not get_db().test_connection():
                 self.stat_labels['customers'].config(text="DB Error")
                 self.stat_labels['accounts'].config(text="DB Error")
                 self.stat_labels['balance'].config(text="DB Error")
@@ -202,28 +206,29 @@ class MainWindow:
             
             # Total customers
             customers_query = "SELECT COUNT(*) as count FROM customers WHERE status = 'ACTIVE'"
-            customers_result = db.execute_query(customers_query)
+            customers_result = get_db().execute_query(customers_query)
             customers_count = customers_result[0]['count'] if customers_result else 0
             self.stat_labels['customers'].config(text=str(customers_count))
             
             # Total accounts
             accounts_query = "SELECT COUNT(*) as count FROM accounts WHERE status = 'ACTIVE'"
-            accounts_result = db.execute_query(accounts_query)
+            accounts_result = get_db().execute_query(accounts_query)
             accounts_count = accounts_result[0]['count'] if accounts_result else 0
             self.stat_labels['accounts'].config(text=str(accounts_count))
             
             # Total balance
             balance_query = "SELECT SUM(balance) as total FROM accounts WHERE status = 'ACTIVE'"
-            balance_result = db.execute_query(balance_query)
+            balance_result = get_db().execute_query(balance_query)
             total_balance = balance_result[0]['total'] if balance_result and balance_result[0]['total'] else 0
             self.stat_labels['balance'].config(text=f"₹{total_balance:,.2f}")
             
             # Today's transactions
             today_query = """
                 SELECT COUNT(*) as count FROM transactions 
-                WHERE DATE(transaction_date) = CURDATE() AND status = 'COMPLETED'
+                WHERE transaction_date >= CURDATE() AND transaction_date < CURDATE() + INTERVAL 1 DAY
+                  AND status = 'COMPLETED'
             """
-            today_result = db.execute_query(today_query)
+            today_result = get_db().execute_query(today_query)
             today_count = today_result[0]['count'] if today_result else 0
             self.stat_labels['transactions'].config(text=str(today_count))
             
@@ -237,7 +242,7 @@ class MainWindow:
             for item in self.activity_tree.get_children():
                 self.activity_tree.delete(item)
             
-            if not db.test_connection():
+            if not get_db().test_connection():
                 return
             
             # Get recent transactions
@@ -252,7 +257,7 @@ class MainWindow:
                 LIMIT 20
             """
             
-            transactions = db.execute_query(query)
+            transactions = get_db().execute_query(query)
             
             for transaction in transactions:
                 formatted_time = transaction['transaction_date'].strftime('%H:%M:%S')
@@ -272,27 +277,35 @@ class MainWindow:
     
     def test_database_connection(self):
         """Test database connection on startup"""
-        if not db.test_connection():
+        if not get_db().test_connection():
+            for label in self.stat_labels.values():
+                label.config(text="DB Error")
             messagebox.showerror(
                 "Database Connection Error",
                 "Failed to connect to the database. Please check your configuration."
             )
+            return False
+        return True
     
     # Menu command methods
     def open_customer_window(self):
         """Open customer management window"""
+        from gui.customer_window import CustomerWindow
         CustomerWindow(self.root)
     
     def open_account_window(self):
         """Open account management window"""
+        from gui.account_window import AccountWindow
         AccountWindow(self.root)
     
     def open_transaction_window(self):
         """Open transaction processing window"""
+        from gui.transaction_window import TransactionWindow
         TransactionWindow(self.root)
     
     def open_reports_window(self):
         """Open reports window"""
+        from gui.reports_window import ReportsWindow
         ReportsWindow(self.root)
     
     def search_customer(self):
@@ -336,14 +349,40 @@ class MainWindow:
             account = account_model.get_account_by_number(account_number)
             
             if account:
+                from gui.transaction_window import TransactionWindow
                 TransactionWindow(self.root, account['account_id'])
             else:
                 messagebox.showerror("Error", "Account not found.")
     
     def generate_statement(self):
-        """Generate account statement"""
-        messagebox.showinfo("Info", "Statement generation feature will open in Reports window.")
-        self.open_reports_window()
+        """Generate a monthly PDF account statement"""
+        account_number = simpledialog.askstring("Account Statement", "Enter account number:")
+        if not account_number:
+            return
+        
+        from models.account import Account
+        from models.statement import StatementGenerator, previous_month
+        account = Account().get_account_by_number(account_number)
+        if not account:
+            messagebox.showerror("Error", "Account not found.")
+            return
+        
+        year, month = previous_month()
+        period = simpledialog.askstring("Account Statement", "Statement month (YYYY-MM):",
+                                        initialvalue=f"{year}-{month:02d}")
+        if not period:
+            return
+        try:
+            period_date = datetime.strptime(period.strip(), "%Y-%m")
+        except ValueError:
+            messagebox.showerror("Error", "Please enter the month as YYYY-MM.")
+            return
+        
+        result = StatementGenerator().generate_account(account['account_id'], period_date.year, period_date.month)
+        if result['success']:
+            messagebox.showinfo("Account Statement", result['message'])
+        else:
+            messagebox.showerror("Error", result['message'])
     
     def show_db_config(self):
         """Show database configuration dialog"""
@@ -355,7 +394,7 @@ Port: {DB_CONFIG['port']}
 Database: {DB_CONFIG['database']}
 User: {DB_CONFIG['user']}
 
-Connection Status: {'Connected' if db.test_connection() else 'Disconnected'}"""
+Connection Status: {'Connected' if get_db().test_connection() else 'Disconnected'}"""
         
         messagebox.showinfo("Database Configuration", config_info)
     
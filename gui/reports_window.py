@@ -9,21 +9,18 @@ from datetime import datetime, timedelta
 import logging
 import csv
 import os
-from models.customer import Customer
-from models.account import Account 
-from models.transaction import Transaction
+from models.report_builder import ReportBuilder
+from gui.export_dialog import export_query
 
 logger = logging.getLogger(__name__)
 
-class ReportsWindow:
+class ReportsWindow(ReportBuilder):
     """Reports and analytics window with full functionality"""
     
     def __init__(self, parent):
         self.parent = parent
         self.window = None
-        self.customer_model = Customer()
-        self.account_model = Account()
-        self.transaction_model = Transaction()
+        super().__init__()
         self.create_window()
     
     def create_window(self):
@@ -164,7 +161,7 @@ class ReportsWindow:
             ("Revenue Analysis", self.generate_revenue_analysis, "Transaction volume and patterns"),
             ("Account Type Distribution", self.generate_account_distribution, "Breakdown by account types"),
             ("Seasonal Trends", self.generate_seasonal_trends, "Transaction patterns by month/season"),
-            ("Risk Assessment", self.generate_risk_assessment, "Large withdrawals and dormant accounts")
+            ("Risk Assessment", self.generate_risk_assessment, "Days past due and NPA classification of loans")
         ]
         
         for report_name, command, description in analytics_reports:
@@ -225,54 +222,8 @@ class ReportsWindow:
     def generate_system_overview(self):
         """Generate system overview report"""
         try:
-            customers = self.customer_model.get_all_customers()
-            accounts = self.account_model.get_all_accounts()
-            
-            report_data = []
-            report_data.append("=" * 60)
-            report_data.append("BANK MANAGEMENT SYSTEM - OVERVIEW REPORT")
-            report_data.append("=" * 60)
-            report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            report_data.append("")
-            
-            # Customer Statistics
-            report_data.append("CUSTOMER STATISTICS:")
-            report_data.append("-" * 20)
-            report_data.append(f"Total Customers: {len(customers)}")
-            active_customers = len([c for c in customers if c.get('status') == 'ACTIVE'])
-            report_data.append(f"Active Customers: {active_customers}")
-            report_data.append("")
-            
-            # Account Statistics
-            report_data.append("ACCOUNT STATISTICS:")
-            report_data.append("-" * 20)
-            report_data.append(f"Total Accounts: {len(accounts)}")
-            
-            account_types = {}
-            active_accounts = 0
-            total_balance = 0.0
-            
-            for acc in accounts:
-                acc_type = acc.get('account_type', 'UNKNOWN')
-                account_types[acc_type] = account_types.get(acc_type, 0) + 1
-                
-                if acc.get('status') == 'ACTIVE':
-                    active_accounts += 1
-                
-                balance = float(acc.get('balance', 0))
-                total_balance += balance
-            
-            report_data.append(f"Active Accounts: {active_accounts}")
-            report_data.append(f"Total Balance: ₹{total_balance:,.2f}")
-            report_data.append("")
-            
-            report_data.append("ACCOUNT TYPES BREAKDOWN:")
-            report_data.append("-" * 25)
-            for acc_type, count in account_types.items():
-                report_data.append(f"{acc_type}: {count}")
-            
-            # Display or save report
-            self.show_report_dialog("System Overview", "\n".join(report_data))
+            content = self.run_report('system_overview')
+            self.show_report_dialog("System Overview", content)
             
         except Exception as e:
             logger.error(f"Error generating system overview: {e}")
@@ -282,48 +233,8 @@ class ReportsWindow:
         """Generate daily summary report"""
         try:
             today = datetime.now().date()
-            transactions = self.transaction_model.get_all_transactions()
-            
-            # Filter today's transactions
-            today_transactions = []
-            for trans in transactions:
-                trans_date = trans.get('transaction_date')
-                if trans_date and trans_date.date() == today:
-                    today_transactions.append(trans)
-            
-            report_data = []
-            report_data.append("=" * 60)
-            report_data.append("DAILY SUMMARY REPORT")
-            report_data.append("=" * 60)
-            report_data.append(f"Date: {today.strftime('%Y-%m-%d')}")
-            report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            report_data.append("")
-            
-            if not today_transactions:
-                report_data.append("No transactions found for today.")
-            else:
-                # Analyze transactions
-                deposits = [t for t in today_transactions if t.get('transaction_type') == 'DEPOSIT']
-                withdrawals = [t for t in today_transactions if t.get('transaction_type') == 'WITHDRAWAL']
-                transfers_out = [t for t in today_transactions if t.get('transaction_type') == 'TRANSFER_OUT']
-                transfers_in = [t for t in today_transactions if t.get('transaction_type') == 'TRANSFER_IN']
-                
-                total_deposits = sum(float(t.get('amount', 0)) for t in deposits)
-                total_withdrawals = sum(float(t.get('amount', 0)) for t in withdrawals)
-                total_transfers = sum(float(t.get('amount', 0)) for t in transfers_out)
-                
-                report_data.append("TRANSACTION SUMMARY:")
-                report_data.append("-" * 20)
-                report_data.append(f"Total Transactions: {len(today_transactions)}")
-                report_data.append(f"Deposits: {len(deposits)} (₹{total_deposits:,.2f})")
-                report_data.append(f"Withdrawals: {len(withdrawals)} (₹{total_withdrawals:,.2f})")
-                report_data.append(f"Transfers: {len(transfers_out)} (₹{total_transfers:,.2f})")
-                report_data.append("")
-                
-                net_flow = total_deposits - total_withdrawals
-                report_data.append(f"Net Cash Flow: ₹{net_flow:,.2f}")
-            
-            self.show_report_dialog("Daily Summary", "\n".join(report_data))
+            content = self.run_report('daily_summary', today)
+            self.show_report_dialog("Daily Summary", content)
             
         except Exception as e:
             logger.error(f"Error generating daily summary: {e}")
@@ -332,37 +243,8 @@ class ReportsWindow:
     def generate_account_status(self):
         """Generate account status report"""
         try:
-            accounts = self.account_model.get_all_accounts()
-            
-            report_data = []
-            report_data.append("=" * 60)
-            report_data.append("ACCOUNT STATUS REPORT")
-            report_data.append("=" * 60)
-            report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            report_data.append("")
-            
-            # Group by status
-            status_groups = {}
-            for acc in accounts:
-                status = acc.get('status', 'UNKNOWN')
-                if status not in status_groups:
-                    status_groups[status] = []
-                status_groups[status].append(acc)
-            
-            for status, acc_list in status_groups.items():
-                report_data.append(f"{status} ACCOUNTS ({len(acc_list)}):")
-                report_data.append("-" * (len(status) + 12))
-                
-                total_balance = 0.0
-                for acc in acc_list:
-                    balance = float(acc.get('balance', 0))
-                    total_balance += balance
-                    report_data.append(f"  {acc.get('account_number', 'N/A')} - {acc.get('customer_name', 'N/A')} - ₹{balance:,.2f}")
-                
-                report_data.append(f"  Total Balance: ₹{total_balance:,.2f}")
-                report_data.append("")
-            
-            self.show_report_dialog("Account Status Report", "\n".join(report_data))
+            content = self.run_report('account_status')
+            self.show_report_dialog("Account Status Report", content)
             
         except Exception as e:
             logger.error(f"Error generating account status report: {e}")
@@ -371,39 +253,8 @@ class ReportsWindow:
     def generate_customer_demographics(self):
         """Generate customer demographics report"""
         try:
-            customers = self.customer_model.get_all_customers()
-            
-            report_data = []
-            report_data.append("=" * 60)
-            report_data.append("CUSTOMER DEMOGRAPHICS REPORT")
-            report_data.append("=" * 60)
-            report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            report_data.append("")
-            
-            # City distribution
-            cities = {}
-            for customer in customers:
-                city = customer.get('city', 'Unknown')
-                cities[city] = cities.get(city, 0) + 1
-            
-            report_data.append("CUSTOMERS BY CITY:")
-            report_data.append("-" * 20)
-            for city, count in sorted(cities.items()):
-                report_data.append(f"{city}: {count}")
-            report_data.append("")
-            
-            # Status distribution
-            statuses = {}
-            for customer in customers:
-                status = customer.get('status', 'Unknown')
-                statuses[status] = statuses.get(status, 0) + 1
-            
-            report_data.append("CUSTOMERS BY STATUS:")
-            report_data.append("-" * 21)
-            for status, count in statuses.items():
-                report_data.append(f"{status}: {count}")
-            
-            self.show_report_dialog("Customer Demographics", "\n".join(report_data))
+            content = self.run_report('customer_demographics')
+            self.show_report_dialog("Customer Demographics", content)
             
         except Exception as e:
             logger.error(f"Error generating customer demographics: {e}")
@@ -419,42 +270,9 @@ class ReportsWindow:
             return
         
         try:
-            all_transactions = self.transaction_model.get_all_transactions()
-            
-            # Filter by date range
-            filtered_transactions = []
-            for trans in all_transactions:
-                trans_date = trans.get('transaction_date')
-                if trans_date and from_date <= trans_date.date() <= to_date:
-                    filtered_transactions.append(trans)
-            
-            report_data = []
-            report_data.append("=" * 80)
-            report_data.append("TRANSACTION HISTORY REPORT")
-            report_data.append("=" * 80)
-            report_data.append(f"Period: {from_date} to {to_date}")
-            report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            report_data.append("")
-            
-            if not filtered_transactions:
-                report_data.append("No transactions found for the selected period.")
-            else:
-                report_data.append(f"Total Transactions: {len(filtered_transactions)}")
-                report_data.append("")
-                report_data.append(f"{'Date':<12} {'Account':<15} {'Type':<12} {'Amount':<15} {'Balance':<15} {'Description':<20}")
-                report_data.append("-" * 80)
-                
-                for trans in filtered_transactions:
-                    date_str = trans.get('transaction_date', '').strftime('%Y-%m-%d') if trans.get('transaction_date') else 'N/A'
-                    account = trans.get('account_number', 'N/A')[:12]
-                    trans_type = trans.get('transaction_type', 'N/A')[:10]
-                    amount = f"₹{float(trans.get('amount', 0)):,.2f}"
-                    balance = f"₹{float(trans.get('balance_after', 0)):,.2f}"
-                    desc = (trans.get('description', 'N/A')[:18] + '..') if len(str(trans.get('description', ''))) > 20 else str(trans.get('description', 'N/A'))
-                    
-                    report_data.append(f"{date_str:<12} {account:<15} {trans_type:<12} {amount:<15} {balance:<15} {desc:<20}")
-            
-            self.show_report_dialog("Transaction History", "\n".join(report_data))
+            content = self.run_report('transaction_history', from_date, to_date)
+            self.show_report_dialog("Transaction History", content,
+                                    export=self.transaction_model.get_export_query(from_date, to_date))
             
         except Exception as e:
             logger.error(f"Error generating transaction history: {e}")
@@ -463,39 +281,22 @@ class ReportsWindow:
     def generate_customer_list(self):
         """Generate complete customer list"""
         try:
-            customers = self.customer_model.get_all_customers()
-            
-            report_data = []
-            report_data.append("=" * 80)
-            report_data.append("CUSTOMER LIST REPORT")
-            report_data.append("=" * 80)
-            report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            report_data.append(f"Total Customers: {len(customers)}")
-            report_data.append("")
-            
-            if customers:
-                report_data.append(f"{'ID':<5} {'Name':<25} {'Phone':<15} {'City':<15} {'Status':<8}")
-                report_data.append("-" * 80)
-                
-                for customer in customers:
-                    cust_id = str(customer.get('customer_id', 'N/A'))
-                    name = f"{customer.get('first_name', '')} {customer.get('last_name', '')}"[:23]
-                    phone = customer.get('phone', 'N/A')[:13]
-                    city = customer.get('city', 'N/A')[:13]
-                    status = customer.get('status', 'N/A')
-                    
-                    report_data.append(f"{cust_id:<5} {name:<25} {phone:<15} {city:<15} {status:<8}")
-            else:
-                report_data.append("No customers found.")
-            
-            self.show_report_dialog("Customer List", "\n".join(report_data))
+            content = self.run_report('customer_list')
+            self.show_report_dialog("Customer List", content,
+                                    export=self.customer_model.get_export_query())
             
         except Exception as e:
             logger.error(f"Error generating customer list: {e}")
             messagebox.showerror("Error", f"Failed to generate report: {str(e)}")
     
-    def show_report_dialog(self, title, content):
-        """Show report in a dialog with export option"""
+    def show_report_dialog(self, title, content, export=None):
+        """
+        Show report in a dialog with export options
+        Args:
+            title (str): Report title
+            content (str): Report text
+            export (tuple): Optional (query, params) behind the report, exported as CSV or Excel
+        """
         dialog = tk.Toplevel(self.window)
         dialog.title(f"Report: {title}")
         dialog.geometry("900x600")
@@ -527,6 +328,9 @@ class ReportsWindow:
         
         ttk.Button(button_frame, text="Export to File", 
                   command=lambda: self.export_report(title, content)).pack(side=tk.LEFT, padx=5)
+        if export:
+            ttk.Button(button_frame, text="Export Data (CSV/Excel)",
+                      command=lambda: export_query(dialog, title, *export)).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Close", command=dialog.destroy).pack(side=tk.RIGHT, padx=5)
     
     def export_report(self, title, content):
@@ -551,13 +355,51 @@ class ReportsWindow:
             logger.error(f"Error exporting report: {e}")
             messagebox.showerror("Error", f"Failed to export report: {str(e)}")
     
+    def generate_monthly_analysis(self):
+        """Generate monthly transaction analysis report"""
+        try:
+            content = self.run_report('monthly_analysis', self.analytics.default_start_date())
+            self.show_report_dialog("Monthly Analysis", content)
+            
+        except Exception as e:
+            logger.error(f"Error generating monthly analysis: {e}")
+            messagebox.showerror("Error", f"Failed to generate report: {str(e)}")
+    
+    def generate_growth_analysis(self):
+        """Generate customer and account growth report"""
+        try:
+            content = self.run_report('growth_analysis', self.analytics.default_start_date())
+            self.show_report_dialog("Growth Analysis", content)
+            
+        except Exception as e:
+            logger.error(f"Error generating growth analysis: {e}")
+            messagebox.showerror("Error", f"Failed to generate report: {str(e)}")
+    
+    def generate_seasonal_trends(self):
+        """Generate seasonal transaction trends report"""
+        try:
+            content = self.run_report('seasonal_trends', self.analytics.default_start_date())
+            self.show_report_dialog("Seasonal Trends", content)
+            
+        except Exception as e:
+            logger.error(f"Error generating seasonal trends: {e}")
+            messagebox.showerror("Error", f"Failed to generate report: {str(e)}")
+    
+    def generate_risk_assessment(self):
+        """Generate loan book risk assessment report"""
+        try:
+            today = datetime.now().date()
+            content = self.run_report('risk_assessment', today)
+            self.show_report_dialog("Risk Assessment", content)
+            
+        except Exception as e:
+            logger.error(f"Error generating risk assessment: {e}")
+            messagebox.showerror("Error", f"Failed to generate report: {str(e)}")
+    
     # Placeholder methods for additional reports
     def generate_daily_transactions(self):
         messagebox.showinfo("Report", "Daily Transaction Summary - Under Development!")
     
-    def generate_monthly_analysis(self):
-        messagebox.showinfo("Report", "Monthly Analysis - Under Development!")
-    
     def generate_account_activity(self):
         messagebox.showinfo("Report", "Account Activity Report - Under Development!")
     
@@ -576,17 +418,8 @@ class ReportsWindow:
     def generate_customer_balances(self):
         messagebox.showinfo("Report", "Customer Balance Report - Under Development!")
     
-    def generate_growth_analysis(self):
-        messagebox.showinfo("Report", "Growth Analysis - Under Development!")
-    
     def generate_revenue_analysis(self):
         messagebox.showinfo("Report", "Revenue Analysis - Under Development!")
     
     def generate_account_distribution(self):
         messagebox.showinfo("Report", "Account Distribution - Under Development!")
-    
-    def generate_seasonal_trends(self):
-        messagebox.showinfo("Report", "Seasonal Trends - Under Development!")
-    
-    def generate_risk_assessment(self):
-        messagebox.showinfo("Report", "Risk Assessment - Under Development!")
\ No newline at end of file
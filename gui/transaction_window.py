@@ -6,8 +6,10 @@ Phase 3 Implementation - Deposits, Withdrawals, Transfers, and History
 import tkinter as tk
 from tkinter import ttk, messagebox
 from models.transaction import Transaction
+from gui.export_dialog import export_query
 from datetime import datetime
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +22,16 @@ class TransactionWindow:
         self.window = None
         self.accounts = []
         self.account_mapping = {}
+        # One idempotency key per pending form submission, so a retry cannot post twice
+        self.form_keys = {}
         self.create_window()
     
+    def form_key(self, form):
+        """Idempotency key for a form, kept until the form is cleared after a successful post"""
+        if form not in self.form_keys:
+            self.form_keys[form] = uuid.uuid4().hex
+        return self.form_keys[form]
+    
     def create_window(self):
         """Create the transaction window"""
         self.window = tk.Toplevel(self.parent)
@@ -433,7 +443,8 @@ class TransactionWindow:
             reference = self.deposit_ref_var.get() or None
             
             print(f"Processing deposit: Account {account_id}, Amount {amount}")  # Debug print
-            result = self.transaction_model.deposit(account_id, amount, description, reference)
+            result = self.transaction_model.deposit(account_id, amount, description, reference,
+                                                  idempotency_key=self.form_key('deposit'))
             print(f"Deposit result: {result}")  # Debug print
             
             if result['success']:
@@ -477,7 +488,8 @@ class TransactionWindow:
             reference = self.withdraw_ref_var.get() or None
             
             print(f"Processing withdrawal: Account {account_id}, Amount {amount}")  # Debug print
-            result = self.transaction_model.withdraw(account_id, amount, description, reference)
+            result = self.transaction_model.withdraw(account_id, amount, description, reference,
+                                                   idempotency_key=self.form_key('withdrawal'))
             print(f"Withdrawal result: {result}")  # Debug print
             
             if result['success']:
@@ -532,7 +544,8 @@ class TransactionWindow:
             reference = self.transfer_ref_var.get() or None
             
             print(f"Processing transfer: From {from_account_id} to {to_account_id}, Amount {amount}")  # Debug print
-            result = self.transaction_model.transfer(from_account_id, to_account_id, amount, description, reference)
+            result = self.transaction_model.transfer(from_account_id, to_account_id, amount, description, reference,
+                                                   idempotency_key=self.form_key('transfer'))
             print(f"Transfer result: {result}")  # Debug print
             
             if result['success']:
@@ -610,11 +623,14 @@ class TransactionWindow:
         self.load_transactions()
     
     def export_transactions(self):
-        """Export transactions to CSV"""
-        messagebox.showinfo("Export", "Transaction export feature - Coming Soon!")
+        """Export transaction history, filtered by the current search, to CSV or Excel"""
+        search_term = self.search_var.get().strip()
+        query, params = self.transaction_model.get_export_query(search_term=search_term or None)
+        export_query(self.window, "Transactions", query, params)
     
     def clear_deposit_form(self):
         """Clear deposit form"""
+        self.form_keys.pop('deposit', None)
         if self.deposit_account_combo['values']:
             self.deposit_account_combo.current(0)
         self.deposit_amount_var.set("")
@@ -623,6 +639,7 @@ class TransactionWindow:
     
     def clear_withdrawal_form(self):
         """Clear withdrawal form"""
+        self.form_keys.pop('withdrawal', None)
         if self.withdraw_account_combo['values']:
             self.withdraw_account_combo.current(0)
         self.withdraw_amount_var.set("")
@@ -632,6 +649,7 @@ class TransactionWindow:
     
     def clear_transfer_form(self):
         """Clear transfer form"""
+        self.form_keys.pop('transfer', None)
         if self.transfer_from_combo['values']:
             self.transfer_from_combo.current(0)
         if self.transfer_to_combo['values']:
@@ -21,6 +21,9 @@ Date: July 2025
 
 import sys
 import logging
+import queue
+import threading
+import importlib.util
 import tkinter as tk
 from tkinter import messagebox
 from pathlib import Path
@@ -40,12 +43,10 @@ def setup_logging():
     )
 
 def check_dependencies():
-    """Check if required dependencies are available"""
+    """Check if required dependencies are available without importing them"""
     missing_deps = []
     
-    try:
-        import mysql.connector
-    except ImportError:
+    if importlib.util.find_spec("mysql") is None or importlib.util.find_spec("mysql.connector") is None:
         missing_deps.append("mysql-connector-python")
     
     if missing_deps:
@@ -58,38 +59,15 @@ def check_dependencies():
         return False
     return True
 
-def test_database_connection():
-    """Test database connection before starting the application"""
-    try:
-        import mysql.connector
-        from config import DB_CONFIG
-        
-        connection = mysql.connector.connect(**DB_CONFIG)
-        if connection.is_connected():
-            logging.info("Database connection successful")
-            connection.close()
-            return True
-        else:
-            messagebox.showerror(
-                "Database Connection Error",
-                "Could not connect to the database.\n\n"
-                "Please check your database configuration in config.py:\n"
-                "- Ensure MySQL server is running\n"
-                "- Verify host, username, and password\n"
-                "- Ensure the database 'bank_management' exists"
-            )
-            return False
-    except Exception as e:
-        logging.error(f"Database connection test failed: {e}")
-        messagebox.showerror(
-            "Database Error",
-            f"Database connection failed: {str(e)}\n\n"
-            "Please check your configuration and try again."
-        )
-        return False
-
 def initialize_database_if_needed():
-    """Initialize database and tables if they don't exist"""
+    """
+    Initialize database and tables if they don't exist
+    Runs on a background thread, so it reports errors instead of showing them.
+    Initialization opens the first connection itself, so a failed connection
+    surfaces here without a separate throwaway connection test
+    Returns:
+        tuple: (success, error title, error message)
+    """
     try:
         from database_init import initialize_database
         
@@ -97,11 +75,10 @@ def initialize_database_if_needed():
         
         if initialize_database():
             logging.info("✅ Database initialization completed successfully")
-            return True
+            return True, None, None
         else:
             logging.error("❌ Database initialization failed")
-            messagebox.showerror(
-                "Database Setup Error",
+            return False, "Database Setup Error", (
                 "Failed to initialize database and tables.\n\n"
                 "Please check:\n"
                 "- MySQL server is running\n"
@@ -109,22 +86,22 @@ def initialize_database_if_needed():
                 "- MySQL user has CREATE privileges\n"
                 "- No syntax errors in schema"
             )
-            return False
             
     except Exception as e:
         logging.error(f"Database setup failed: {e}")
-        messagebox.showerror(
-            "Database Setup Error",
+        return False, "Database Setup Error", (
             f"Database initialization error: {str(e)}\n\n"
             "Please check your MySQL configuration and permissions."
         )
-        return False
 
 class SimpleMainWindow:
     """Simple main window for Bank Management System"""
     
     def __init__(self):
         self.root = tk.Tk()
+        self.exit_code = 0
+        self.menu_buttons = []
+        self.database_events = queue.Queue()
         self.setup_window()
         self.create_interface()
     
@@ -175,7 +152,7 @@ class SimpleMainWindow:
         
         # Status bar
         self.status_var = tk.StringVar()
-        self.status_var.set("Ready - Database Connected")
+        self.status_var.set("Connecting to database...")
         status_bar = tk.Label(
             self.root, 
             textvariable=self.status_var, 
@@ -216,6 +193,11 @@ class SimpleMainWindow:
             )
             btn.grid(row=row, column=col, padx=20, pady=10, sticky="ew")
             
+            # Windows that need the database stay disabled until it is ready
+            if command not in (self.open_settings, self.exit_application):
+                btn.config(state=tk.DISABLED)
+                self.menu_buttons.append(btn)
+            
             # Button hover effects
             btn.bind("<Enter>", lambda e, b=btn: b.config(bg='#2980b9'))
             btn.bind("<Leave>", lambda e, b=btn: b.config(bg='#3498db'))
@@ -279,9 +261,41 @@ class SimpleMainWindow:
             self.root.quit()
             self.root.destroy()
     
+    def start_database_setup(self):
+        """Prepare the database on a worker thread once the window has been drawn"""
+        self.root.update_idletasks()
+        threading.Thread(
+            target=lambda: self.database_events.put(initialize_database_if_needed()),
+            name="database-setup",
+            daemon=True
+        ).start()
+        self.root.after(100, self.poll_database_setup)
+    
+    def poll_database_setup(self):
+        """Enable the menu when the database is ready, or report why it is not"""
+        try:
+            success, title, message = self.database_events.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self.poll_database_setup)
+            return
+        
+        if success:
+            for btn in self.menu_buttons:
+                btn.config(state=tk.NORMAL)
+            self.status_var.set("Ready - Database Connected")
+            logging.info("Application ready")
+        else:
+            self.status_var.set("Database unavailable")
+            messagebox.showerror(title, message)
+            self.exit_code = 1
+            self.root.quit()
+            self.root.destroy()
+    
     def run(self):
         """Start the application"""
+        self.root.after(0, self.start_database_setup)
         self.root.mainloop()
+        return self.exit_code
 
 def main():
     """Main application entry point"""
@@ -293,21 +307,13 @@ def main():
     if not check_dependencies():
         return 1
     
-    # Test database connection
-    if not test_database_connection():
-        return 1
-    
-    # Initialize database if needed
-    if not initialize_database_if_needed():
-        return 1
-    
     try:
-        # Create and run the main application
+        # Draw the main window first; the database is prepared once it is showing
         app = SimpleMainWindow()
         logging.info("Application started successfully")
-        app.run()
+        exit_code = app.run()
         logging.info("Application closed")
-        return 0
+        return exit_code
         
     except Exception as e:
         logging.error(f"Application error: {e}")
@@ -0,0 +1 @@
+# migrations/__init__.py
@@ -0,0 +1,493 @@
+"""
+Schema Migration Engine for Bank Management System
+Applies ordered, checksummed migrations from migrations/versions and records them in schema_migrations
+
+Usage:
+    python -m migrations.engine                    # apply pending online migrations
+    python -m migrations.engine --status
+    python -m migrations.engine --allow-offline    # also apply migrations that rebuild tables
+"""
+
+import mysql.connector
+from mysql.connector import Error, errorcode
+from config import DB_CONFIG
+import argparse
+import hashlib
+import importlib.util
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'versions')
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.py$')
+LOCK_NAME = 'schema_migrations'
+
+# Highest migration already reflected in DatabaseInitializer.get_required_tables().
+# A new install records migrations up to here as applied without running them.
+BASELINE_VERSION = 9
+
+LEDGER_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        execution_ms INT NOT NULL DEFAULT 0,
+        baselined BOOLEAN NOT NULL DEFAULT FALSE,
+        applied_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+# Errors MySQL raises when an ALTER cannot run with the requested algorithm
+UNSUPPORTED_ALGORITHM = (errorcode.ER_ALTER_OPERATION_NOT_SUPPORTED,
+                         errorcode.ER_ALTER_OPERATION_NOT_SUPPORTED_REASON)
+
+
+class MigrationError(Exception):
+    """A migration could not be verified or applied"""
+    pass
+
+
+class Migration:
+    """One migration file: NNNN_name.py with an upgrade(ops) function"""
+    
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path, 'rb') as f:
+            self.checksum = hashlib.sha256(f.read()).hexdigest()
+        self._module = None
+    
+    @property
+    def module(self):
+        """The migration module, loaded on first use"""
+        if self._module is None:
+            spec = importlib.util.spec_from_file_location(f"migrations.versions.m{self.version:04d}", self.path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            if not callable(getattr(module, 'upgrade', None)):
+                raise MigrationError(f"Migration {self.version:04d} has no upgrade(ops) function")
+            self._module = module
+        return self._module
+    
+    @property
+    def online(self):
+        """False for migrations that block writes, which only run with allow_offline"""
+        return getattr(self.module, 'ONLINE', True)
+    
+    @property
+    def depends_on(self):
+        """Versions this migration must run after even when they are offline, from DEPENDS_ON"""
+        return tuple(getattr(self.module, 'DEPENDS_ON', ()))
+    
+    @property
+    def description(self):
+        """First line of the migration's docstring"""
+        doc = (self.module.__doc__ or '').strip()
+        return doc.splitlines()[0] if doc else self.name
+
+
+def discover(directory=VERSIONS_DIR):
+    """
+    Find migration files in version order
+    Returns:
+        list: Migration objects
+    """
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f"Duplicate migration version {version:04d}: {filename}")
+        migrations[version] = Migration(version, match.group(2), os.path.join(directory, filename))
+    return [migrations[v] for v in sorted(migrations)]
+
+
+class SchemaOperations:
+    """
+    Idempotent DDL helpers handed to each migration's upgrade()
+    Every helper checks information_schema first, so a migration that failed
+    halfway can simply be run again. Index and column changes request
+    ALGORITHM=INPLACE, LOCK=NONE, so MySQL refuses instead of silently
+    falling back to a table copy that blocks writes.
+    """
+    
+    def __init__(self, connection, dry_run=False):
+        self.connection = connection
+        self.dry_run = dry_run
+        self.statements = []
+    
+    def execute(self, sql, params=None):
+        """
+        Run one statement, or only record it in dry-run mode
+        Returns:
+            int: Rows affected
+        """
+        self.statements.append(sql.strip())
+        if self.dry_run:
+            logger.info(f"[dry run] {sql.strip()}")
+            return 0
+        
+        cursor = self.connection.cursor()
+        cursor.execute(sql, params)
+        rowcount = cursor.rowcount
+        cursor.close()
+        return rowcount
+    
+    def _fetchone(self, query, params):
+        cursor = self.connection.cursor()
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+        cursor.close()
+        return row
+    
+    def scalar(self, query, params=None):
+        """Run a read-only query and return the first column of its first row (also in dry-run mode)"""
+        row = self._fetchone(query, params)
+        return row[0] if row else None
+    
+    def table_exists(self, table):
+        """Check whether a table exists"""
+        return self._fetchone("""
+            SELECT 1 FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """, (table,)) is not None
+    
+    def get_column(self, table, column):
+        """
+        Get a column's definition
+        Returns:
+            dict: column_type and nullable, or None if the column does not exist
+        """
+        row = self._fetchone("""
+            SELECT COLUMN_TYPE, IS_NULLABLE FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """, (table, column))
+        return {'column_type': row[0], 'nullable': row[1] == 'YES'} if row else None
+    
+    def column_exists(self, table, column):
+        """Check whether a column exists"""
+        return self.get_column(table, column) is not None
+    
+    def index_exists(self, table, index):
+        """Check whether an index exists"""
+        return self._fetchone("""
+            SELECT 1 FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1
+        """, (table, index)) is not None
+    
+    def foreign_key_exists(self, table, columns, ref_table):
+        """Check whether a foreign key on these columns to ref_table exists, whatever its name"""
+        row = self._fetchone("""
+            SELECT GROUP_CONCAT(COLUMN_NAME ORDER BY ORDINAL_POSITION) as fk_columns
+            FROM information_schema.KEY_COLUMN_USAGE
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND REFERENCED_TABLE_NAME = %s
+            GROUP BY CONSTRAINT_NAME
+            HAVING fk_columns = %s
+        """, (table, ref_table, ','.join(columns)))
+        return row is not None
+    
+    def alter_online(self, table, clause, algorithm='INPLACE', lock='NONE'):
+        """Run ALTER TABLE with an explicit algorithm and lock level"""
+        return self.execute(f"ALTER TABLE {table} {clause}, ALGORITHM={algorithm}, LOCK={lock}")
+    
+    def add_index(self, table, name, columns, unique=False):
+        """Build an index online unless it already exists"""
+        if self.index_exists(table, name):
+            return False
+        kind = 'UNIQUE INDEX' if unique else 'INDEX'
+        self.alter_online(table, f"ADD {kind} {name} ({', '.join(columns)})")
+        return True
+    
+    def drop_index(self, table, name):
+        """Drop an index online if it exists"""
+        if not self.index_exists(table, name):
+            return False
+        self.alter_online(table, f"DROP INDEX {name}")
+        return True
+    
+    def add_column(self, table, column, definition):
+        """
+        Add a column unless it already exists
+        Tries ALGORITHM=INSTANT first (metadata only), then INPLACE with LOCK=NONE
+        """
+        if self.column_exists(table, column):
+            return False
+        clause = f"ADD COLUMN {column} {definition}"
+        try:
+            self.execute(f"ALTER TABLE {table} {clause}, ALGORITHM=INSTANT")
+        except Error as e:
+            if e.errno not in UNSUPPORTED_ALGORITHM:
+                raise
+            self.alter_online(table, clause)
+        return True
+    
+    def modify_column(self, table, column, definition):
+        """Change a column definition online; callers check get_column() first to stay idempotent"""
+        return self.alter_online(table, f"MODIFY COLUMN {column} {definition}")
+    
+    def add_foreign_key(self, table, name, columns, ref_table, ref_columns,
+                        on_delete='RESTRICT', on_update='CASCADE'):
+        """
+        Add a foreign key unless an equivalent one exists
+        MySQL only builds foreign keys in place with foreign_key_checks off, so
+        existing rows are not validated: backfill and check them first
+        """
+        if self.foreign_key_exists(table, columns, ref_table):
+            return False
+        self.execute("SET SESSION foreign_key_checks = 0")
+        try:
+            self.alter_online(table, f"ADD CONSTRAINT {name} FOREIGN KEY ({', '.join(columns)}) "
+                                     f"REFERENCES {ref_table}({', '.join(ref_columns)}) "
+                                     f"ON DELETE {on_delete} ON UPDATE {on_update}")
+        finally:
+            self.execute("SET SESSION foreign_key_checks = 1")
+        return True
+    
+    def backfill(self, update_sql, batch_size=5000):
+        """
+        Run a single-table UPDATE in committed batches so no long lock is held
+        The WHERE clause must exclude rows already updated
+        Returns:
+            int: Rows updated
+        """
+        total = 0
+        while True:
+            updated = self.execute(f"{update_sql.strip()} LIMIT {int(batch_size)}")
+            if self.dry_run:
+                return 0
+            self.connection.commit()
+            total += updated
+            if updated < batch_size:
+                return total
+
+
+class MigrationEngine:
+    """Verifies the migration ledger and applies pending migrations in order"""
+    
+    def __init__(self, connection=None, directory=VERSIONS_DIR):
+        self.connection = connection
+        # A connection handed in by the caller is left open for the caller to close
+        self.owns_connection = connection is None
+        self.directory = directory
+    
+    def get_connection(self):
+        """Get database connection"""
+        try:
+            if self.connection is None or not self.connection.is_connected():
+                self.connection = mysql.connector.connect(**DB_CONFIG)
+            return self.connection
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+    
+    def close_connection(self):
+        """Close database connection"""
+        if self.owns_connection and self.connection and self.connection.is_connected():
+            self.connection.close()
+    
+    def ensure_ledger(self):
+        """Create the schema_migrations table if missing"""
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        cursor.execute(LEDGER_DDL)
+        cursor.close()
+    
+    def get_applied(self):
+        """
+        Get applied migrations from the ledger
+        Returns:
+            dict: Ledger rows keyed by version
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT version, name, checksum, baselined, applied_date FROM schema_migrations")
+        applied = {row['version']: row for row in cursor.fetchall()}
+        cursor.close()
+        return applied
+    
+    def verify(self, migrations, applied):
+        """
+        Check applied migrations against the files on disk
+        Raises MigrationError when an applied migration file was edited
+        """
+        on_disk = {m.version: m for m in migrations}
+        changed = [f"{v:04d}_{row['name']}" for v, row in sorted(applied.items())
+                   if v in on_disk and on_disk[v].checksum != row['checksum']]
+        if changed:
+            raise MigrationError(f"Applied migrations were modified: {', '.join(changed)}. "
+                                 f"Add a new migration instead of editing an applied one")
+        
+        for version in sorted(set(applied) - set(on_disk)):
+            logger.warning(f"Applied migration {version:04d} has no file in {self.directory}")
+    
+    def _record(self, migration, execution_ms=0, baselined=False):
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        cursor.execute("""
+            INSERT IGNORE INTO schema_migrations (version, name, checksum, execution_ms, baselined)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (migration.version, migration.name, migration.checksum, execution_ms, baselined))
+        connection.commit()
+        cursor.close()
+    
+    def _acquire_lock(self):
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (LOCK_NAME,))
+        acquired = cursor.fetchone()[0] == 1
+        cursor.close()
+        if not acquired:
+            raise MigrationError("Another migration run is in progress")
+    
+    def _release_lock(self):
+        cursor = self.get_connection().cursor()
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        cursor.fetchone()
+        cursor.close()
+    
+    def baseline(self, version=BASELINE_VERSION):
+        """
+        Mark migrations up to version as applied without running them
+        Used right after the tables were created from the current DDL
+        Returns:
+            int: Number of migrations recorded
+        """
+        self.ensure_ledger()
+        applied = self.get_applied()
+        recorded = 0
+        for migration in discover(self.directory):
+            if migration.version <= version and migration.version not in applied:
+                self._record(migration, baselined=True)
+                recorded += 1
+        
+        if recorded:
+            logger.info(f"Schema baselined at version {version:04d}")
+        return recorded
+    
+    def migrate(self, target=None, allow_offline=False, dry_run=False):
+        """
+        Apply pending migrations in version order
+        Offline migrations are skipped unless allow_offline is set; later online
+        migrations still run unless they list a skipped version in DEPENDS_ON
+        Args:
+            target (int): Highest version to apply (default: all)
+            allow_offline (bool): Also run migrations that block writes
+            dry_run (bool): Log the statements without running them
+        Returns:
+            dict: Applied versions, the first version blocked on, if any, and every
+                  version skipped with it
+        """
+        summary = {"applied": [], "blocked": None, "skipped": [], "statements": []}
+        
+        self.ensure_ledger()
+        self._acquire_lock()
+        try:
+            migrations = discover(self.directory)
+            applied = self.get_applied()
+            self.verify(migrations, applied)
+            
+            for migration in migrations:
+                if migration.version in applied or (target is not None and migration.version > target):
+                    continue
+                
+                waits_on = [v for v in migration.depends_on if v in summary['skipped']]
+                if waits_on:
+                    summary['skipped'].append(migration.version)
+                    logger.warning(f"Migration {migration.version:04d} ({migration.description}) waits for "
+                                   f"{', '.join(f'{v:04d}' for v in waits_on)}")
+                    continue
+                
+                if not migration.online and not allow_offline:
+                    summary['blocked'] = summary['blocked'] or migration.version
+                    summary['skipped'].append(migration.version)
+                    logger.warning(f"Migration {migration.version:04d} ({migration.description}) blocks writes; "
+                                   f"run 'python -m migrations.engine --allow-offline' in a maintenance window")
+                    continue
+                
+                logger.info(f"Applying migration {migration.version:04d}: {migration.description}")
+                ops = SchemaOperations(self.get_connection(), dry_run)
+                started = time.time()
+                
+                try:
+                    migration.module.upgrade(ops)
+                except Error as e:
+                    raise MigrationError(f"Migration {migration.version:04d} failed: {e}") from e
+                
+                summary['statements'].extend(ops.statements)
+                if not dry_run:
+                    self._record(migration, int((time.time() - started) * 1000))
+                summary['applied'].append(migration.version)
+        
+        finally:
+            self._release_lock()
+        
+        if summary['applied']:
+            logger.info(f"Applied migrations: {', '.join(f'{v:04d}' for v in summary['applied'])}")
+        return summary
+    
+    def status(self):
+        """
+        Get every migration with its state
+        Returns:
+            list: Dicts with version, name, description, online and state
+        """
+        self.ensure_ledger()
+        applied = self.get_applied()
+        rows = []
+        for migration in discover(self.directory):
+            row = applied.get(migration.version)
+            if row is None:
+                state = 'pending'
+            elif row['checksum'] != migration.checksum:
+                state = 'modified'
+            else:
+                state = 'baselined' if row['baselined'] else 'applied'
+            rows.append({'version': migration.version, 'name': migration.name,
+                         'description': migration.description, 'online': migration.online, 'state': state})
+        return rows
+    
+    def __del__(self):
+        """Destructor to ensure connection is closed"""
+        self.close_connection()
+
+
+def main():
+    """Command line entry point for schema migrations"""
+    parser = argparse.ArgumentParser(description='Apply schema migrations')
+    parser.add_argument('--status', action='store_true', help='List migrations and their state')
+    parser.add_argument('--target', type=int, help='Highest version to apply')
+    parser.add_argument('--allow-offline', action='store_true', help='Also apply migrations that block writes')
+    parser.add_argument('--dry-run', action='store_true', help='Log statements without running them')
+    parser.add_argument('--baseline', type=int, metavar='VERSION',
+                        help='Mark migrations up to VERSION as applied without running them')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    engine = MigrationEngine()
+    if args.status:
+        for row in engine.status():
+            mode = 'online' if row['online'] else 'OFFLINE'
+            print(f"{row['version']:04d}  {row['state']:<10}{mode:<9}{row['description']}")
+        return 0
+    
+    if args.baseline is not None:
+        engine.baseline(args.baseline)
+        return 0
+    
+    try:
+        summary = engine.migrate(args.target, args.allow_offline, args.dry_run)
+    except MigrationError as e:
+        logger.error(str(e))
+        return 1
+    return 2 if summary['blocked'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
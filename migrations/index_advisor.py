@@ -0,0 +1,499 @@
+"""
+Index Advisor for Bank Management System
+Explains the application's real queries, flags full scans and filesorts, and proposes composite indexes
+
+Usage:
+    python -m migrations.index_advisor                          # top statements from performance_schema
+    python -m migrations.index_advisor --sql-file workload.sql  # statements captured with QueryRecorder
+    python -m migrations.index_advisor --write                  # also emit the proposals as a migration
+
+Capturing a workload in-process:
+    with QueryRecorder() as recorder:
+        Account().get_all_accounts()
+    recorder.save('workload.sql')
+"""
+
+import mysql.connector
+from mysql.connector import Error
+from config import DB_CONFIG
+from migrations.engine import VERSIONS_DIR, discover
+from datetime import date
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Statements EXPLAIN can analyze
+ANALYZABLE = re.compile(r'^\s*(SELECT|WITH|UPDATE|DELETE)\b', re.IGNORECASE)
+
+# Access types that read the whole table or the whole index
+SCAN_ACCESS_TYPES = ('ALL', 'index')
+REF_ACCESS_TYPES = ('ref', 'eq_ref', 'ref_or_null')
+
+# Column references in EXPLAIN's attached_condition look like `db`.`alias`.`column`
+COLUMN_REF = r"`\w+`\.`(?P<alias>\w+)`\.`(?P<column>\w+)`"
+PREDICATE = re.compile(COLUMN_REF + r"\s*(?P<op><=>|>=|<=|<>|!=|=|<|>|between\b|in\b|like\s+'(?P<wild>%)?)",
+                       re.IGNORECASE)
+REVERSED_PREDICATE = re.compile(r"(?P<op><=>|>=|<=|<>|!=|=|<|>)\s*" + COLUMN_REF)
+RANGE_OPERATORS = ('>=', '<=', '<', '>', 'between', 'like')
+
+TABLE_REF = re.compile(
+    r"\b(?:FROM|JOIN|UPDATE)\s+`?(\w+)`?"
+    r"(?:\s+(?:AS\s+)?(?!(?:ON|WHERE|LEFT|RIGHT|INNER|JOIN|GROUP|ORDER|LIMIT|USING|CROSS|SET|FOR)\b)(\w+))?",
+    re.IGNORECASE
+)
+ORDER_BY = re.compile(r"\bORDER\s+BY\s+(.+?)(?=\s+LIMIT\b|\s+FOR\s+UPDATE\b|\)|$)", re.IGNORECASE)
+SORT_TERM = re.compile(r"^(?:`?(\w+)`?\.)?`?(\w+)`?(?:\s+(?:ASC|DESC))?$", re.IGNORECASE)
+
+MAX_INDEX_COLUMNS = 5
+
+
+def normalize(sql):
+    """Collapse literals and whitespace so repeated statements group together"""
+    sql = re.sub(r"'(?:[^'\\]|\\.)*'", '?', sql)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", '?', sql)
+    sql = re.sub(r"\(\s*\?(?:\s*,\s*\?)+\s*\)", '(?+)', sql)
+    return re.sub(r"\s+", ' ', sql).strip()
+
+
+def plan_tables(plan):
+    """
+    Flatten an EXPLAIN FORMAT=JSON plan into its table accesses
+    Returns:
+        list: (table node, filesort) pairs; filesort marks the table a sort is charged to
+    """
+    tables = []
+    
+    def visit(node, filesort):
+        if isinstance(node, list):
+            # Only the first table of a join feeds the sort
+            for i, item in enumerate(node):
+                visit(item, filesort and i == 0)
+            return
+        if not isinstance(node, dict):
+            return
+        
+        filesort = filesort or bool(node.get('using_filesort'))
+        table = node.get('table')
+        if isinstance(table, dict) and 'table_name' in table:
+            tables.append((table, filesort))
+            visit({k: v for k, v in table.items() if isinstance(v, (dict, list))}, False)
+            filesort = False
+        
+        for key, value in node.items():
+            if key != 'table' and isinstance(value, (dict, list)):
+                visit(value, filesort)
+    
+    visit(plan, False)
+    return tables
+
+
+def condition_columns(condition, alias):
+    """
+    Split an attached_condition into indexable columns of one table
+    Returns:
+        tuple: (equality columns, range columns) in order of appearance
+    """
+    equality, ranges = [], []
+    if not condition:
+        return equality, ranges
+    
+    for match in PREDICATE.finditer(condition):
+        if match.group('alias') != alias:
+            continue
+        op = match.group('op').lower().split()[0]
+        column = match.group('column')
+        if op in ('=', '<=>', 'in'):
+            equality.append(column)
+        elif op == 'like' and match.group('wild'):
+            continue
+        elif op in RANGE_OPERATORS:
+            ranges.append(column)
+    
+    for match in REVERSED_PREDICATE.finditer(condition):
+        if match.group('alias') != alias:
+            continue
+        op = match.group('op')
+        if op in ('=', '<=>'):
+            equality.append(match.group('column'))
+        elif op in RANGE_OPERATORS:
+            ranges.append(match.group('column'))
+    
+    unique = lambda columns: list(dict.fromkeys(columns))
+    return unique(equality), [c for c in unique(ranges) if c not in equality]
+
+
+def table_aliases(sql):
+    """Map each alias in a statement's FROM/JOIN/UPDATE clauses to its table"""
+    aliases = {}
+    for table, alias in TABLE_REF.findall(sql):
+        aliases[alias or table] = table
+        aliases.setdefault(table, table)
+    return aliases
+
+
+def sort_columns(sql):
+    """
+    Get the columns of a statement's last ORDER BY
+    Returns:
+        list: (alias or None, column) pairs, or [] if any term is an expression
+    """
+    matches = ORDER_BY.findall(re.sub(r"\s+", ' ', sql))
+    if not matches:
+        return []
+    
+    columns = []
+    for term in matches[-1].split(','):
+        match = SORT_TERM.match(term.strip())
+        if not match:
+            return []
+        columns.append((match.group(1), match.group(2)))
+    return columns
+
+
+class QueryRecorder:
+    """
+    Records the SQL every mysql.connector cursor executes while active
+    Use around a representative workload, then save() for the advisor
+    """
+    
+    def __init__(self):
+        self.statements = []
+        self._originals = {}
+        self._lock = threading.Lock()
+    
+    def _cursor_classes(self):
+        from mysql.connector import cursor
+        classes = [cursor.MySQLCursor]
+        try:
+            from mysql.connector import cursor_cext
+            classes.append(cursor_cext.CMySQLCursor)
+        except ImportError:
+            pass
+        return classes
+    
+    def record(self, statement):
+        """Keep a statement if EXPLAIN can analyze it"""
+        if isinstance(statement, bytes):
+            statement = statement.decode('utf-8', 'replace')
+        if statement and ANALYZABLE.match(statement):
+            with self._lock:
+                self.statements.append(statement.strip())
+    
+    def __enter__(self):
+        recorder = self
+        for cls in self._cursor_classes():
+            original = cls.execute
+            self._originals[cls] = original
+            
+            def execute(cursor, operation, params=None, *args, _original=original, **kwargs):
+                result = _original(cursor, operation, params, *args, **kwargs)
+                recorder.record(cursor.statement or operation)
+                return result
+            
+            cls.execute = execute
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        for cls, original in self._originals.items():
+            cls.execute = original
+        self._originals = {}
+        return False
+    
+    def save(self, path):
+        """Write the recorded statements to a file, one per line ending in ';'"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for statement in self.statements:
+                f.write(re.sub(r"\s+", ' ', statement) + ";\n")
+
+
+def read_sql_file(path):
+    """Read statements separated by ';' at the end of a line"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    return [s.strip() for s in re.split(r";\s*$", text, flags=re.MULTILINE) if ANALYZABLE.match(s)]
+
+
+class IndexAdvisor:
+    """Runs EXPLAIN over a query mix and turns scans and filesorts into index proposals"""
+    
+    def __init__(self, min_rows=100):
+        self.connection = None
+        self.min_rows = min_rows
+        self._columns = None
+        self._indexes = None
+    
+    def get_connection(self):
+        """Get database connection"""
+        try:
+            if self.connection is None or not self.connection.is_connected():
+                self.connection = mysql.connector.connect(**DB_CONFIG)
+            return self.connection
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+    
+    def close_connection(self):
+        """Close database connection"""
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+    
+    def collect_from_performance_schema(self, limit=50):
+        """
+        Get the most expensive statements the server has seen for this schema
+        Returns:
+            list: Dicts with sql, calls and seconds
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        cursor.execute("""
+            SELECT QUERY_SAMPLE_TEXT, COUNT_STAR, SUM_TIMER_WAIT / 1000000000000
+            FROM performance_schema.events_statements_summary_by_digest
+            WHERE SCHEMA_NAME = DATABASE() AND QUERY_SAMPLE_TEXT IS NOT NULL
+            ORDER BY SUM_TIMER_WAIT DESC
+            LIMIT %s
+        """, (limit * 4,))
+        
+        statements = [
+            {'sql': sql, 'calls': int(calls), 'seconds': float(seconds)}
+            for sql, calls, seconds in cursor.fetchall()
+            if ANALYZABLE.match(sql) and not sql.endswith('...')
+        ]
+        cursor.close()
+        return statements[:limit]
+    
+    @staticmethod
+    def group_statements(statements):
+        """
+        Group raw statements by normalized text
+        Returns:
+            list: Dicts with sql (one sample), calls and seconds
+        """
+        grouped = {}
+        for statement in statements:
+            if isinstance(statement, str):
+                statement = {'sql': statement, 'calls': 1, 'seconds': 0.0}
+            key = normalize(statement['sql'])
+            entry = grouped.setdefault(key, {'sql': statement['sql'], 'calls': 0, 'seconds': 0.0})
+            entry['calls'] += statement['calls']
+            entry['seconds'] += statement['seconds']
+        return sorted(grouped.values(), key=lambda s: (s['seconds'], s['calls']), reverse=True)
+    
+    def _load_schema(self):
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        cursor.execute("""
+            SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+        """)
+        self._columns = {}
+        for table, column in cursor.fetchall():
+            self._columns.setdefault(table, set()).add(column)
+        
+        cursor.execute("""
+            SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE()
+            ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+        """)
+        indexes = {}
+        for table, index, column in cursor.fetchall():
+            indexes.setdefault(table, {}).setdefault(index, []).append(column)
+        self._indexes = {table: [tuple(cols) for cols in by_name.values()] for table, by_name in indexes.items()}
+        cursor.close()
+    
+    def is_covered(self, table, columns):
+        """Check whether an existing index already starts with these columns"""
+        columns = tuple(columns)
+        return any(index[:len(columns)] == columns for index in self._indexes.get(table, []))
+    
+    def explain(self, sql):
+        """
+        Run EXPLAIN FORMAT=JSON on a statement
+        Returns:
+            dict: Parsed plan, or None if the statement cannot be explained
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        try:
+            cursor.execute("EXPLAIN FORMAT=JSON " + sql)
+            return json.loads(cursor.fetchone()[0])
+        except Error as e:
+            logger.debug(f"Cannot explain statement: {e}")
+            return None
+        finally:
+            cursor.close()
+    
+    def propose(self, sql, alias, node, filesort):
+        """
+        Build a composite index for one flagged table access
+        Columns follow equality, then sort, then range order, so the index
+        both narrows the scan and returns rows already sorted
+        Returns:
+            tuple: (table, columns) or None
+        """
+        table = table_aliases(sql).get(alias, alias)
+        known = self._columns.get(table)
+        if not known:
+            return None
+        
+        equality, ranges = condition_columns(node.get('attached_condition'), alias)
+        # Equality matched through an index lookup does not appear in attached_condition
+        if node.get('access_type') in REF_ACCESS_TYPES:
+            equality = node.get('used_key_parts', []) + equality
+        columns = list(dict.fromkeys(c for c in equality if c in known))
+        
+        if filesort:
+            order = sort_columns(sql)
+            single_table = len(set(table_aliases(sql).values())) == 1
+            if order and all((a == alias) or (a is None and single_table) for a, _ in order):
+                columns += [c for _, c in order if c in known and c not in columns]
+        else:
+            columns += [c for c in ranges[:1] if c in known]
+        
+        columns = columns[:MAX_INDEX_COLUMNS]
+        if not columns or self.is_covered(table, columns):
+            return None
+        return table, tuple(columns)
+    
+    def analyze(self, statements):
+        """
+        Explain each distinct statement and collect findings and index proposals
+        Args:
+            statements (list): SQL strings or dicts with sql, calls and seconds
+        Returns:
+            dict: 'findings' per flagged table access and 'proposals' per index
+        """
+        self._load_schema()
+        findings, proposals = [], {}
+        
+        for statement in self.group_statements(statements):
+            plan = self.explain(statement['sql'])
+            if plan is None:
+                continue
+            
+            for node, filesort in plan_tables(plan):
+                alias = node['table_name']
+                rows = node.get('rows_examined_per_scan', 0)
+                scan = node.get('access_type') in SCAN_ACCESS_TYPES and rows >= self.min_rows
+                if not (scan or filesort) or alias.startswith('<'):
+                    continue
+                
+                finding = {
+                    'sql': normalize(statement['sql']), 'calls': statement['calls'],
+                    'seconds': statement['seconds'], 'table': alias,
+                    'access_type': node.get('access_type'), 'rows': rows,
+                    'key': node.get('key'), 'filesort': filesort, 'proposal': None
+                }
+                
+                proposal = self.propose(statement['sql'], alias, node, filesort)
+                if proposal:
+                    finding['proposal'] = proposal
+                    entry = proposals.setdefault(proposal, {'table': proposal[0], 'columns': proposal[1],
+                                                            'calls': 0, 'seconds': 0.0, 'queries': []})
+                    entry['calls'] += statement['calls']
+                    entry['seconds'] += statement['seconds']
+                    entry['queries'].append(finding['sql'])
+                findings.append(finding)
+        
+        return {'findings': findings, 'proposals': self.merge_prefixes(proposals)}
+    
+    @staticmethod
+    def merge_prefixes(proposals):
+        """Fold proposals that are a prefix of a longer one on the same table into it"""
+        merged = []
+        ordered = sorted(proposals.values(), key=lambda p: len(p['columns']), reverse=True)
+        for proposal in ordered:
+            longer = next((m for m in merged if m['table'] == proposal['table']
+                           and m['columns'][:len(proposal['columns'])] == proposal['columns']), None)
+            if longer:
+                longer['calls'] += proposal['calls']
+                longer['seconds'] += proposal['seconds']
+                longer['queries'].extend(proposal['queries'])
+            else:
+                merged.append(proposal)
+        return sorted(merged, key=lambda p: (p['seconds'], p['calls']), reverse=True)
+    
+    def __del__(self):
+        """Destructor to ensure connection is closed"""
+        self.close_connection()
+
+
+def index_name(table, columns):
+    """Index name within MySQL's 64 character limit"""
+    return f"idx_{table}_{'_'.join(columns)}"[:64]
+
+
+def write_migration(proposals, statement_count, directory=VERSIONS_DIR):
+    """
+    Emit the proposals as the next migration file
+    Returns:
+        str: Path of the migration written
+    """
+    migrations = discover(directory)
+    version = migrations[-1].version + 1 if migrations else 1
+    path = os.path.join(directory, f"{version:04d}_advisor_indexes_{date.today():%Y%m%d}.py")
+    
+    lines = [
+        '"""',
+        'Add indexes proposed by the index advisor',
+        f'Generated on {date.today():%Y-%m-%d} from {statement_count} captured statements; review before applying',
+        '"""',
+        '',
+        '',
+        'def upgrade(ops):'
+    ]
+    for proposal in proposals:
+        lines.append(f"    # {proposal['calls']} calls, {proposal['seconds']:.2f}s: {proposal['queries'][0][:90]}")
+        lines.append(f"    ops.add_index('{proposal['table']}', '{index_name(proposal['table'], proposal['columns'])}', "
+                     f"{list(proposal['columns'])!r})")
+    
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return path
+
+
+def main():
+    """Command line entry point for the index advisor"""
+    parser = argparse.ArgumentParser(description='Propose indexes for the application query mix')
+    parser.add_argument('--sql-file', help='Statements to analyze instead of performance_schema')
+    parser.add_argument('--limit', type=int, default=50, help='Statements to take from performance_schema')
+    parser.add_argument('--min-rows', type=int, default=100, help='Ignore scans of smaller tables')
+    parser.add_argument('--write', action='store_true', help='Emit the proposals as a migration file')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    advisor = IndexAdvisor(min_rows=args.min_rows)
+    if args.sql_file:
+        statements = read_sql_file(args.sql_file)
+    else:
+        statements = advisor.collect_from_performance_schema(args.limit)
+    
+    result = advisor.analyze(statements)
+    
+    for finding in result['findings']:
+        problems = []
+        if finding['access_type'] in SCAN_ACCESS_TYPES:
+            problems.append(f"{finding['access_type']} scan of ~{finding['rows']} rows")
+        if finding['filesort']:
+            problems.append('filesort')
+        print(f"{finding['table']:<12}{', '.join(problems):<36}{finding['sql'][:100]}")
+    
+    print()
+    for proposal in result['proposals']:
+        print(f"{index_name(proposal['table'], proposal['columns'])}: "
+              f"{proposal['table']} ({', '.join(proposal['columns'])}) - {len(proposal['queries'])} queries")
+    
+    if args.write and result['proposals']:
+        path = write_migration(result['proposals'], len(statements))
+        logger.info(f"Wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
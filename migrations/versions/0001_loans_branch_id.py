@@ -0,0 +1,23 @@
+"""
+Add branch_id and the keyset paging indexes to loans
+Installs created before loans carried a branch are backfilled from the borrower's branch
+"""
+
+
+def upgrade(ops):
+    ops.add_column('loans', 'branch_id', 'INT NULL AFTER customer_id')
+    ops.backfill("""
+        UPDATE loans
+        SET branch_id = (SELECT c.branch_id FROM customers c WHERE c.customer_id = loans.customer_id)
+        WHERE branch_id IS NULL
+    """)
+    
+    if ops.get_column('loans', 'branch_id')['nullable']:
+        ops.modify_column('loans', 'branch_id', 'INT NOT NULL')
+    ops.add_foreign_key('loans', 'fk_loans_branch', ['branch_id'], 'branches', ['branch_id'])
+    
+    ops.add_index('loans', 'idx_loan_status_date', ['status', 'application_date'])
+    ops.add_index('loans', 'idx_loan_branch_status', ['branch_id', 'status', 'application_date'])
+    ops.add_index('loans', 'idx_loan_application_date', ['application_date'])
+    # Leading column of idx_loan_status_date
+    ops.drop_index('loans', 'idx_loan_status')
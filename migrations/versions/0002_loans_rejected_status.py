@@ -0,0 +1,11 @@
+"""
+Allow REJECTED as a loan status
+Appending an ENUM member only changes table metadata
+"""
+
+LOAN_STATUS = "ENUM('APPLIED', 'APPROVED', 'DISBURSED', 'CLOSED', 'DEFAULTED', 'REJECTED') DEFAULT 'APPLIED'"
+
+
+def upgrade(ops):
+    if "'REJECTED'" not in ops.get_column('loans', 'status')['column_type']:
+        ops.modify_column('loans', 'status', LOAN_STATUS)
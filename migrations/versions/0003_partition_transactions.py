@@ -0,0 +1,16 @@
+"""
+Partition transactions by month
+Rebuilds the table and drops its foreign keys, so it needs a maintenance window
+"""
+
+from models.partition_manager import TransactionPartitionManager
+
+ONLINE = False
+
+
+def upgrade(ops):
+    if ops.dry_run:
+        ops.statements.append("-- TransactionPartitionManager.convert()")
+        return
+    
+    TransactionPartitionManager(connection=ops.connection).convert()
@@ -0,0 +1,14 @@
+"""
+Add composite indexes for the listing and statement queries
+Account and customer lists sort without an index, and statements filter transactions by account and date
+"""
+
+
+def upgrade(ops):
+    ops.add_index('accounts', 'idx_account_created', ['created_date'])
+    ops.add_index('customers', 'idx_customer_created', ['created_date'])
+    ops.add_index('customers', 'idx_customer_status_name', ['status', 'first_name', 'last_name'])
+    
+    ops.add_index('transactions', 'idx_transaction_account_date', ['account_id', 'transaction_date'])
+    # Leading column of idx_transaction_account_date
+    ops.drop_index('transactions', 'idx_transaction_account')
@@ -0,0 +1,19 @@
+"""
+Add the idempotency_keys table
+Deposits, withdrawals and transfers record the key a caller sends so a retry returns the first result
+"""
+
+
+def upgrade(ops):
+    if not ops.table_exists('idempotency_keys'):
+        ops.execute("""
+            CREATE TABLE idempotency_keys (
+                idempotency_key VARCHAR(64) NOT NULL,
+                request_fingerprint VARCHAR(100) NOT NULL,
+                transaction_number VARCHAR(20) NULL,
+                response TEXT NULL,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (idempotency_key),
+                INDEX idx_idempotency_created (created_date)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """)
@@ -0,0 +1,35 @@
+"""
+Add the transaction_references table and a unique key on transaction numbers
+Partitioning dropped UNIQUE(transaction_number); postings now claim each number in transaction_references
+"""
+
+BATCH_SIZE = 50000
+
+
+def upgrade(ops):
+    if not ops.table_exists('transaction_references'):
+        ops.execute("""
+            CREATE TABLE transaction_references (
+                transaction_number VARCHAR(20) NOT NULL,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (transaction_number)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """)
+    
+    # Copy existing numbers in committed transaction_id ranges; IGNORE skips numbers
+    # already claimed by postings made since the table was created
+    last_id = ops.scalar("SELECT COALESCE(MAX(transaction_id), 0) FROM transactions")
+    for start in range(0, last_id, BATCH_SIZE):
+        ops.execute("""
+            INSERT IGNORE INTO transaction_references (transaction_number)
+            SELECT transaction_number FROM transactions
+            WHERE transaction_id > %s AND transaction_id <= %s
+        """, (start, start + BATCH_SIZE))
+        if not ops.dry_run:
+            ops.connection.commit()
+    
+    # A partitioned table only allows unique keys that include transaction_date
+    ops.add_index('transactions', 'idx_transaction_number_date', ['transaction_number', 'transaction_date'],
+                  unique=True)
+    # Leading column of idx_transaction_number_date
+    ops.drop_index('transactions', 'idx_transaction_number')
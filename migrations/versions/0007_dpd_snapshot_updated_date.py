@@ -0,0 +1,9 @@
+"""
+Add updated_date to loan_dpd_snapshots
+Re-running a day's snapshot updates rows in place, which created_date never shows, so cached reports went stale
+"""
+
+
+def upgrade(ops):
+    ops.add_column('loan_dpd_snapshots', 'updated_date',
+                   'TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP')
@@ -0,0 +1,8 @@
+"""
+Index loan_payments by reference_number
+Daily limit totals leave out the withdrawals a loan payment points at, looked up by reference
+"""
+
+
+def upgrade(ops):
+    ops.add_index('loan_payments', 'idx_payment_reference', ['reference_number'])
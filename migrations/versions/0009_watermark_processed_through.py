@@ -0,0 +1,15 @@
+"""
+Add processed_through to rollup_watermarks for jobs that advance one day at a time
+Balance snapshots resumed from MAX(snapshot_date), so days without transactions were rebuilt on every run
+"""
+
+
+def upgrade(ops):
+    ops.add_column('rollup_watermarks', 'processed_through', 'DATE NULL')
+    
+    # Resume the snapshot job where its snapshots end instead of from the first transaction
+    ops.execute("""
+        INSERT IGNORE INTO rollup_watermarks (rollup_name, processed_through)
+        SELECT 'account_balance_snapshots', MAX(snapshot_date) FROM account_balance_snapshots
+        HAVING MAX(snapshot_date) IS NOT NULL
+    """)
@@ -6,7 +6,10 @@ Handles all account-related database operations
 import mysql.connector
 from mysql.connector import Error
 from config import DB_CONFIG
-from datetime import datetime
+from models.balance_snapshot import SIGNED_AMOUNT_SQL
+from models.database import get_pooled_connection
+from datetime import datetime, time, timedelta
+from decimal import Decimal
 import logging
 import random
 import string
@@ -211,6 +214,32 @@ class Account:
             logger.error(f"Error fetching account: {e}")
             return None
     
+    def get_account_by_number(self, account_number):
+        """Get account details by account number"""
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor(dictionary=True)
+            
+            query = """
+            SELECT
+                a.*,
+                c.first_name, c.last_name,
+                CONCAT(c.first_name, ' ', c.last_name) as customer_name,
+                c.phone
+            FROM accounts a
+            LEFT JOIN customers c ON a.customer_id = c.customer_id
+            WHERE a.account_number = %s
+            """
+            
+            cursor.execute(query, (account_number.strip(),))
+            account = cursor.fetchone()
+            cursor.close()
+            return account
+        
+        except Error as e:
+            logger.error(f"Error fetching account {account_number}: {e}")
+            return None
+    
     def update_account_status(self, account_id, status):
         """Update account status (ACTIVE/INACTIVE/CLOSED)"""
         connection = None
@@ -259,6 +288,107 @@ class Account:
             if connection and connection.is_connected():
                 connection.close()
     
+    def get_account_ids(self, account_numbers):
+        """
+        Resolve account numbers to IDs in one query
+        Args:
+            account_numbers (iterable): Account numbers
+        Returns:
+            dict: account_number -> account_id for the numbers that exist
+        """
+        account_numbers = sorted({str(n).strip() for n in account_numbers if n})
+        if not account_numbers:
+            return {}
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            
+            placeholders = ", ".join(["%s"] * len(account_numbers))
+            cursor.execute(
+                f"SELECT account_number, account_id FROM accounts WHERE account_number IN ({placeholders})",
+                account_numbers
+            )
+            result = dict(cursor.fetchall())
+            cursor.close()
+            return result
+        
+        except Error as e:
+            logger.error(f"Error resolving account numbers: {e}")
+            return {}
+    
+    def update_statuses(self, updates, batch_size=1000):
+        """
+        Change the status of many accounts, committing once per batch
+        Args:
+            updates (iterable): (account_id, status) pairs
+            batch_size (int): Updates per commit
+        Returns:
+            dict: Updated and failed counts with per-update results; an account
+                that does not exist fails on its own, a database error fails every
+                update in its batch
+        """
+        summary = {"updated": 0, "failed": 0, "results": []}
+        updates = list(updates)
+        
+        connection = get_pooled_connection()
+        cursor = connection.cursor()
+        
+        try:
+            for start in range(0, len(updates), batch_size):
+                chunk = updates[start:start + batch_size]
+                
+                try:
+                    connection.start_transaction()
+                    # Lock the accounts that exist, so each update's outcome is known
+                    # without relying on the UPDATE's affected-row count
+                    account_ids = sorted({account_id for account_id, _ in chunk})
+                    placeholders = ", ".join(["%s"] * len(account_ids))
+                    cursor.execute(f"""
+                        SELECT account_id FROM accounts WHERE account_id IN ({placeholders}) FOR UPDATE
+                    """, account_ids)
+                    found = {row[0] for row in cursor.fetchall()}
+                    
+                    # One UPDATE per status instead of one per account
+                    by_status = {}
+                    for account_id, status in chunk:
+                        if account_id in found:
+                            by_status.setdefault(status, []).append(account_id)
+                    
+                    now = datetime.now()
+                    for status, account_ids in by_status.items():
+                        placeholders = ", ".join(["%s"] * len(account_ids))
+                        closing = ", closing_date = %s" if status == 'CLOSED' else ""
+                        params = [status, now] + ([now.date()] if status == 'CLOSED' else []) + account_ids
+                        cursor.execute(f"""
+                            UPDATE accounts SET status = %s, updated_date = %s{closing}
+                            WHERE account_id IN ({placeholders})
+                        """, params)
+                    connection.commit()
+                    
+                    results = [{"success": True} if account_id in found
+                               else {"success": False, "message": f"Account {account_id} not found"}
+                               for account_id, _ in chunk]
+                    updated = sum(1 for r in results if r['success'])
+                    summary['updated'] += updated
+                    summary['failed'] += len(chunk) - updated
+                    summary['results'].extend(results)
+                
+                except Error as e:
+                    connection.rollback()
+                    logger.error(f"Account status batch failed: {e}")
+                    summary['failed'] += len(chunk)
+                    summary['results'].extend({"success": False, "message": f"Batch failed: {str(e)}"}
+                                              for _ in chunk)
+            
+            cursor.close()
+        
+        finally:
+            # Returns the connection to the pool
+            connection.close()
+        
+        logger.info(f"Account status batch complete - Updated: {summary['updated']}, Failed: {summary['failed']}")
+        return summary
+    
     def get_account_balance(self, account_id):
         """Get current account balance"""
         try:
@@ -276,6 +406,73 @@ class Account:
             logger.error(f"Error fetching account balance: {e}")
             return 0.0
     
+    def get_balance_as_of(self, account_id, as_of):
+        """
+        Get the account balance at a point in time
+        Reads the nearest end-of-day snapshot and replays only the transactions after it
+        Args:
+            account_id (int): Account ID
+            as_of (date or datetime): A date means end of that day
+        Returns:
+            Decimal: Balance at that point in time, None on error
+        """
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            
+            # A snapshot covers a whole day, so a mid-day cutoff needs the previous day's snapshot
+            if isinstance(as_of, datetime):
+                cutoff = as_of
+                cutoff_condition = "transaction_date <= %s"
+                snapshot_limit = as_of.date() - timedelta(days=1)
+            else:
+                cutoff = datetime.combine(as_of + timedelta(days=1), time.min)
+                cutoff_condition = "transaction_date < %s"
+                snapshot_limit = as_of
+            
+            cursor.execute("""
+                SELECT balance, last_transaction_id
+                FROM account_balance_snapshots
+                WHERE account_id = %s AND snapshot_date <= %s
+                ORDER BY snapshot_date DESC
+                LIMIT 1
+            """, (account_id, snapshot_limit))
+            snapshot = cursor.fetchone()
+            
+            if snapshot:
+                base_balance, after_transaction_id = snapshot
+            else:
+                # No snapshot yet - start from the opening balance of the first transaction
+                cursor.execute("""
+                    SELECT balance_before FROM transactions
+                    WHERE account_id = %s AND status = 'COMPLETED'
+                    ORDER BY transaction_id
+                    LIMIT 1
+                """, (account_id,))
+                first = cursor.fetchone()
+                if not first:
+                    # No transactions at all, so the balance has never moved
+                    cursor.execute("SELECT balance FROM accounts WHERE account_id = %s", (account_id,))
+                    account = cursor.fetchone()
+                    cursor.close()
+                    return Decimal(account[0]) if account else Decimal('0.00')
+                base_balance, after_transaction_id = first[0], 0
+            
+            cursor.execute(f"""
+                SELECT COALESCE(SUM({SIGNED_AMOUNT_SQL}), 0)
+                FROM transactions
+                WHERE account_id = %s AND transaction_id > %s
+                  AND {cutoff_condition} AND status = 'COMPLETED'
+            """, (account_id, after_transaction_id, cutoff))
+            tail_net = cursor.fetchone()[0]
+            cursor.close()
+            
+            return base_balance + tail_net
+        
+        except Error as e:
+            logger.error(f"Error fetching balance as of {as_of}: {e}")
+            return None
+    
     def search_accounts(self, search_term):
         """Search accounts by account number, customer name, or phone"""
         try:
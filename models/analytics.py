@@ -0,0 +1,283 @@
+"""
+Transaction Analytics Engine for Bank Management System
+Loads transaction columns into pandas frames and answers trend reports with vectorized operations
+"""
+
+import mysql.connector
+from mysql.connector import Error
+from config import DB_CONFIG
+from models.ledger import CREDIT_TYPES, DEBIT_TYPES
+from datetime import date
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_TYPES = CREDIT_TYPES + DEBIT_TYPES
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Season for each calendar month (index 0 = January)
+SEASONS = ['Winter', 'Winter', 'Summer', 'Summer', 'Summer', 'Monsoon',
+           'Monsoon', 'Monsoon', 'Monsoon', 'Post-Monsoon', 'Post-Monsoon', 'Winter']
+SEASON_ORDER = ['Winter', 'Summer', 'Monsoon', 'Post-Monsoon']
+
+# Loaded frames are shared by every TransactionAnalytics instance, so reopening
+# the reports window or running a second report does not reload the ledger
+_frame_cache = {
+    'transactions': None,
+    'loaded_from': None,
+    'high_water': 0,
+    'accounts': None,
+    'customers': None
+}
+_cache_lock = threading.Lock()
+
+
+def clear_cache():
+    """Drop all cached analytics frames"""
+    with _cache_lock:
+        _frame_cache.update(transactions=None, loaded_from=None, high_water=0,
+                            accounts=None, customers=None)
+
+
+class TransactionAnalytics:
+    """Columnar analytics over transactions, accounts and customers"""
+    
+    def __init__(self, chunk_size=50000):
+        self.connection = None
+        self.chunk_size = chunk_size
+    
+    def get_connection(self):
+        """Get database connection"""
+        try:
+            if self.connection is None or not self.connection.is_connected():
+                self.connection = mysql.connector.connect(**DB_CONFIG)
+            return self.connection
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+    
+    def close_connection(self):
+        """Close database connection"""
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+    
+    def _read_chunks(self, query, params):
+        """Stream a query in chunks and build one frame per chunk"""
+        import numpy as np
+        import pandas as pd
+        
+        connection = self.get_connection()
+        cursor = connection.cursor(buffered=False)
+        cursor.execute(query, params)
+        
+        frames = []
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            
+            transaction_ids, account_ids, types, amounts, dates = zip(*rows)
+            frames.append(pd.DataFrame({
+                'transaction_id': np.fromiter(transaction_ids, dtype=np.int64, count=len(rows)),
+                'account_id': np.fromiter(account_ids, dtype=np.int64, count=len(rows)),
+                'transaction_type': pd.Categorical(types, categories=TRANSACTION_TYPES),
+                'amount': np.fromiter(amounts, dtype=np.float64, count=len(rows)),
+                'transaction_date': pd.to_datetime(dates)
+            }))
+        
+        cursor.close()
+        return frames
+    
+    def load_transactions(self, start_date):
+        """
+        Get a frame of completed transactions since start_date
+        The cached frame is topped up with rows past its transaction_id high-water mark
+        Args:
+            start_date (date): Earliest transaction date needed
+        Returns:
+            DataFrame: transaction_id, account_id, transaction_type, amount, transaction_date
+        """
+        import pandas as pd
+        
+        query = """
+            SELECT transaction_id, account_id, transaction_type, amount, transaction_date
+            FROM transactions
+            WHERE transaction_date >= %s AND transaction_id > %s AND status = 'COMPLETED'
+            ORDER BY transaction_id
+        """
+        
+        with _cache_lock:
+            cached = _frame_cache['transactions']
+            if cached is None or _frame_cache['loaded_from'] > start_date:
+                # Cold cache, or the report needs older history than is loaded
+                frames = self._read_chunks(query, (start_date, 0))
+                loaded_from = start_date
+            else:
+                frames = [cached] + self._read_chunks(query, (_frame_cache['loaded_from'], _frame_cache['high_water']))
+                loaded_from = _frame_cache['loaded_from']
+            
+            if frames:
+                frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+            else:
+                frame = pd.DataFrame({
+                    'transaction_id': pd.Series(dtype='int64'),
+                    'account_id': pd.Series(dtype='int64'),
+                    'transaction_type': pd.Categorical([], categories=TRANSACTION_TYPES),
+                    'amount': pd.Series(dtype='float64'),
+                    'transaction_date': pd.Series(dtype='datetime64[ns]')
+                })
+            
+            _frame_cache['transactions'] = frame
+            _frame_cache['loaded_from'] = loaded_from
+            _frame_cache['high_water'] = int(frame['transaction_id'].max()) if len(frame) else 0
+        
+        return frame[frame['transaction_date'] >= pd.Timestamp(start_date)]
+    
+    def _load_openings(self, key, query):
+        """Load (id, created_date) pairs for accounts or customers, topping up the cache"""
+        import pandas as pd
+        
+        with _cache_lock:
+            cached = _frame_cache[key]
+            last_id = int(cached['id'].max()) if cached is not None and len(cached) else 0
+            
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            cursor.execute(query, (last_id,))
+            rows = cursor.fetchall()
+            cursor.close()
+            
+            fresh = pd.DataFrame(rows, columns=['id', 'created_date'])
+            fresh['created_date'] = pd.to_datetime(fresh['created_date'])
+            frame = fresh if cached is None else pd.concat([cached, fresh], ignore_index=True)
+            _frame_cache[key] = frame
+        
+        return frame
+    
+    def load_accounts(self):
+        """Get a frame of account IDs and their creation dates"""
+        return self._load_openings(
+            'accounts',
+            "SELECT account_id, created_date FROM accounts WHERE account_id > %s ORDER BY account_id"
+        )
+    
+    def load_customers(self):
+        """Get a frame of customer IDs and their creation dates"""
+        return self._load_openings(
+            'customers',
+            "SELECT customer_id, created_date FROM customers WHERE customer_id > %s ORDER BY customer_id"
+        )
+    
+    @staticmethod
+    def default_start_date(months=12):
+        """First day of the month, the given number of months back"""
+        today = date.today()
+        month_index = today.year * 12 + today.month - 1 - (months - 1)
+        return date(month_index // 12, month_index % 12 + 1, 1)
+    
+    def monthly_analysis(self, start_date=None):
+        """
+        Transaction activity per calendar month
+        Returns:
+            DataFrame indexed by month with transaction count, volume, credits,
+            debits, net flow, active accounts and average amount
+        """
+        import numpy as np
+        
+        start_date = start_date or self.default_start_date()
+        frame = self.load_transactions(start_date)
+        
+        month = frame['transaction_date'].dt.to_period('M')
+        is_credit = frame['transaction_type'].isin(CREDIT_TYPES).to_numpy()
+        amount = frame['amount'].to_numpy()
+        
+        grouped = frame.assign(
+            month=month,
+            credit=np.where(is_credit, amount, 0.0),
+            debit=np.where(is_credit, 0.0, amount)
+        ).groupby('month')
+        
+        result = grouped.agg(
+            transactions=('amount', 'size'),
+            volume=('amount', 'sum'),
+            credits=('credit', 'sum'),
+            debits=('debit', 'sum'),
+            active_accounts=('account_id', 'nunique'),
+            average_amount=('amount', 'mean')
+        )
+        result['net_flow'] = result['credits'] - result['debits']
+        return result
+    
+    def seasonal_trends(self, start_date=None):
+        """
+        Transaction patterns by weekday, calendar month and season
+        Returns:
+            dict: 'weekday', 'month' and 'season' frames with count, volume and average amount
+        """
+        import numpy as np
+        
+        start_date = start_date or self.default_start_date()
+        frame = self.load_transactions(start_date)
+        
+        dates = frame['transaction_date'].dt
+        month_numbers = dates.month.to_numpy()
+        frame = frame.assign(
+            weekday=np.array(WEEKDAYS, dtype=object)[dates.dayofweek.to_numpy()],
+            month=month_numbers,
+            season=np.array(SEASONS, dtype=object)[month_numbers - 1] if len(frame) else np.array([], dtype=object)
+        )
+        
+        def summarize(key, order):
+            summary = frame.groupby(key)['amount'].agg(['size', 'sum', 'mean'])
+            summary.columns = ['transactions', 'volume', 'average_amount']
+            return summary.reindex(order, fill_value=0)
+        
+        return {
+            'weekday': summarize('weekday', WEEKDAYS),
+            'month': summarize('month', list(range(1, 13))),
+            'season': summarize('season', SEASON_ORDER)
+        }
+    
+    def growth_analysis(self, start_date=None):
+        """
+        Customer, account and activity growth per month
+        Returns:
+            DataFrame indexed by month with new customers, new accounts, cumulative
+            totals, active accounts, volume and month-over-month volume growth
+        """
+        import pandas as pd
+        
+        start_date = start_date or self.default_start_date()
+        start = pd.Timestamp(start_date)
+        
+        monthly = self.monthly_analysis(start_date)
+        customers = self.load_customers()
+        accounts = self.load_accounts()
+        
+        def openings(frame):
+            # Entities created before the window count towards the running total only
+            before = int((frame['created_date'] < start).sum())
+            in_window = frame[frame['created_date'] >= start]
+            per_month = in_window.groupby(in_window['created_date'].dt.to_period('M')).size()
+            return per_month, before
+        
+        new_customers, customers_before = openings(customers)
+        new_accounts, accounts_before = openings(accounts)
+        
+        months = pd.period_range(start=start, end=pd.Timestamp(date.today()), freq='M')
+        result = pd.DataFrame(index=months)
+        result.index.name = 'month'
+        result['new_customers'] = new_customers.reindex(months, fill_value=0)
+        result['new_accounts'] = new_accounts.reindex(months, fill_value=0)
+        result['total_customers'] = result['new_customers'].cumsum() + customers_before
+        result['total_accounts'] = result['new_accounts'].cumsum() + accounts_before
+        result['active_accounts'] = monthly['active_accounts'].reindex(months, fill_value=0)
+        result['volume'] = monthly['volume'].reindex(months, fill_value=0.0)
+        result['volume_growth_pct'] = result['volume'].pct_change().replace([float('inf'), -float('inf')], float('nan')) * 100
+        return result
+    
+    def __del__(self):
+        """Destructor to ensure connection is closed"""
+        self.close_connection()
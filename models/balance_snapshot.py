@@ -0,0 +1,196 @@
+"""
+Balance Snapshot Model for Bank Management System
+Builds end-of-day balance snapshots used for point-in-time balance queries
+
+Usage:
+    python -m models.balance_snapshot
+    python -m models.balance_snapshot --through 2025-07-31
+"""
+
+import mysql.connector
+from mysql.connector import Error
+from config import DB_CONFIG
+from models.ledger import CREDIT_TYPES, DEBIT_TYPES
+from datetime import datetime, date, time, timedelta
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+# rollup_watermarks row recording the last day snapshotted
+WATERMARK_NAME = 'account_balance_snapshots'
+
+# SQL expression giving a transaction's signed effect on the account balance
+SIGNED_AMOUNT_SQL = (
+    "CASE WHEN transaction_type IN ({credits}) THEN amount "
+    "WHEN transaction_type IN ({debits}) THEN -amount ELSE 0 END"
+).format(
+    credits=", ".join(f"'{t}'" for t in CREDIT_TYPES),
+    debits=", ".join(f"'{t}'" for t in DEBIT_TYPES)
+)
+
+
+class BalanceSnapshotBuilder:
+    """Maintains the account_balance_snapshots table one day at a time"""
+    
+    def __init__(self, fetch_size=10000, batch_size=1000):
+        self.connection = None
+        self.fetch_size = fetch_size
+        self.batch_size = batch_size
+    
+    def get_connection(self):
+        """Get database connection"""
+        try:
+            if self.connection is None or not self.connection.is_connected():
+                self.connection = mysql.connector.connect(**DB_CONFIG)
+            return self.connection
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+    
+    def close_connection(self):
+        """Close database connection"""
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+    
+    def get_next_snapshot_date(self):
+        """
+        Get the first day that has not been snapshotted yet
+        Days without transactions write no snapshot rows, so progress is read from
+        the processed-through watermark rather than from the snapshots themselves
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        cursor.execute(
+            "SELECT processed_through FROM rollup_watermarks WHERE rollup_name = %s",
+            (WATERMARK_NAME,)
+        )
+        row = cursor.fetchone()
+        last_date = row[0] if row else None
+        
+        if last_date is None:
+            cursor.execute("SELECT MIN(transaction_date) FROM transactions")
+            first_transaction = cursor.fetchone()[0]
+            cursor.close()
+            return first_transaction.date() if first_transaction else None
+        
+        cursor.close()
+        return last_date + timedelta(days=1)
+    
+    def build_day(self, snapshot_date):
+        """
+        Snapshot the end-of-day balance of every account that moved on a given day
+        Makes a single pass over that day's transactions
+        Args:
+            snapshot_date (date): Day to snapshot
+        Returns:
+            int: Number of account snapshots written
+        """
+        day_start = datetime.combine(snapshot_date, time.min)
+        day_end = day_start + timedelta(days=1)
+        
+        connection = self.get_connection()
+        cursor = connection.cursor(buffered=False)
+        
+        cursor.execute("""
+            SELECT account_id, transaction_id, balance_after
+            FROM transactions
+            WHERE transaction_date >= %s AND transaction_date < %s
+              AND status = 'COMPLETED'
+            ORDER BY account_id, transaction_id
+        """, (day_start, day_end))
+        
+        # Keep only the last row per account; rows arrive grouped by account
+        closing = {}
+        while True:
+            rows = cursor.fetchmany(self.fetch_size)
+            if not rows:
+                break
+            for account_id, transaction_id, balance_after in rows:
+                closing[account_id] = (balance_after, transaction_id)
+        cursor.close()
+        
+        snapshots = [
+            (account_id, snapshot_date, balance, transaction_id)
+            for account_id, (balance, transaction_id) in closing.items()
+        ]
+        
+        try:
+            cursor = connection.cursor()
+            connection.start_transaction()
+            
+            for i in range(0, len(snapshots), self.batch_size):
+                cursor.executemany("""
+                    INSERT INTO account_balance_snapshots (
+                        account_id, snapshot_date, balance, last_transaction_id
+                    ) VALUES (%s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        balance = VALUES(balance),
+                        last_transaction_id = VALUES(last_transaction_id)
+                """, snapshots[i:i + self.batch_size])
+            
+            # Advance the watermark with the snapshots; rebuilding an earlier day never moves it back
+            cursor.execute("""
+                INSERT INTO rollup_watermarks (rollup_name, processed_through) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE
+                    processed_through = GREATEST(COALESCE(processed_through, VALUES(processed_through)),
+                                                 VALUES(processed_through))
+            """, (WATERMARK_NAME, snapshot_date))
+            
+            connection.commit()
+            cursor.close()
+        
+        except Error as e:
+            connection.rollback()
+            logger.error(f"Error writing balance snapshots for {snapshot_date}: {e}")
+            raise
+        
+        logger.info(f"Balance snapshots for {snapshot_date}: {len(snapshots)} accounts")
+        return len(snapshots)
+    
+    def build_pending(self, through_date=None):
+        """
+        Snapshot every day since the last snapshot, up to and including through_date
+        Args:
+            through_date (date): Last day to snapshot (default: yesterday)
+        Returns:
+            int: Number of days processed
+        """
+        if through_date is None:
+            through_date = date.today() - timedelta(days=1)
+        
+        current = self.get_next_snapshot_date()
+        if current is None:
+            logger.info("No transactions to snapshot")
+            return 0
+        
+        days = 0
+        while current <= through_date:
+            self.build_day(current)
+            current += timedelta(days=1)
+            days += 1
+        
+        return days
+    
+    def __del__(self):
+        """Destructor to ensure connection is closed"""
+        self.close_connection()
+
+
+def main():
+    """Command line entry point for the daily snapshot job"""
+    parser = argparse.ArgumentParser(description='Build end-of-day balance snapshots')
+    parser.add_argument('--through', help='Last day to snapshot, YYYY-MM-DD (default: yesterday)')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    through_date = datetime.strptime(args.through, "%Y-%m-%d").date() if args.through else None
+    days = BalanceSnapshotBuilder().build_pending(through_date)
+    logger.info(f"Snapshot build complete - {days} day(s) processed")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,6 +6,7 @@ Handles all customer-related database operations
 import mysql.connector
 from mysql.connector import Error
 from config import DB_CONFIG
+from models.database import get_pooled_connection
 from datetime import datetime, date
 import logging
 import random
@@ -13,6 +14,43 @@ import string
 
 logger = logging.getLogger(__name__)
 
+INSERT_CUSTOMER_SQL = """
+    INSERT INTO customers (
+        customer_number, first_name, last_name, date_of_birth, 
+        gender, phone, email, address, city, state, pincode, 
+        pan_number, aadhar_number, annual_income, occupation, 
+        branch_id, status, created_date
+    ) VALUES (
+        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+    )
+"""
+
+
+def customer_row(customer_data):
+    """Parameters for INSERT_CUSTOMER_SQL, with the defaults new customers get"""
+    return (
+        customer_data['customer_number'],
+        customer_data.get('first_name', ''),
+        customer_data.get('last_name', ''),
+        customer_data.get('date_of_birth', '1990-01-01'),
+        customer_data.get('gender', 'MALE'),
+        customer_data.get('phone', ''),
+        # Optional unique columns: blank means NULL, so many customers can omit them
+        customer_data.get('email') or None,
+        customer_data.get('address', ''),
+        customer_data.get('city', ''),
+        customer_data.get('state', ''),
+        customer_data.get('pincode', ''),
+        customer_data.get('pan_number') or None,
+        customer_data.get('aadhar_number') or None,
+        customer_data.get('annual_income', 0.0),
+        customer_data.get('occupation', ''),
+        customer_data.get('branch_id', 1),
+        'ACTIVE',
+        datetime.now()
+    )
+
+
 class Customer:
     """Customer model for handling customer-related operations"""
     
@@ -34,10 +72,10 @@ class Customer:
         if self.connection and self.connection.is_connected():
             self.connection.close()
     
-    def generate_customer_number(self):
+    def generate_customer_number(self, digits=3):
         """Generate unique customer number"""
         timestamp = int(datetime.now().timestamp())
-        random_suffix = ''.join(random.choices(string.digits, k=3))
+        random_suffix = ''.join(random.choices(string.digits, k=digits))
         return f"CUST{timestamp}{random_suffix}"
     
     def create_customer(self, customer_data):
@@ -56,41 +94,7 @@ class Customer:
             if 'customer_number' not in customer_data:
                 customer_data['customer_number'] = self.generate_customer_number()
             
-            # Prepare the SQL query
-            query = """
-            INSERT INTO customers (
-                customer_number, first_name, last_name, date_of_birth, 
-                gender, phone, email, address, city, state, pincode, 
-                pan_number, aadhar_number, annual_income, occupation, 
-                branch_id, status, created_date
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-            )
-            """
-            
-            # Prepare the data tuple
-            data = (
-                customer_data['customer_number'],
-                customer_data.get('first_name', ''),
-                customer_data.get('last_name', ''),
-                customer_data.get('date_of_birth', '1990-01-01'),
-                customer_data.get('gender', 'MALE'),
-                customer_data.get('phone', ''),
-                customer_data.get('email', ''),
-                customer_data.get('address', ''),
-                customer_data.get('city', ''),
-                customer_data.get('state', ''),
-                customer_data.get('pincode', ''),
-                customer_data.get('pan_number', None),
-                customer_data.get('aadhar_number', None),
-                customer_data.get('annual_income', 0.0),
-                customer_data.get('occupation', ''),
-                customer_data.get('branch_id', 1),
-                'ACTIVE',
-                datetime.now()
-            )
-            
-            cursor.execute(query, data)
+            cursor.execute(INSERT_CUSTOMER_SQL, customer_row(customer_data))
             connection.commit()
             
             customer_id = cursor.lastrowid
@@ -105,6 +109,65 @@ class Customer:
                 connection.rollback()
             raise
     
+    def create_customers(self, rows, batch_size=500):
+        """
+        Create many customers, committing once per batch
+        A row that fails (e.g. a duplicate PAN) is rolled back to its savepoint
+        without losing the rest of its batch
+        Args:
+            rows (iterable): Customer data dicts as accepted by create_customer
+            batch_size (int): Customers per commit
+        Returns:
+            dict: Created and failed counts with per-row results
+        """
+        summary = {"created": 0, "failed": 0, "results": []}
+        rows = list(rows)
+        
+        connection = get_pooled_connection()
+        cursor = connection.cursor()
+        
+        try:
+            for start in range(0, len(rows), batch_size):
+                chunk = rows[start:start + batch_size]
+                results = []
+                
+                try:
+                    connection.start_transaction()
+                    for customer_data in chunk:
+                        if not customer_data.get('customer_number'):
+                            # Six digits keep a burst of inserts in the same second unique
+                            customer_data['customer_number'] = self.generate_customer_number(digits=6)
+                        cursor.execute("SAVEPOINT customer_row")
+                        try:
+                            cursor.execute(INSERT_CUSTOMER_SQL, customer_row(customer_data))
+                            results.append({"success": True, "customer_number": customer_data['customer_number'],
+                                            "customer_id": cursor.lastrowid})
+                        except Error as e:
+                            cursor.execute("ROLLBACK TO SAVEPOINT customer_row")
+                            results.append({"success": False, "customer_number": customer_data['customer_number'],
+                                            "message": str(e)})
+                    connection.commit()
+                
+                except Error as e:
+                    connection.rollback()
+                    logger.error(f"Customer batch failed: {e}")
+                    results = [{"success": False, "customer_number": c.get('customer_number'),
+                                "message": f"Batch failed: {str(e)}"} for c in chunk]
+                
+                created = sum(1 for r in results if r['success'])
+                summary['created'] += created
+                summary['failed'] += len(results) - created
+                summary['results'].extend(results)
+            
+            cursor.close()
+        
+        finally:
+            # Returns the connection to the pool
+            connection.close()
+        
+        logger.info(f"Customer batch complete - Created: {summary['created']}, Failed: {summary['failed']}")
+        return summary
+    
     def get_all_customers(self):
         """Get all customers with branch information"""
         try:
@@ -134,6 +197,26 @@ class Customer:
             logger.error(f"Error fetching customers: {e}")
             raise
     
+    def get_export_query(self):
+        """
+        Build the customer list export query for QueryExporter
+        PAN and Aadhaar numbers are left out of exports
+        Returns:
+            tuple: (query, params)
+        """
+        query = """
+            SELECT
+                c.customer_number, c.first_name, c.last_name, c.date_of_birth, c.gender,
+                c.phone, c.email, c.address, c.city, c.state, c.pincode,
+                c.annual_income, c.occupation, c.status, c.created_date,
+                COALESCE(b.branch_code, 'N/A') as branch_code,
+                COALESCE(b.branch_name, 'Unknown') as branch_name
+            FROM customers c
+            LEFT JOIN branches b ON c.branch_id = b.branch_id
+            ORDER BY c.created_date DESC
+        """
+        return query, ()
+    
     def search_customers(self, search_term):
         """Search customers by name, phone, email, or customer number"""
         try:
@@ -441,7 +524,7 @@ class Customer:
         try:
             query = """
             UPDATE customers 
-            SET status = 'INACTIVE', updated_at = CURRENT_TIMESTAMP
+            SET status = 'INACTIVE', updated_date = CURRENT_TIMESTAMP
             WHERE customer_id = %s
             """
             rows_affected = self.db.execute_query(query, (customer_id,), fetch=False)
@@ -0,0 +1,215 @@
+"""
+Daily Transaction Limits for Bank Management System
+Enforces DAILY_WITHDRAWAL_LIMIT and DAILY_TRANSFER_LIMIT from in-memory running totals
+
+Each account's withdrawn and transferred-out totals for today are kept in a
+bounded LRU. The first check of the day loads every account's totals with one
+aggregate query; after that a check is a dictionary lookup, and each posting
+adds to the total when it is reserved and gives it back if it does not post.
+Only postings made through this process are counted after the warm-up, so
+processes posting side by side each see the others' postings from their own
+last warm-up. A posting whose totals cannot be loaded is refused, not let
+through unchecked.
+
+Only the customer's own withdrawals and transfers count. Loan repayments
+debited by LoanPaymentPoster (EMI auto-debits included) are never reserved
+in process, so the warm-up leaves them out too: they are the WITHDRAWAL rows
+a loan_payments row points at.
+"""
+
+from mysql.connector import Error
+from models.database import get_pooled_connection
+from utils.constants import DAILY_WITHDRAWAL_LIMIT, DAILY_TRANSFER_LIMIT
+from collections import OrderedDict
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+
+# Limit kinds and the ledger rows that count towards them
+WITHDRAWAL = 0
+TRANSFER = 1
+KINDS = {'WITHDRAWAL': WITHDRAWAL, 'TRANSFER': TRANSFER}
+
+UNAVAILABLE_MESSAGE = "Daily limits could not be checked, please try again"
+
+TOTALS_SQL = """
+    SELECT account_id,
+           SUM(CASE WHEN transaction_type = 'WITHDRAWAL' THEN amount ELSE 0 END),
+           SUM(CASE WHEN transaction_type = 'TRANSFER_OUT' THEN amount ELSE 0 END)
+    FROM transactions
+    WHERE transaction_date >= %s
+    AND transaction_type IN ('WITHDRAWAL', 'TRANSFER_OUT')
+    AND status = 'COMPLETED'
+    AND NOT EXISTS (
+        SELECT 1 FROM loan_payments lp WHERE lp.reference_number = transactions.transaction_number
+    )
+    {account_filter}
+    GROUP BY account_id
+"""
+
+
+class DailyLimits:
+    """Per-account running totals for today, checked and updated without database round trips"""
+    
+    def __init__(self, withdrawal_limit=DAILY_WITHDRAWAL_LIMIT, transfer_limit=DAILY_TRANSFER_LIMIT,
+                 max_accounts=200000):
+        self.limits = (Decimal(str(withdrawal_limit)), Decimal(str(transfer_limit)))
+        self.max_accounts = max_accounts
+        self.lock = threading.Lock()
+        self.warm_lock = threading.Lock()
+        self.totals = OrderedDict()
+        self.day = None
+        # False once an account had to be evicted: a missing account may then
+        # have postings today and is read back from the database
+        self.complete = False
+        self.db_reads = 0
+    
+    def _load(self, account_id=None, cursor=None):
+        """
+        Run the totals query for today, for all accounts or just one
+        Args:
+            account_id (int): Only this account (default: all)
+            cursor: Cursor of the posting transaction to run on; without one a pooled
+                connection is borrowed
+        Returns:
+            tuple: (day, {account_id: [withdrawn, transferred]})
+        """
+        day = date.today()
+        account_filter = "AND account_id = %s" if account_id is not None else ""
+        params = (datetime.combine(day, dt_time.min),) + ((account_id,) if account_id is not None else ())
+        query = TOTALS_SQL.format(account_filter=account_filter)
+        
+        if cursor is not None:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        else:
+            connection = get_pooled_connection()
+            try:
+                pooled_cursor = connection.cursor()
+                pooled_cursor.execute(query, params)
+                rows = pooled_cursor.fetchall()
+                pooled_cursor.close()
+            finally:
+                # Returns the connection to the pool
+                connection.close()
+        self.db_reads += 1
+        return day, {row[0]: [Decimal(row[1] or 0), Decimal(row[2] or 0)] for row in rows}
+    
+    def warm(self, cursor=None):
+        """
+        Load today's totals for every account with one aggregate query
+        Returns:
+            bool: True if the totals were loaded
+        """
+        try:
+            day, totals = self._load(cursor=cursor)
+        except Error as e:
+            logger.error(f"Error loading daily limit totals: {e}")
+            return False
+        
+        with self.lock:
+            self.day = day
+            self.totals = OrderedDict(sorted(totals.items(), key=lambda item: sum(item[1]))[-self.max_accounts:])
+            self.complete = len(totals) <= self.max_accounts
+        logger.info(f"Daily limit totals loaded for {len(totals)} accounts")
+        return True
+    
+    def _ensure_warm(self, cursor=None):
+        """Load the totals on first use and again when the day changes"""
+        if self.day == date.today():
+            return True
+        with self.warm_lock:
+            # Another thread may have loaded them while this one waited
+            return self.day == date.today() or self.warm(cursor)
+    
+    def _entry(self, account_id, cursor=None):
+        """
+        Make sure an account's totals are held, reading them from the database only after an eviction
+        Returns:
+            bool: False if they had to be read and could not be
+        """
+        with self.lock:
+            if account_id in self.totals or self.complete:
+                return True
+        
+        try:
+            _, totals = self._load(account_id, cursor)
+        except Error as e:
+            logger.error(f"Error loading daily limit totals for account {account_id}: {e}")
+            return False
+        with self.lock:
+            self.totals.setdefault(account_id, totals.get(account_id, [Decimal('0'), Decimal('0')]))
+        return True
+    
+    def _evict(self):
+        """Drop least recently used accounts beyond max_accounts (lock held)"""
+        while len(self.totals) > self.max_accounts:
+            self.totals.popitem(last=False)
+            self.complete = False
+    
+    def reserve(self, account_id, kind, amount, cursor=None):
+        """
+        Check a withdrawal or transfer against today's limit and count it if it fits
+        Call release() if the posting then fails
+        Args:
+            account_id (int): Account the money leaves
+            kind (str): WITHDRAWAL or TRANSFER
+            amount: Posting amount
+            cursor: Cursor of the posting transaction, used if totals must be loaded
+        Returns:
+            str: Error message if the limit would be exceeded or cannot be checked,
+                 None if reserved
+        """
+        index = KINDS[kind]
+        amount = Decimal(str(amount)).quantize(CENT)
+        
+        if not self._ensure_warm(cursor) or not self._entry(account_id, cursor):
+            return UNAVAILABLE_MESSAGE
+        
+        with self.lock:
+            entry = self.totals.get(account_id)
+            if entry is None:
+                entry = self.totals[account_id] = [Decimal('0'), Decimal('0')]
+            self.totals.move_to_end(account_id)
+            
+            limit = self.limits[index]
+            if entry[index] + amount > limit:
+                remaining = max(limit - entry[index], Decimal('0'))
+                return (f"Daily {kind.lower()} limit of {limit:,.2f} exceeded; "
+                        f"{remaining:,.2f} remaining today")
+            entry[index] += amount
+            self._evict()
+        return None
+    
+    def release(self, account_id, kind, amount):
+        """Give back a reservation whose posting did not go through"""
+        amount = Decimal(str(amount)).quantize(CENT)
+        with self.lock:
+            entry = self.totals.get(account_id)
+            if entry is not None:
+                entry[KINDS[kind]] = max(entry[KINDS[kind]] - amount, Decimal('0'))
+    
+    def usage(self, account_id):
+        """
+        Today's totals and remaining limits for an account
+        Returns:
+            dict: withdrawn, transferred, withdrawal_remaining and transfer_remaining
+        """
+        self._ensure_warm()
+        self._entry(account_id)
+        with self.lock:
+            withdrawn, transferred = self.totals.get(account_id, [Decimal('0'), Decimal('0')])
+            return {
+                'withdrawn': withdrawn,
+                'transferred': transferred,
+                'withdrawal_remaining': max(self.limits[WITHDRAWAL] - withdrawn, Decimal('0')),
+                'transfer_remaining': max(self.limits[TRANSFER] - transferred, Decimal('0'))
+            }
+
+
+daily_limits = DailyLimits()
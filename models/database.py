@@ -1,7 +1,9 @@
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
 from config import DB_CONFIG
+from utils.constants import DB_SETTINGS
 import logging
+import threading
 
 class DatabaseConnection:
     """
@@ -145,3 +147,25 @@ class DatabaseConnection:
 
 # Singleton database instance
 db = DatabaseConnection()
+
+# Shared connection pool for engines that open many short transactions
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pooled_connection():
+    """
+    Get a connection from the shared pool
+    Calling close() on the connection returns it to the pool
+    Returns:
+        PooledMySQLConnection: Connection checked out of the pool
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = pooling.MySQLConnectionPool(
+                pool_name="bank_pool",
+                pool_size=DB_SETTINGS['CONNECTION_POOL_SIZE'],
+                pool_reset_session=True,
+                **DB_CONFIG
+            )
+    return _pool.get_connection()
@@ -0,0 +1,337 @@
+"""
+EMI Auto-Debit Scheduler for Bank Management System
+Collects due EMIs from customers' accounts and records PAID/OVERDUE outcomes on emi_schedule
+
+Usage:
+    python -m models.emi_scheduler
+    python -m models.emi_scheduler --date 2025-08-01 --workers 8
+"""
+
+import mysql.connector
+from mysql.connector import Error
+from config import DB_CONFIG
+from utils.constants import DB_SETTINGS, MIN_LOAN_TENURE_MONTHS, MAX_LOAN_TENURE_MONTHS
+from models.loan_payment import LoanPaymentPoster, PAYABLE_STATUSES
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, date
+import argparse
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+RUN_LOCK_NAME = 'emi_auto_debit'
+NO_ACCOUNT_REASON = 'No active account for auto-debit'
+
+# Loans that are disbursed and have no schedule yet
+UNSCHEDULED_LOANS = """
+    l.status = 'DISBURSED' AND l.disbursement_date IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM emi_schedule e WHERE e.loan_id = l.loan_id)
+"""
+
+# Installments are materialized for every unscheduled loan whose tenure is within
+# the loan limits; the recursion is bounded by the longest tenure allowed.
+# The first EMI falls on first_emi_date, or one month after disbursement.
+SCHEDULE_SQL = """
+    INSERT IGNORE INTO emi_schedule (loan_id, installment_number, due_date, emi_amount)
+    WITH RECURSIVE installments (n) AS (
+        SELECT 1
+        UNION ALL
+        SELECT n + 1 FROM installments WHERE n < %s
+    )
+    SELECT
+        l.loan_id, i.n,
+        DATE_ADD(COALESCE(l.first_emi_date, DATE_ADD(l.disbursement_date, INTERVAL 1 MONTH)),
+                 INTERVAL i.n - 1 MONTH),
+        l.emi_amount
+    FROM loans l
+    JOIN installments i ON i.n <= l.tenure_months
+    WHERE l.tenure_months BETWEEN %s AND %s AND""" + UNSCHEDULED_LOANS
+
+# Unscheduled loans whose tenure is outside the loan limits; these are reported
+# and left unscheduled rather than given a truncated schedule
+OUT_OF_RANGE_SQL = """
+    SELECT l.loan_id, l.tenure_months FROM loans l
+    WHERE l.tenure_months NOT BETWEEN %s AND %s AND""" + UNSCHEDULED_LOANS
+
+
+def materialize_schedule(cursor, loan_ids=None):
+    """
+    Create installment rows for disbursed loans that have no schedule yet
+    Loans with a tenure outside the loan limits are logged and skipped
+    Args:
+        cursor: Open cursor; the caller owns the transaction
+        loan_ids (list): Limit to these loans (default: every disbursed loan)
+    Returns:
+        int: Number of installment rows created
+    """
+    scope, params = "", []
+    if loan_ids is not None:
+        scope = f" AND l.loan_id IN ({', '.join(['%s'] * len(loan_ids))})"
+        params = list(loan_ids)
+    
+    cursor.execute(OUT_OF_RANGE_SQL + scope, [MIN_LOAN_TENURE_MONTHS, MAX_LOAN_TENURE_MONTHS] + params)
+    for loan_id, tenure_months in cursor.fetchall():
+        logger.error(f"Loan {loan_id} not scheduled: tenure of {tenure_months} months is outside "
+                     f"{MIN_LOAN_TENURE_MONTHS}-{MAX_LOAN_TENURE_MONTHS}")
+    
+    cursor.execute(SCHEDULE_SQL + scope,
+                   [MAX_LOAN_TENURE_MONTHS, MIN_LOAN_TENURE_MONTHS, MAX_LOAN_TENURE_MONTHS] + params)
+    return cursor.rowcount
+
+
+def record_outcomes(cursor, results, run_date):
+    """
+    Mark collected installments PAID and failed ones OVERDUE in bulk
+    Runs inside the payment batch transaction, so a crash never leaves a
+    posted payment with its installment still due
+    Args:
+        cursor: Cursor on the open batch transaction
+        results (list): Payment results from LoanPaymentPoster.post_batch
+        run_date (date): Date of the collection run
+    """
+    paid = [r['key'] for r in results if r['success']]
+    failed = {}
+    for r in results:
+        if not r['success']:
+            failed.setdefault(r['message'][:255], []).append(r['key'])
+    
+    if paid:
+        placeholders = ", ".join(["%s"] * len(paid))
+        cursor.execute(f"""
+            UPDATE emi_schedule
+            SET status = 'PAID', paid_date = %s, attempts = attempts + 1,
+                last_attempt_date = %s, failure_reason = NULL
+            WHERE schedule_id IN ({placeholders})
+        """, [run_date, run_date] + paid)
+    
+    # Failures mostly share a handful of reasons, so one statement per reason
+    for reason, schedule_ids in failed.items():
+        placeholders = ", ".join(["%s"] * len(schedule_ids))
+        cursor.execute(f"""
+            UPDATE emi_schedule
+            SET status = 'OVERDUE', attempts = attempts + 1,
+                last_attempt_date = %s, failure_reason = %s
+            WHERE schedule_id IN ({placeholders})
+        """, [run_date, reason] + schedule_ids)
+
+
+def collect_partition(payments, run_date, batch_size):
+    """
+    Post one partition of due EMIs on its own pooled connection
+    Args:
+        payments (list): Payment dicts for LoanPaymentPoster.post_batch
+        run_date (date): Date of the collection run
+        batch_size (int): Payments per commit
+    Returns:
+        dict: Posted and failed counts
+    """
+    poster = LoanPaymentPoster(batch_size=batch_size)
+    summary = poster.post_batch(
+        payments,
+        payment_mode='AUTO_DEBIT',
+        on_batch=lambda cursor, results: record_outcomes(cursor, results, run_date)
+    )
+    return {"posted": summary['posted'], "failed": summary['failed']}
+
+
+class EMIScheduler:
+    """Finds due EMIs in one query and collects them across a worker pool"""
+    
+    def __init__(self, workers=None, batch_size=500):
+        self.connection = None
+        # Each worker holds one pooled connection for the whole run
+        pool_size = DB_SETTINGS['CONNECTION_POOL_SIZE']
+        self.workers = max(1, min(workers or pool_size, pool_size))
+        self.batch_size = batch_size
+    
+    def get_connection(self):
+        """Get database connection"""
+        try:
+            if self.connection is None or not self.connection.is_connected():
+                self.connection = mysql.connector.connect(**DB_CONFIG)
+            return self.connection
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+    
+    def close_connection(self):
+        """Close database connection"""
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+    
+    def ensure_schedule(self):
+        """
+        Materialize installments for disbursed loans without a schedule
+        Returns:
+            int: Number of installment rows created
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        created = materialize_schedule(cursor)
+        cursor.close()
+        
+        if created:
+            logger.info(f"EMI schedule: {created} installments created")
+        return created
+    
+    def get_due_installments(self, run_date):
+        """
+        Get every unpaid installment due on or before run_date, with the account to debit
+        Installments already attempted on run_date are skipped, so a rerun after a
+        crash only picks up work that was not committed
+        Args:
+            run_date (date): Date of the collection run
+        Returns:
+            list: Rows of (schedule_id, loan_id, customer_id, emi_amount, account_id)
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        statuses = ", ".join(["%s"] * len(PAYABLE_STATUSES))
+        cursor.execute(f"""
+            SELECT
+                e.schedule_id, e.loan_id, l.customer_id, e.emi_amount,
+                (SELECT MIN(a.account_id) FROM accounts a
+                 WHERE a.customer_id = l.customer_id AND a.status = 'ACTIVE'
+                   AND a.account_type IN ('SAVINGS', 'CURRENT')) as account_id
+            FROM emi_schedule e
+            JOIN loans l ON e.loan_id = l.loan_id
+            WHERE e.status IN ('DUE', 'OVERDUE') AND e.due_date <= %s
+              AND (e.last_attempt_date IS NULL OR e.last_attempt_date < %s)
+              AND l.status IN ({statuses})
+            ORDER BY e.loan_id, e.installment_number
+        """, (run_date, run_date) + PAYABLE_STATUSES)
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+    
+    def mark_without_account(self, schedule_ids, run_date):
+        """Mark installments whose customer has no debit account as OVERDUE"""
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        try:
+            connection.start_transaction()
+            record_outcomes(
+                cursor,
+                [{"success": False, "message": NO_ACCOUNT_REASON, "key": schedule_id} for schedule_id in schedule_ids],
+                run_date
+            )
+            connection.commit()
+            cursor.close()
+        except Error as e:
+            connection.rollback()
+            logger.error(f"Error marking installments without an account: {e}")
+            raise
+    
+    def partition(self, rows, run_date):
+        """
+        Split due installments into worker partitions by customer_id
+        All debits against one customer's accounts stay on one worker, so workers
+        never wait on each other's account locks
+        Returns:
+            tuple: (partitions, schedule IDs with no account to debit)
+        """
+        partitions = [[] for _ in range(self.workers)]
+        without_account = []
+        
+        for schedule_id, loan_id, customer_id, emi_amount, account_id in rows:
+            if account_id is None:
+                without_account.append(schedule_id)
+                continue
+            partitions[customer_id % self.workers].append({
+                'key': schedule_id,
+                'loan_id': loan_id,
+                'account_id': account_id,
+                'amount': emi_amount,
+                'payment_date': run_date,
+                'cap_to_payoff': True
+            })
+        
+        return [p for p in partitions if p], without_account
+    
+    def run(self, run_date=None):
+        """
+        Collect every due EMI as of run_date
+        Args:
+            run_date (date): Collection date (default: today)
+        Returns:
+            dict: Run summary with due, posted and failed counts
+        """
+        run_date = run_date or date.today()
+        started = time.time()
+        summary = {"run_date": run_date, "due": 0, "posted": 0, "failed": 0, "failed_partitions": 0}
+        
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        # Only one collection run at a time; a second run would double-debit
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (RUN_LOCK_NAME,))
+        if cursor.fetchone()[0] != 1:
+            cursor.close()
+            raise RuntimeError("Another EMI collection run is in progress")
+        
+        try:
+            self.ensure_schedule()
+            
+            rows = self.get_due_installments(run_date)
+            summary['due'] = len(rows)
+            
+            partitions, without_account = self.partition(rows, run_date)
+            if without_account:
+                self.mark_without_account(without_account, run_date)
+                summary['failed'] += len(without_account)
+            
+            logger.info(f"EMI collection for {run_date}: {len(rows)} due, "
+                        f"{len(partitions)} partitions on {self.workers} workers")
+            
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(collect_partition, payments, run_date, self.batch_size)
+                           for payments in partitions]
+                
+                for future in as_completed(futures):
+                    try:
+                        part = future.result()
+                    except Exception as e:
+                        # Uncommitted batches stay due and are retried by the next run
+                        logger.error(f"EMI collection partition failed: {e}")
+                        summary['failed_partitions'] += 1
+                        continue
+                    summary['posted'] += part['posted']
+                    summary['failed'] += part['failed']
+        
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (RUN_LOCK_NAME,))
+            cursor.fetchone()
+            cursor.close()
+        
+        summary['elapsed_seconds'] = round(time.time() - started, 2)
+        logger.info(
+            f"EMI collection finished - Due: {summary['due']}, Paid: {summary['posted']}, "
+            f"Overdue: {summary['failed']}, Elapsed: {summary['elapsed_seconds']}s"
+        )
+        return summary
+    
+    def __del__(self):
+        """Destructor to ensure connection is closed"""
+        self.close_connection()
+
+
+def main():
+    """Command line entry point for the daily EMI collection run"""
+    parser = argparse.ArgumentParser(description='Collect due EMIs by auto-debit')
+    parser.add_argument('--date', help='Collection date, YYYY-MM-DD (default: today)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker threads (default: pool size)')
+    parser.add_argument('--batch-size', type=int, default=500, help='Payments per commit')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    run_date = datetime.strptime(args.date, "%Y-%m-%d").date() if args.date else None
+    summary = EMIScheduler(args.workers, args.batch_size).run(run_date)
+    return 1 if summary['failed_partitions'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
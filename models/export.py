@@ -0,0 +1,289 @@
+"""
+Export Engine for Bank Management System
+Streams query results to CSV, gzip CSV, columnar gzip CSV and write-only XLSX in bounded memory
+
+Usage:
+    exporter = QueryExporter()
+    query, params = Transaction().get_export_query(start_date, end_date)
+    exporter.export(query, params, 'reports/audit.csv.gz', progress=lambda done, total: True)
+"""
+
+import mysql.connector
+from mysql.connector import Error
+from config import DB_CONFIG
+from datetime import date, datetime
+from decimal import Decimal
+import csv
+import gzip
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Formats by file suffix; the longest matching suffix wins
+EXPORT_FORMATS = {
+    '.columnar.csv.gz': 'columnar',
+    '.csv.gz': 'csv.gz',
+    '.csv': 'csv',
+    '.xlsx': 'xlsx'
+}
+
+# Excel's sheet limit is 1,048,576 rows; one row is the header
+XLSX_MAX_ROWS = 1048575
+
+
+class ExportCancelled(Exception):
+    """The progress callback asked to stop the export"""
+    pass
+
+
+def detect_format(path):
+    """Export format for a file path, from its suffix"""
+    lower = path.lower()
+    for suffix in sorted(EXPORT_FORMATS, key=len, reverse=True):
+        if lower.endswith(suffix):
+            return EXPORT_FORMATS[suffix]
+    raise ValueError(f"Unsupported export file type: {path}")
+
+
+def to_text(value):
+    """Render a database value for CSV output"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, (date, Decimal)):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return value
+
+
+def read_columnar(path):
+    """
+    Read a columnar CSV.gz export back into rows
+    Yields:
+        list: The header, then one list per data row
+    """
+    with gzip.open(path, 'rt', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)[1:]
+        yield header
+        
+        while True:
+            group = []
+            for _ in header:
+                line = next(reader, None)
+                if line is None:
+                    return
+                group.append(line[1:])
+            yield from (list(row) for row in zip(*group))
+
+
+class CsvWriter:
+    """Row-oriented CSV, optionally gzip-compressed"""
+    
+    def __init__(self, path, columns, compress=False):
+        if compress:
+            self.file = gzip.open(path, 'wt', newline='', encoding='utf-8')
+        else:
+            self.file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+    
+    def write(self, rows):
+        self.writer.writerows([to_text(v) for v in row] for row in rows)
+    
+    def close(self):
+        self.file.close()
+
+
+class ColumnarWriter:
+    """
+    Columnar CSV.gz without Parquet: each chunk of rows is written as a row group,
+    one line per column holding that column's values for the group. Like values
+    sit next to each other, so the file compresses better than row-oriented CSV,
+    and any CSV reader can load it with read_columnar()
+    """
+    
+    def __init__(self, path, columns):
+        self.columns = columns
+        self.file = gzip.open(path, 'wt', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(['#columns'] + list(columns))
+    
+    def write(self, rows):
+        if not rows:
+            return
+        for name, values in zip(self.columns, zip(*rows)):
+            self.writer.writerow([name] + [to_text(v) for v in values])
+    
+    def close(self):
+        self.file.close()
+
+
+class XlsxWriter:
+    """openpyxl write-only workbook; rows go straight to the sheet's XML stream"""
+    
+    def __init__(self, path, columns, sheet_title='Export'):
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        
+        self.path = path
+        self.columns = columns
+        self.sheet_title = sheet_title
+        self.workbook = Workbook(write_only=True)
+        self.cell_class = WriteOnlyCell
+        self.header_font = Font(bold=True)
+        self.sheet = None
+        self.sheet_rows = 0
+        self.sheets = 0
+        self._new_sheet()
+    
+    def _new_sheet(self):
+        self.sheets += 1
+        title = self.sheet_title if self.sheets == 1 else f"{self.sheet_title} {self.sheets}"
+        self.sheet = self.workbook.create_sheet(title[:31])
+        self.sheet.freeze_panes = 'A2'
+        
+        header = []
+        for name in self.columns:
+            cell = self.cell_class(self.sheet, value=name)
+            cell.font = self.header_font
+            header.append(cell)
+        self.sheet.append(header)
+        self.sheet_rows = 0
+    
+    def write(self, rows):
+        for row in rows:
+            if self.sheet_rows >= XLSX_MAX_ROWS:
+                self._new_sheet()
+            self.sheet.append([v.decode('utf-8', 'replace') if isinstance(v, bytes) else v for v in row])
+            self.sheet_rows += 1
+    
+    def close(self):
+        self.workbook.save(self.path)
+
+
+class QueryExporter:
+    """Streams a query through an unbuffered cursor into an export file, chunk by chunk"""
+    
+    def __init__(self, chunk_size=10000):
+        self.connection = None
+        self.chunk_size = chunk_size
+    
+    def get_connection(self):
+        """Get a dedicated connection; an unbuffered result holds it until fully read"""
+        try:
+            if self.connection is None or not self.connection.is_connected():
+                self.connection = mysql.connector.connect(**DB_CONFIG)
+            return self.connection
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+    
+    def close_connection(self):
+        """Close database connection"""
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+    
+    def count_rows(self, query, params=None):
+        """Count the rows a query returns, for progress reporting"""
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM ({query}) export_rows", params or ())
+        total = cursor.fetchone()[0]
+        cursor.close()
+        return total
+    
+    def _open_writer(self, fmt, path, columns, sheet_title):
+        if fmt == 'csv':
+            return CsvWriter(path, columns)
+        if fmt == 'csv.gz':
+            return CsvWriter(path, columns, compress=True)
+        if fmt == 'columnar':
+            return ColumnarWriter(path, columns)
+        if fmt == 'xlsx':
+            return XlsxWriter(path, columns, sheet_title)
+        raise ValueError(f"Unsupported export format: {fmt}")
+    
+    def export(self, query, params=None, path=None, fmt=None, progress=None, count=True, sheet_title='Export'):
+        """
+        Stream a query's rows into a file
+        Rows are read with fetchmany() from an unbuffered cursor and written
+        chunk by chunk, so memory stays bounded by chunk_size whatever the row count.
+        The file is written under a temporary name and only renamed into place once
+        complete.
+        Args:
+            query (str): SELECT statement
+            params (tuple): Query parameters
+            path (str): Output file; the format follows from its suffix unless fmt is given
+            fmt (str): 'csv', 'csv.gz', 'columnar' or 'xlsx'
+            progress (callable): Called as progress(rows_written, total) after each chunk;
+                return False to cancel. total is None when count is False
+            count (bool): Run a COUNT(*) first so progress has a total
+            sheet_title (str): Worksheet title for XLSX
+        Returns:
+            dict: Result with success flag, message, path and rows written
+        """
+        fmt = fmt or detect_format(path)
+        temp_path = path + '.part'
+        rows_written = 0
+        writer = None
+        
+        try:
+            total = self.count_rows(query, params) if count and progress else None
+            
+            connection = self.get_connection()
+            cursor = connection.cursor(buffered=False)
+            cursor.execute(query, params or ())
+            columns = [c[0] for c in cursor.description]
+            
+            completed = False
+            try:
+                writer = self._open_writer(fmt, temp_path, columns, sheet_title)
+                
+                while True:
+                    rows = cursor.fetchmany(self.chunk_size)
+                    if not rows:
+                        break
+                    writer.write(rows)
+                    rows_written += len(rows)
+                    
+                    if progress and progress(rows_written, total) is False:
+                        raise ExportCancelled(f"Export cancelled after {rows_written} rows")
+                
+                completed = True
+            
+            finally:
+                if writer is not None:
+                    writer.close()
+                if completed:
+                    cursor.close()
+                else:
+                    # An unread unbuffered result blocks the connection; closing it discards the rest
+                    self.close_connection()
+            
+            os.replace(temp_path, path)
+            logger.info(f"Exported {rows_written} rows to {path}")
+            return {"success": True, "message": f"Exported {rows_written:,} rows to {path}",
+                    "path": path, "rows": rows_written}
+        
+        except ExportCancelled as e:
+            self._discard(temp_path)
+            return {"success": False, "message": str(e), "path": None, "rows": rows_written}
+        
+        except (Error, OSError, ValueError) as e:
+            self._discard(temp_path)
+            logger.error(f"Export to {path} failed: {e}")
+            return {"success": False, "message": f"Export failed: {str(e)}", "path": None, "rows": rows_written}
+    
+    @staticmethod
+    def _discard(temp_path):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    
+    def __del__(self):
+        """Destructor to ensure connection is closed"""
+        self.close_connection()
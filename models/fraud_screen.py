@@ -0,0 +1,222 @@
+"""
+Velocity Fraud Screening for Bank Management System
+Flags or rejects postings when an account's recent activity exceeds configured thresholds
+
+Each posting is checked against the rules with the count and amount over the
+last 1, 10 and 60 minutes, the posting itself included. A posting that is let
+through is counted in one-minute buckets; the caller takes it back out with
+forget() if the posting does not commit, and rejected postings are never
+counted, so refused attempts and retries do not extend a rejection. Only
+minutes with activity take a bucket, at most 60 per account, and accounts are
+kept in a bounded LRU, so memory stays fixed however many accounts post. An
+account evicted from the LRU starts again from zero.
+
+Rules are dicts; the defaults below can be replaced with FraudScreen(rules)
+or loaded from a JSON list with load_rules():
+    name        Shown in alerts and rejection messages
+    window      Minutes: 1, 10 or 60
+    max_count   Most postings allowed in the window (optional)
+    max_amount  Largest total amount allowed in the window (optional)
+    types       Posting types the rule counts and checks (optional, default all)
+    action      FLAG lets the posting through and records an alert;
+                REJECT refuses it (nothing is queued for review, the
+                customer or operator retries once activity slows down)
+"""
+
+from collections import OrderedDict, deque
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = (1, 10, 60)
+ACTIONS = ('FLAG', 'REJECT')
+POSTING_TYPES = ('DEPOSIT', 'WITHDRAWAL', 'TRANSFER')
+
+DEFAULT_RULES = [
+    {'name': 'burst', 'window': 1, 'max_count': 5, 'types': ['WITHDRAWAL', 'TRANSFER'], 'action': 'REJECT'},
+    {'name': 'rapid_outflow', 'window': 10, 'max_amount': 200000, 'types': ['WITHDRAWAL', 'TRANSFER'],
+     'action': 'REJECT'},
+    {'name': 'frequent_postings', 'window': 10, 'max_count': 15, 'action': 'FLAG'},
+    {'name': 'hourly_postings', 'window': 60, 'max_count': 40, 'action': 'FLAG'},
+    {'name': 'hourly_amount', 'window': 60, 'max_amount': 500000, 'action': 'FLAG'}
+]
+
+
+def validate_rules(rules):
+    """
+    Check a rule list before it is used
+    Returns:
+        list: Error messages, empty if the rules are valid
+    """
+    errors = []
+    for i, rule in enumerate(rules):
+        name = rule.get('name') or f"rule {i + 1}"
+        if rule.get('window') not in WINDOWS:
+            errors.append(f"{name}: window must be one of {', '.join(map(str, WINDOWS))}")
+        if rule.get('max_count') is None and rule.get('max_amount') is None:
+            errors.append(f"{name}: needs max_count or max_amount")
+        if str(rule.get('action', '')).upper() not in ACTIONS:
+            errors.append(f"{name}: action must be FLAG or REJECT")
+        unknown = [t for t in rule.get('types') or () if t not in POSTING_TYPES]
+        if unknown:
+            errors.append(f"{name}: unknown posting types {', '.join(unknown)}")
+    return errors
+
+
+def load_rules(path):
+    """Read and validate a JSON list of rules"""
+    with open(path, 'r', encoding='utf-8') as f:
+        rules = json.load(f)
+    errors = validate_rules(rules)
+    if errors:
+        raise ValueError("Invalid fraud rules: " + "; ".join(errors))
+    return rules
+
+
+class FraudScreen:
+    """Sliding-window posting counters per account, checked against velocity rules"""
+    
+    def __init__(self, rules=None, max_accounts=100000, max_alerts=1000):
+        self.max_accounts = max_accounts
+        self.lock = threading.Lock()
+        # account_id -> deque of [minute, count per posting type..., amount per posting type...],
+        # newest last
+        self.accounts = OrderedDict()
+        self.alerts = deque(maxlen=max_alerts)
+        self.stats = {'screened': 0, 'flagged': 0, 'rejected': 0, 'forgotten': 0, 'screen_ns': 0}
+        self.configure(DEFAULT_RULES if rules is None else rules)
+    
+    def configure(self, rules):
+        """Replace the rules; counters are kept"""
+        errors = validate_rules(rules)
+        if errors:
+            raise ValueError("Invalid fraud rules: " + "; ".join(errors))
+        # Tuples in evaluation order: REJECT rules first so a rejection is never masked by a flag
+        compiled = [
+            (rule.get('name', 'rule'), WINDOWS.index(rule['window']), rule.get('max_count'),
+             rule.get('max_amount'), tuple(POSTING_TYPES.index(t) for t in rule.get('types') or POSTING_TYPES),
+             rule['action'].upper())
+            for rule in rules
+        ]
+        compiled.sort(key=lambda r: r[5] != 'REJECT')
+        self.rules = compiled
+    
+    def screen(self, account_id, posting_type, amount):
+        """
+        Check a posting against the account's recent activity, counting it unless rejected
+        Args:
+            account_id (int): Account being posted to or from
+            posting_type (str): DEPOSIT, WITHDRAWAL or TRANSFER
+            amount: Posting amount
+        Returns:
+            dict: action (PASS, FLAG or REJECT), rules that fired, a message, and the
+                  bucket the posting was counted in (pass the verdict to forget()
+                  if the posting does not commit)
+        """
+        started = time.perf_counter_ns()
+        minute = int(time.time() // 60)
+        amount = float(amount)
+        kind = POSTING_TYPES.index(posting_type)
+        types = len(POSTING_TYPES)
+        
+        with self.lock:
+            buckets = self.accounts.get(account_id)
+            if buckets is None:
+                buckets = self.accounts[account_id] = deque(maxlen=WINDOWS[-1])
+                while len(self.accounts) > self.max_accounts:
+                    self.accounts.popitem(last=False)
+            else:
+                self.accounts.move_to_end(account_id)
+            
+            # One pass from the newest bucket sums each bucket into the band between
+            # two windows; each window's totals are then its band plus the narrower ones.
+            # totals[window][i] is the count of type i, totals[window][types + i] its amount
+            bands = [[] for _ in WINDOWS]
+            w = 0
+            for bucket in reversed(buckets):
+                age = minute - bucket[0]
+                while w < len(WINDOWS) and age >= WINDOWS[w]:
+                    w += 1
+                if w == len(WINDOWS):
+                    break
+                bands[w].append(bucket)
+            # The posting being screened counts in every window
+            running = [0] * (2 * types)
+            running[kind] = 1
+            running[types + kind] = amount
+            totals = []
+            for band in bands:
+                if band:
+                    running = [sum(column) for column in zip(running, *(bucket[1:] for bucket in band))]
+                totals.append(running)
+            
+            fired = [
+                (name, action) for name, w, max_count, max_amount, kinds, action in self.rules
+                if kind in kinds and (
+                    (max_count is not None and sum(totals[w][k] for k in kinds) > max_count)
+                    or (max_amount is not None and sum(totals[w][types + k] for k in kinds) > max_amount)
+                )
+            ]
+            
+            self.stats['screened'] += 1
+            action = fired[0][1] if fired else 'PASS'
+            counted = None
+            if action != 'REJECT':
+                if not buckets or buckets[-1][0] != minute:
+                    buckets.append([minute] + [0] * types + [0.0] * types)
+                buckets[-1][1 + kind] += 1
+                buckets[-1][1 + types + kind] += amount
+                counted = (account_id, minute, kind, amount)
+            if fired:
+                self.stats['rejected' if action == 'REJECT' else 'flagged'] += 1
+                self.alerts.append({
+                    'time': time.time(), 'account_id': account_id, 'type': posting_type, 'amount': amount,
+                    'action': action, 'rules': [name for name, _ in fired]
+                })
+            self.stats['screen_ns'] += time.perf_counter_ns() - started
+        
+        if action == 'PASS':
+            return {'action': action, 'rules': [], 'message': None, 'counted': counted}
+        rules = [name for name, _ in fired]
+        logger.warning(f"Fraud screen {action} - Account: {account_id}, {posting_type} {amount:,.2f}, "
+                       f"rules: {', '.join(rules)}")
+        message = (f"Refused: unusual activity on this account ({', '.join(rules)}), please try again later"
+                   if action == 'REJECT' else f"Flagged for review: {', '.join(rules)}")
+        return {'action': action, 'rules': rules, 'message': message, 'counted': counted}
+    
+    def forget(self, verdict):
+        """Take back a counted posting that did not commit"""
+        if not verdict or verdict.get('counted') is None:
+            return
+        account_id, minute, kind, amount = verdict['counted']
+        types = len(POSTING_TYPES)
+        with self.lock:
+            for bucket in reversed(self.accounts.get(account_id, ())):
+                if bucket[0] == minute:
+                    bucket[1 + kind] = max(bucket[1 + kind] - 1, 0)
+                    bucket[1 + types + kind] = max(bucket[1 + types + kind] - amount, 0.0)
+                    self.stats['forgotten'] += 1
+                    break
+                if bucket[0] < minute:
+                    break
+    
+    def recent_alerts(self, limit=100):
+        """Most recent flags and rejections, newest first"""
+        with self.lock:
+            return list(self.alerts)[-limit:][::-1]
+    
+    def metrics(self):
+        """Screening counts and the mean time spent per screen"""
+        with self.lock:
+            stats = dict(self.stats)
+            tracked = len(self.accounts)
+        screen_ns = stats.pop('screen_ns')
+        stats['tracked_accounts'] = tracked
+        stats['mean_screen_us'] = round(screen_ns / stats['screened'] / 1000, 2) if stats['screened'] else 0
+        return stats
+
+
+fraud_screen = FraudScreen()
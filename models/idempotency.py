@@ -0,0 +1,147 @@
+"""
+Idempotency Keys for Bank Management System
+Makes a retried deposit, withdrawal or transfer return the first attempt's result instead of posting again
+
+A caller picks one key per logical operation and sends it with every attempt.
+The posting transaction claims the key by inserting it into idempotency_keys
+before touching any balance, so a concurrent retry blocks on the key row and
+then sees the committed result. Recently committed keys are also kept in
+memory, so a retry within this process is answered without a database probe.
+"""
+
+from mysql.connector import IntegrityError, errorcode
+from collections import OrderedDict
+from decimal import Decimal
+import json
+import threading
+
+KEY_MAX_LENGTH = 64
+CENT = Decimal('0.01')
+
+CLAIM_SQL = """
+    INSERT INTO idempotency_keys (idempotency_key, request_fingerprint, transaction_number)
+    VALUES (%s, %s, %s)
+"""
+COMPLETE_SQL = "UPDATE idempotency_keys SET response = %s WHERE idempotency_key = %s"
+
+
+def fingerprint(operation, account_id, amount, to_account_id=None):
+    """Identify the request a key was first used for, so a reused key with other details is refused"""
+    amount = Decimal(str(amount)).quantize(CENT)
+    return f"{operation.upper()}:{account_id}:{to_account_id or ''}:{amount}"
+
+
+def invalid_key(key):
+    """
+    Check a caller-supplied key
+    Returns:
+        str: Error message, or None if the key is usable
+    """
+    if not isinstance(key, str) or not key.strip():
+        return "Idempotency key must be a non-empty string"
+    if len(key) > KEY_MAX_LENGTH:
+        return f"Idempotency key must be at most {KEY_MAX_LENGTH} characters"
+    return None
+
+
+def replay(request, stored_request, stored_result):
+    """
+    Result to return for a key that has already been used
+    Returns:
+        dict: The original result marked as a duplicate, or an error if the key
+              was first used for a different request
+    """
+    if stored_request != request:
+        return {"success": False, "message": "Idempotency key was already used for a different transaction"}
+    return dict(stored_result, duplicate=True)
+
+
+def _json_result(result):
+    """Serialize a result for the response column; Decimals and dates become strings"""
+    return json.dumps({k: v for k, v in result.items() if k != 'key'}, default=str)
+
+
+def claim(cursor, key, request, reference):
+    """
+    Claim a key inside the posting transaction
+    Blocks while another open transaction holds the same key
+    Returns:
+        bool: False if the key is already committed
+    """
+    try:
+        cursor.execute(CLAIM_SQL, (key, request, reference))
+        return True
+    except IntegrityError as e:
+        if e.errno != errorcode.ER_DUP_ENTRY:
+            raise
+        return False
+
+
+def complete(cursor, key, result):
+    """Store the result of a claimed key before the posting transaction commits"""
+    cursor.execute(COMPLETE_SQL, (_json_result(result), key))
+
+
+def complete_many(cursor, entries):
+    """
+    Store the results of several claimed keys in one statement
+    Args:
+        entries (dict): key -> (request fingerprint, result)
+    """
+    cursor.executemany(COMPLETE_SQL, [(_json_result(result), key) for key, (_, result) in entries.items()])
+
+
+def load(cursor, keys, lock=False):
+    """
+    Read committed keys
+    Args:
+        keys (iterable): Keys to look up
+        lock (bool): Lock the rows for the rest of the transaction
+    Returns:
+        dict: key -> (request fingerprint, result) for the keys that exist
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return {}
+    placeholders = ", ".join(["%s"] * len(keys))
+    cursor.execute(f"""
+        SELECT idempotency_key, request_fingerprint, response
+        FROM idempotency_keys
+        WHERE idempotency_key IN ({placeholders})
+        {'FOR UPDATE' if lock else ''}
+    """, keys)
+    return {key: (request, json.loads(response) if response else {"success": True})
+            for key, request, response in cursor.fetchall()}
+
+
+class RecentKeys:
+    """Bounded LRU of keys committed by this process"""
+    
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+    
+    def get(self, key):
+        """
+        Returns:
+            tuple: (request fingerprint, result), or None if not seen recently
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            return entry
+    
+    def put(self, key, request, result):
+        """Remember a committed key"""
+        with self.lock:
+            self.entries[key] = (request, {k: v for k, v in result.items() if k != 'key'})
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+recent_keys = RecentKeys()
@@ -0,0 +1,281 @@
+"""
+Ledger Replay Engine for Bank Management System
+Replays the transactions ledger per account and verifies balance continuity
+
+Usage:
+    python -m models.ledger
+    python -m models.ledger --workers 8 --range-size 5000
+"""
+
+import mysql.connector
+from mysql.connector import Error
+from config import DB_CONFIG
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from decimal import Decimal
+import argparse
+import csv
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Transaction types by their effect on the account balance
+CREDIT_TYPES = ('DEPOSIT', 'TRANSFER_IN', 'INTEREST_CREDIT')
+DEBIT_TYPES = ('WITHDRAWAL', 'TRANSFER_OUT', 'FEE_DEBIT')
+
+# Discrepancy kinds reported by the replay
+CHAIN_BREAK = 'CHAIN_BREAK'            # balance_before differs from the previous balance_after
+AMOUNT_MISMATCH = 'AMOUNT_MISMATCH'    # balance_after differs from balance_before +/- amount
+FINAL_MISMATCH = 'FINAL_MISMATCH'      # last balance_after differs from accounts.balance
+UNKNOWN_TYPE = 'UNKNOWN_TYPE'          # transaction type with no known balance effect
+
+DISCREPANCY_KINDS = (CHAIN_BREAK, AMOUNT_MISMATCH, FINAL_MISMATCH, UNKNOWN_TYPE)
+
+
+def signed_amount(transaction_type, amount):
+    """Return the amount signed by its effect on the account balance"""
+    if transaction_type in CREDIT_TYPES:
+        return amount
+    if transaction_type in DEBIT_TYPES:
+        return -amount
+    return None
+
+
+def replay_account_range(start_id, end_id, fetch_size=10000, max_samples=1000):
+    """
+    Replay the ledger for all accounts with start_id <= account_id <= end_id
+    Runs inside a worker process, so it opens its own connection
+    Args:
+        start_id (int): First account ID of the range
+        end_id (int): Last account ID of the range
+        fetch_size (int): Rows fetched per round-trip while streaming
+        max_samples (int): Maximum discrepancies kept for the report
+    Returns:
+        dict: Counters and sampled discrepancies for the range
+    """
+    result = {
+        'start_id': start_id,
+        'end_id': end_id,
+        'accounts_checked': 0,
+        'rows_scanned': 0,
+        'counts': {kind: 0 for kind in DISCREPANCY_KINDS},
+        'discrepancies': []
+    }
+
+    def record(kind, account_id, transaction_id, expected, actual):
+        result['counts'][kind] += 1
+        if len(result['discrepancies']) < max_samples:
+            result['discrepancies'].append((kind, account_id, transaction_id, expected, actual))
+
+    connection = mysql.connector.connect(**DB_CONFIG)
+    try:
+        # One read-only snapshot, so postings committed while the range streams
+        # cannot show up as a mismatch against a balance read earlier
+        connection.start_transaction(consistent_snapshot=True, isolation_level='REPEATABLE READ',
+                                     readonly=True)
+
+        # Stream the range in (account_id, transaction_id) order, driven from accounts
+        # so an account without transactions still gets a row and is checked against
+        # zero; the unbuffered cursor keeps only one fetch_size chunk in memory at a time
+        cursor = connection.cursor(buffered=False)
+        cursor.execute("""
+            SELECT a.account_id, a.balance, t.transaction_id, t.transaction_type, t.amount,
+                   t.balance_before, t.balance_after
+            FROM accounts a
+            LEFT JOIN transactions t
+                ON t.account_id = a.account_id AND t.status = 'COMPLETED'
+            WHERE a.account_id BETWEEN %s AND %s
+            ORDER BY a.account_id, t.transaction_id
+        """, (start_id, end_id))
+
+        current_account = None
+        current_balance = None
+        previous_after = None
+        last_transaction_id = None
+
+        def close_account():
+            result['accounts_checked'] += 1
+            actual = Decimal('0') if previous_after is None else previous_after
+            if current_balance != actual:
+                record(FINAL_MISMATCH, current_account, last_transaction_id, current_balance, actual)
+
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+
+            for account_id, balance, transaction_id, transaction_type, amount, before, after in rows:
+                if account_id != current_account:
+                    if current_account is not None:
+                        close_account()
+                    current_account = account_id
+                    current_balance = balance
+                    previous_after = None
+                    last_transaction_id = None
+
+                if transaction_id is None:
+                    continue
+                result['rows_scanned'] += 1
+
+                if previous_after is not None and before != previous_after:
+                    record(CHAIN_BREAK, account_id, transaction_id, previous_after, before)
+
+                delta = signed_amount(transaction_type, amount)
+                if delta is None:
+                    record(UNKNOWN_TYPE, account_id, transaction_id, None, transaction_type)
+                elif before + delta != after:
+                    record(AMOUNT_MISMATCH, account_id, transaction_id, before + delta, after)
+
+                previous_after = after
+                last_transaction_id = transaction_id
+
+        if current_account is not None:
+            close_account()
+
+        cursor.close()
+        connection.rollback()
+        return result
+
+    finally:
+        connection.close()
+
+
+class LedgerReplay:
+    """Partitions the ledger by account_id range and replays it on a process pool"""
+
+    def __init__(self, workers=None, range_size=5000, fetch_size=10000, max_samples=1000):
+        self.workers = workers or os.cpu_count() or 1
+        self.range_size = range_size
+        self.fetch_size = fetch_size
+        self.max_samples = max_samples
+
+    def get_account_id_bounds(self):
+        """Get the lowest and highest account IDs"""
+        try:
+            connection = mysql.connector.connect(**DB_CONFIG)
+            cursor = connection.cursor()
+            cursor.execute("SELECT MIN(account_id), MAX(account_id) FROM accounts")
+            bounds = cursor.fetchone()
+            cursor.close()
+            connection.close()
+            return bounds
+        except Error as e:
+            logger.error(f"Error fetching account ID bounds: {e}")
+            raise
+
+    def get_ranges(self):
+        """Split the account ID space into contiguous ranges of range_size IDs"""
+        low, high = self.get_account_id_bounds()
+        if low is None:
+            return []
+        return [(start, min(start + self.range_size - 1, high))
+                for start in range(low, high + 1, self.range_size)]
+
+    def run(self):
+        """
+        Replay every account range across the process pool
+        Returns:
+            dict: Merged summary with counters and sampled discrepancies
+        """
+        started = time.time()
+        ranges = self.get_ranges()
+        summary = {
+            'started_at': datetime.now(),
+            'ranges': len(ranges),
+            'accounts_checked': 0,
+            'rows_scanned': 0,
+            'counts': {kind: 0 for kind in DISCREPANCY_KINDS},
+            'discrepancies': [],
+            'failed_ranges': []
+        }
+
+        logger.info(f"Replaying ledger over {len(ranges)} account ranges with {self.workers} workers")
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(replay_account_range, start, end, self.fetch_size, self.max_samples): (start, end)
+                for start, end in ranges
+            }
+
+            for future in as_completed(futures):
+                start, end = futures[future]
+                try:
+                    part = future.result()
+                except Exception as e:
+                    logger.error(f"Ledger replay failed for accounts {start}-{end}: {e}")
+                    summary['failed_ranges'].append((start, end, str(e)))
+                    continue
+
+                summary['accounts_checked'] += part['accounts_checked']
+                summary['rows_scanned'] += part['rows_scanned']
+                for kind, count in part['counts'].items():
+                    summary['counts'][kind] += count
+
+                room = self.max_samples - len(summary['discrepancies'])
+                if room > 0:
+                    summary['discrepancies'].extend(part['discrepancies'][:room])
+
+        summary['elapsed_seconds'] = round(time.time() - started, 2)
+        summary['discrepancies'].sort(key=lambda d: (d[1], d[2] or 0))
+
+        logger.info(
+            f"Ledger replay finished - Accounts: {summary['accounts_checked']}, "
+            f"Rows: {summary['rows_scanned']}, Discrepancies: {sum(summary['counts'].values())}, "
+            f"Elapsed: {summary['elapsed_seconds']}s"
+        )
+        return summary
+
+    def write_report(self, summary, reports_dir="reports"):
+        """
+        Write a compact discrepancy report as CSV
+        Args:
+            summary (dict): Summary returned by run()
+            reports_dir (str): Directory for the report file
+        Returns:
+            str: Path of the written report
+        """
+        os.makedirs(reports_dir, exist_ok=True)
+        timestamp = summary['started_at'].strftime("%Y%m%d_%H%M%S")
+        filepath = os.path.join(reports_dir, f"ledger_discrepancies_{timestamp}.csv")
+
+        with open(filepath, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['# accounts_checked', summary['accounts_checked'],
+                             'rows_scanned', summary['rows_scanned'],
+                             'elapsed_seconds', summary['elapsed_seconds']])
+            writer.writerow(['# counts'] + [f"{kind}={count}" for kind, count in summary['counts'].items()])
+            for start, end, error in summary['failed_ranges']:
+                writer.writerow(['# failed_range', start, end, error])
+            writer.writerow(['kind', 'account_id', 'transaction_id', 'expected', 'actual'])
+            for kind, account_id, transaction_id, expected, actual in summary['discrepancies']:
+                writer.writerow([kind, account_id, transaction_id,
+                                 '' if expected is None else expected,
+                                 '' if actual is None else actual])
+
+        logger.info(f"Ledger discrepancy report written to: {filepath}")
+        return filepath
+
+
+def main():
+    """Command line entry point for the nightly ledger replay"""
+    parser = argparse.ArgumentParser(description='Replay the transactions ledger and verify balances')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--range-size', type=int, default=5000, help='Account IDs per work unit')
+    parser.add_argument('--fetch-size', type=int, default=10000, help='Rows fetched per round-trip')
+    parser.add_argument('--max-samples', type=int, default=1000, help='Discrepancies kept in the report')
+    parser.add_argument('--output', default='reports', help='Directory for the discrepancy report')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    replay = LedgerReplay(args.workers, args.range_size, args.fetch_size, args.max_samples)
+    summary = replay.run()
+    replay.write_report(summary, args.output)
+
+    return 1 if sum(summary['counts'].values()) or summary['failed_ranges'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
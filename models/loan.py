@@ -1,6 +1,70 @@
 from models.database import db
+from models.loan_payment import LoanPaymentPoster
+from models.loan_disbursement import LoanDisbursement
 from datetime import datetime, date
+from functools import lru_cache
 import logging
+import math
+
+@lru_cache(maxsize=2048)
+def amortization_schedule(principal, annual_rate, tenure_months):
+    """
+    Build the amortization schedule for a loan; results are memoized per terms
+    Args:
+        principal (float): Loan amount, rounded to paise
+        annual_rate (float): Annual interest rate in percent
+        tenure_months (int): Number of installments
+    Returns:
+        tuple: (emi, rows, interest_remaining) where rows are
+               (installment, interest, principal, balance) tuples and
+               interest_remaining[k] is the interest still due after k installments
+    """
+    monthly_rate = annual_rate / (12 * 100)
+    if monthly_rate == 0:
+        emi = round(principal / tenure_months, 2)
+    else:
+        growth = (1 + monthly_rate) ** tenure_months
+        emi = round(principal * monthly_rate * growth / (growth - 1), 2)
+    
+    rows = []
+    balance = principal
+    for installment in range(1, tenure_months + 1):
+        interest = round(balance * monthly_rate, 2)
+        # The last installment clears whatever rounding has left over
+        principal_part = balance if installment == tenure_months else min(round(emi - interest, 2), balance)
+        balance = round(balance - principal_part, 2)
+        rows.append((installment, interest, principal_part, balance))
+    
+    interest_remaining = [0.0] * (tenure_months + 1)
+    for k in range(tenure_months - 1, -1, -1):
+        interest_remaining[k] = round(interest_remaining[k + 1] + rows[k][1], 2)
+    
+    return emi, tuple(rows), tuple(interest_remaining)
+
+def _schedule(principal, annual_rate, tenure_months):
+    """Normalize the cache key so equal terms share one schedule"""
+    return amortization_schedule(round(float(principal), 2), round(float(annual_rate), 4), int(tenure_months))
+
+def _months_to_repay(balance, annual_rate, emi):
+    """
+    Months and total interest to repay a balance at a fixed EMI
+    Returns:
+        tuple: (months, interest)
+    """
+    monthly_rate = annual_rate / (12 * 100)
+    if balance <= 0:
+        return 0, 0.0
+    if monthly_rate == 0:
+        return math.ceil(balance / emi), 0.0
+    if emi <= balance * monthly_rate:
+        raise ValueError("EMI does not cover the monthly interest")
+    
+    months = math.ceil(-math.log(1 - balance * monthly_rate / emi) / math.log(1 + monthly_rate) - 1e-9)
+    growth = (1 + monthly_rate) ** (months - 1)
+    # Balance left before the final, smaller installment
+    last_balance = balance * growth - emi * (growth - 1) / monthly_rate
+    total_paid = emi * (months - 1) + last_balance * (1 + monthly_rate)
+    return months, round(total_paid - balance, 2)
 
 class Loan:
     """Loan model for handling loan-related operations"""
@@ -96,6 +160,148 @@ class Loan:
             logging.error(f"Error calculating EMI: {e}")
             return 0
     
+    def get_amortization_schedule(self, principal, annual_rate, tenure_months):
+        """Get the full amortization schedule as a list of dicts"""
+        emi, rows, _ = _schedule(principal, annual_rate, tenure_months)
+        return [
+            {'installment': n, 'emi': emi, 'interest': interest, 'principal': part, 'balance': balance}
+            for n, interest, part, balance in rows
+        ]
+    
+    def get_simulation_terms(self, loan_id):
+        """
+        Get the terms a what-if simulation starts from
+        The balance is the loan's actual outstanding_amount, so missed, partial and
+        prepaid installments are reflected, not the balance the schedule expects
+        Returns:
+            dict: outstanding, annual_rate, remaining_months and installments_paid, or None
+        """
+        query = """
+        SELECT l.outstanding_amount, l.interest_rate, l.tenure_months,
+               (SELECT COUNT(*) FROM loan_payments p
+                WHERE p.loan_id = l.loan_id AND p.status = 'PAID') as installments_paid
+        FROM loans l
+        WHERE l.loan_id = %s
+        """
+        result = self.db.execute_query(query, (loan_id,))
+        if not result:
+            return None
+        
+        row = result[0]
+        outstanding = round(float(row['outstanding_amount']), 2)
+        installments_paid = min(int(row['installments_paid']), int(row['tenure_months']))
+        remaining_months = int(row['tenure_months']) - installments_paid
+        # A balance left after the last installment is due now, over one month
+        if outstanding > 0:
+            remaining_months = max(remaining_months, 1)
+        
+        return {
+            'outstanding': outstanding,
+            'annual_rate': float(row['interest_rate']),
+            'remaining_months': remaining_months,
+            'installments_paid': installments_paid
+        }
+    
+    def simulate_prepayment(self, outstanding, annual_rate, remaining_months, prepayment_amount,
+                            mode='REDUCE_TENURE'):
+        """
+        Simulate a part prepayment of the outstanding balance
+        Args:
+            outstanding (float): Balance outstanding today
+            annual_rate (float): Annual interest rate in percent
+            remaining_months (int): Installments left on the loan
+            prepayment_amount (float): Amount prepaid
+            mode (str): 'REDUCE_TENURE' keeps the EMI, 'REDUCE_EMI' keeps the tenure
+        Returns:
+            dict: Current vs simulated EMI, remaining months and remaining interest
+        """
+        balance = round(float(outstanding), 2)
+        remaining_months = int(remaining_months)
+        emi, interest_remaining = self._project(balance, annual_rate, remaining_months)
+        
+        prepayment_amount = min(round(float(prepayment_amount), 2), balance)
+        new_balance = round(balance - prepayment_amount, 2)
+        
+        if new_balance <= 0:
+            new_emi, new_months, new_interest = 0.0, 0, 0.0
+        elif mode == 'REDUCE_EMI':
+            new_emi, new_interest = self._project(new_balance, annual_rate, remaining_months)
+            new_months = remaining_months
+        elif mode == 'REDUCE_TENURE':
+            new_emi = emi
+            new_months, new_interest = _months_to_repay(new_balance, float(annual_rate), emi)
+        else:
+            raise ValueError(f"Unknown prepayment mode: {mode}")
+        
+        return {
+            'mode': mode,
+            'outstanding_before': balance,
+            'prepayment_amount': prepayment_amount,
+            'outstanding_after': new_balance,
+            'current_emi': emi,
+            'new_emi': new_emi,
+            'current_remaining_months': remaining_months,
+            'new_remaining_months': new_months,
+            'months_saved': remaining_months - new_months,
+            'current_remaining_interest': interest_remaining,
+            'new_remaining_interest': new_interest,
+            'interest_saved': round(interest_remaining - new_interest, 2)
+        }
+    
+    def simulate_restructure(self, outstanding, annual_rate, remaining_months,
+                             new_annual_rate=None, new_remaining_months=None):
+        """
+        Simulate re-pricing and/or re-tenuring the outstanding balance
+        Args:
+            outstanding (float): Balance outstanding today
+            annual_rate (float): Annual interest rate in percent
+            remaining_months (int): Installments left on the loan
+            new_annual_rate (float): New rate (default: unchanged)
+            new_remaining_months (int): New remaining tenure (default: unchanged)
+        Returns:
+            dict: Current vs restructured EMI, remaining months and remaining interest
+        Raises:
+            ValueError: If the new tenure is not positive while a balance remains
+        """
+        balance = round(float(outstanding), 2)
+        remaining_months = int(remaining_months)
+        emi, interest_remaining = self._project(balance, annual_rate, remaining_months)
+        
+        new_annual_rate = annual_rate if new_annual_rate is None else new_annual_rate
+        new_remaining_months = remaining_months if new_remaining_months is None else int(new_remaining_months)
+        
+        if balance <= 0:
+            new_emi, new_interest = 0.0, 0.0
+        elif new_remaining_months <= 0:
+            raise ValueError(f"New remaining tenure must be positive while {balance:,.2f} is outstanding")
+        else:
+            new_emi, new_interest = self._project(balance, new_annual_rate, new_remaining_months)
+        
+        return {
+            'outstanding': balance,
+            'current_rate': float(annual_rate),
+            'new_rate': float(new_annual_rate),
+            'current_emi': emi,
+            'new_emi': new_emi,
+            'emi_change': round(new_emi - emi, 2),
+            'current_remaining_months': remaining_months,
+            'new_remaining_months': new_remaining_months,
+            'current_remaining_interest': interest_remaining,
+            'new_remaining_interest': new_interest,
+            'interest_saved': round(interest_remaining - new_interest, 2)
+        }
+    
+    def _project(self, balance, annual_rate, months):
+        """
+        Project repaying a balance over a number of months from the memoized schedule
+        Returns:
+            tuple: (emi, interest) with (0.0, 0.0) once nothing is left to repay
+        """
+        if balance <= 0 or months <= 0:
+            return 0.0, 0.0
+        emi, _, interest_remaining = _schedule(balance, annual_rate, months)
+        return emi, interest_remaining[0]
+    
     def approve_loan(self, loan_id, approved_by, approval_date=None):
         """Approve a loan application"""
         try:
@@ -105,7 +311,7 @@ class Loan:
             query = """
             UPDATE loans 
             SET status = 'APPROVED', approval_date = %s, approved_by = %s,
-                updated_at = CURRENT_TIMESTAMP
+                updated_date = CURRENT_TIMESTAMP
             WHERE loan_id = %s AND status = 'APPLIED'
             """
             
@@ -124,7 +330,7 @@ class Loan:
         try:
             query = """
             UPDATE loans 
-            SET status = 'REJECTED', updated_at = CURRENT_TIMESTAMP
+            SET status = 'REJECTED', updated_date = CURRENT_TIMESTAMP
             WHERE loan_id = %s AND status = 'APPLIED'
             """
             
@@ -136,53 +342,15 @@ class Loan:
             return False
     
     def disburse_loan(self, loan_id, account_id, disbursement_date=None):
-        """Disburse an approved loan"""
+        """
+        Disburse an approved loan
+        The loan status change, account credit and EMI schedule commit together
+        Returns:
+            tuple: (success, message)
+        """
         try:
-            if not disbursement_date:
-                disbursement_date = date.today()
-            
-            # Get loan details
-            loan = self.get_loan_by_id(loan_id)
-            if not loan or loan['status'] != 'APPROVED':
-                return False, "Loan not found or not approved"
-            
-            # Update loan status
-            query = """
-            UPDATE loans 
-            SET status = 'DISBURSED', disbursement_date = %s,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE loan_id = %s
-            """
-            
-            rows_affected = self.db.execute_query(
-                query, (disbursement_date, loan_id), fetch=False
-            )
-            
-            if rows_affected > 0:
-                # Credit the loan amount to customer's account
-                from models.transaction import Transaction
-                transaction_model = Transaction()
-                
-                success, message, new_balance = transaction_model.deposit(
-                    account_id,
-                    loan['principal_amount'],
-                    f"Loan disbursement - {loan['loan_number']}",
-                    loan['approved_by']
-                )
-                
-                if success:
-                    return True, f"Loan disbursed successfully. Amount ₹{loan['principal_amount']} credited to account."
-                else:
-                    # Rollback loan status
-                    rollback_query = """
-                    UPDATE loans 
-                    SET status = 'APPROVED', disbursement_date = NULL
-                    WHERE loan_id = %s
-                    """
-                    self.db.execute_query(rollback_query, (loan_id,), fetch=False)
-                    return False, f"Failed to credit amount: {message}"
-            else:
-                return False, "Failed to update loan status"
+            result = LoanDisbursement().disburse(loan_id, account_id, disbursement_date)
+            return result['success'], result['message']
                 
         except Exception as e:
             logging.error(f"Error disbursing loan: {e}")
@@ -238,8 +406,14 @@ class Loan:
         """
         return self.db.execute_query(query, (customer_id,))
     
-    def search_loans(self, search_term):
-        """Search loans by loan number or customer name"""
+    def search_loans(self, search_term, limit=None, after=None):
+        """
+        Search loans by loan number or customer name
+        Args:
+            search_term (str): Text to match
+            limit (int): Page size (default: all matches)
+            after (tuple): (application_date, loan_id) of the last row of the previous page
+        """
         query = """
         SELECT 
             l.loan_id, l.loan_number, l.loan_type, l.principal_amount,
@@ -250,17 +424,34 @@ class Loan:
         JOIN customers c ON l.customer_id = c.customer_id
         JOIN branches b ON l.branch_id = b.branch_id
         WHERE 
-            l.loan_number LIKE %s OR
+            (l.loan_number LIKE %s OR
             c.first_name LIKE %s OR
             c.last_name LIKE %s OR
-            c.phone LIKE %s
-        ORDER BY l.application_date DESC
+            c.phone LIKE %s)
         """
         search_pattern = f"%{search_term}%"
-        return self.db.execute_query(query, (search_pattern,) * 4)
+        params = [search_pattern] * 4
+        
+        if after:
+            query += " AND (l.application_date < %s OR (l.application_date = %s AND l.loan_id < %s))"
+            params.extend([after[0], after[0], after[1]])
+        
+        query += " ORDER BY l.application_date DESC, l.loan_id DESC"
+        
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        
+        return self.db.execute_query(query, params)
     
-    def get_pending_loans(self, branch_id=None):
-        """Get all pending loan applications"""
+    def get_pending_loans(self, branch_id=None, limit=None, after=None):
+        """
+        Get pending loan applications, oldest first
+        Args:
+            branch_id (int): Optional branch filter
+            limit (int): Page size (default: all pending loans)
+            after (tuple): (application_date, loan_id) of the last row of the previous page
+        """
         query = """
         SELECT 
             l.loan_id, l.loan_number, l.loan_type, l.principal_amount,
@@ -278,53 +469,44 @@ class Loan:
             query += " AND l.branch_id = %s"
             params.append(branch_id)
         
-        query += " ORDER BY l.application_date ASC"
+        if after:
+            query += " AND (l.application_date > %s OR (l.application_date = %s AND l.loan_id > %s))"
+            params.extend([after[0], after[0], after[1]])
+        
+        query += " ORDER BY l.application_date ASC, l.loan_id ASC"
+        
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
         
         return self.db.execute_query(query, params)
     
-    def make_payment(self, loan_id, payment_amount, payment_date=None):
-        """Process a loan payment"""
+    def make_payment(self, loan_id, payment_amount, payment_date=None, account_id=None, payment_mode=None):
+        """
+        Process a loan payment
+        The account debit, loan_payments row and loan update commit together
+        Args:
+            loan_id (int): Loan being repaid
+            payment_amount (float): Payment amount
+            payment_date (date): Payment date (default: today)
+            account_id (int): Account to debit; None for cash payments
+            payment_mode (str): CASH, CHEQUE, ONLINE or AUTO_DEBIT
+        Returns:
+            tuple: (success, message)
+        """
         try:
-            if not payment_date:
-                payment_date = date.today()
-            
-            loan = self.get_loan_by_id(loan_id)
-            if not loan or loan['status'] != 'DISBURSED':
-                return False, "Loan not found or not disbursed"
-            
-            if payment_amount <= 0:
-                return False, "Payment amount must be positive"
-            
-            if payment_amount > loan['outstanding_amount']:
-                return False, "Payment amount exceeds outstanding amount"
-            
-            new_outstanding = loan['outstanding_amount'] - payment_amount
-            
-            # Update outstanding amount
-            query = """
-            UPDATE loans 
-            SET outstanding_amount = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE loan_id = %s
-            """
-            
-            rows_affected = self.db.execute_query(
-                query, (new_outstanding, loan_id), fetch=False
+            result = LoanPaymentPoster().post_payment(
+                loan_id, payment_amount, account_id, payment_date, payment_mode
             )
             
-            if rows_affected > 0:
-                # If loan is fully paid, mark as closed
-                if new_outstanding == 0:
-                    close_query = """
-                    UPDATE loans 
-                    SET status = 'CLOSED', updated_at = CURRENT_TIMESTAMP
-                    WHERE loan_id = %s
-                    """
-                    self.db.execute_query(close_query, (loan_id,), fetch=False)
-                    return True, f"Loan payment successful. Loan is now fully paid and closed."
-                else:
-                    return True, f"Payment successful. Outstanding amount: ₹{new_outstanding}"
-            else:
-                return False, "Failed to update loan payment"
+            if not result['success']:
+                return False, result['message']
+            
+            if result['closed']:
+                return True, "Loan payment successful. Loan is now fully paid and closed."
+            return True, (f"Payment successful. Principal: ₹{result['principal_amount']}, "
+                          f"Interest: ₹{result['interest_amount']}, "
+                          f"Outstanding amount: ₹{result['outstanding_balance']}")
                 
         except Exception as e:
             logging.error(f"Error processing loan payment: {e}")
@@ -404,3 +586,75 @@ class Loan:
         LIMIT %s OFFSET %s
         """
         return self.db.execute_query(query, (limit, offset))
+    
+    def list_loans(self, status=None, loan_type=None, branch_id=None, date_from=None, date_to=None,
+                   after=None, limit=50):
+        """
+        Get one page of loans, newest application first, using keyset pagination
+        The page of loan IDs is picked from the loans indexes alone; customer and
+        branch details are joined only for the rows on the page
+        Args:
+            status (str): Loan status filter
+            loan_type (str): Loan type filter
+            branch_id (int): Branch filter
+            date_from (date): Earliest application date (inclusive)
+            date_to (date): Latest application date (inclusive)
+            after (tuple): next_cursor returned with the previous page
+            limit (int): Page size
+        Returns:
+            dict: 'loans' for this page and 'next_cursor' (None on the last page)
+        """
+        conditions = []
+        params = []
+        
+        if status:
+            conditions.append("status = %s")
+            params.append(status)
+        
+        if loan_type:
+            conditions.append("loan_type = %s")
+            params.append(loan_type)
+        
+        if branch_id:
+            conditions.append("branch_id = %s")
+            params.append(branch_id)
+        
+        if date_from:
+            conditions.append("application_date >= %s")
+            params.append(date_from)
+        
+        if date_to:
+            conditions.append("application_date <= %s")
+            params.append(date_to)
+        
+        if after:
+            conditions.append("(application_date < %s OR (application_date = %s AND loan_id < %s))")
+            params.extend([after[0], after[0], after[1]])
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        query = f"""
+        SELECT 
+            l.loan_id, l.loan_number, l.loan_type, l.principal_amount,
+            l.outstanding_amount, l.status, l.application_date,
+            CONCAT(c.first_name, ' ', c.last_name) as customer_name,
+            c.phone, b.branch_name
+        FROM (
+            SELECT loan_id FROM loans
+            {where}
+            ORDER BY application_date DESC, loan_id DESC
+            LIMIT %s
+        ) page
+        JOIN loans l ON l.loan_id = page.loan_id
+        JOIN customers c ON l.customer_id = c.customer_id
+        JOIN branches b ON l.branch_id = b.branch_id
+        ORDER BY l.application_date DESC, l.loan_id DESC
+        """
+        params.append(limit)
+        
+        loans = self.db.execute_query(query, params)
+        next_cursor = None
+        if len(loans) == limit:
+            next_cursor = (loans[-1]['application_date'], loans[-1]['loan_id'])
+        
+        return {'loans': loans, 'next_cursor': next_cursor}
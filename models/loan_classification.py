@@ -0,0 +1,334 @@
+"""
+Loan Classification Engine for Bank Management System
+Computes days-past-due for the loan book, buckets loans and flags NPAs
+
+Usage:
+    python -m models.loan_classification
+    python -m models.loan_classification --date 2025-07-31 --dry-run
+"""
+
+import mysql.connector
+from mysql.connector import Error
+from config import DB_CONFIG
+from datetime import datetime, date
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+# DPD buckets as (name, lowest DPD), in ascending order
+DPD_BUCKETS = (
+    ('STANDARD', 0),
+    ('SMA-0', 1),
+    ('SMA-1', 31),
+    ('SMA-2', 61),
+    ('NPA', 91)
+)
+BUCKET_NAMES = tuple(name for name, _ in DPD_BUCKETS)
+
+# Loans past this many days are moved to DEFAULTED; they return to DISBURSED once cured
+NPA_DAYS = 90
+
+
+class LoanClassifier:
+    """Classifies every disbursed loan by days past due in a single pass"""
+    
+    def __init__(self, fetch_size=10000, batch_size=1000):
+        self.connection = None
+        self.fetch_size = fetch_size
+        self.batch_size = batch_size
+    
+    def get_connection(self):
+        """Get database connection"""
+        try:
+            if self.connection is None or not self.connection.is_connected():
+                self.connection = mysql.connector.connect(**DB_CONFIG)
+            return self.connection
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+    
+    def close_connection(self):
+        """Close database connection"""
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+    
+    def load_loan_book(self):
+        """
+        Load active loans with the total paid on each, in one grouped pass over loan_payments
+        Returns:
+            list: Rows of (loan_id, status, first_emi_date, tenure_months,
+                  emi_amount, outstanding_amount, total_paid)
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor(buffered=False)
+        
+        cursor.execute("""
+            SELECT
+                l.loan_id, l.status,
+                COALESCE(l.first_emi_date, DATE_ADD(l.disbursement_date, INTERVAL 1 MONTH)),
+                l.tenure_months, l.emi_amount, l.outstanding_amount,
+                COALESCE(p.total_paid, 0)
+            FROM loans l
+            LEFT JOIN (
+                SELECT loan_id, SUM(total_amount) as total_paid
+                FROM loan_payments
+                WHERE status = 'PAID'
+                GROUP BY loan_id
+            ) p ON p.loan_id = l.loan_id
+            WHERE l.status IN ('DISBURSED', 'DEFAULTED')
+              AND (l.first_emi_date IS NOT NULL OR l.disbursement_date IS NOT NULL)
+        """)
+        
+        rows = []
+        while True:
+            chunk = cursor.fetchmany(self.fetch_size)
+            if not chunk:
+                break
+            rows.extend(chunk)
+        cursor.close()
+        return rows
+    
+    @staticmethod
+    def compute_dpd(rows, as_of):
+        """
+        Compute days past due and overdue amounts with vectorized date math
+        An installment counts as paid once cumulative payments cover it; DPD is
+        measured from the due date of the oldest unpaid installment
+        Args:
+            rows (list): Rows from load_loan_book()
+            as_of (date): Classification date
+        Returns:
+            dict: NumPy arrays keyed by column name, including 'dpd', 'bucket'
+                  (index into DPD_BUCKETS) and 'overdue_amount'
+        """
+        import numpy as np
+        
+        count = len(rows)
+        loan_ids, statuses, first_emi, tenure, emi, outstanding, paid = zip(*rows) if rows else ([],) * 7
+        
+        first_emi = np.array(first_emi, dtype='datetime64[D]')
+        tenure = np.fromiter(tenure, dtype=np.int64, count=count)
+        emi = np.fromiter(emi, dtype=np.float64, count=count)
+        paid = np.fromiter(paid, dtype=np.float64, count=count)
+        as_of_day = np.datetime64(as_of, 'D')
+        
+        # Installment n falls n months after the first EMI, clipped to month end
+        first_month = first_emi.astype('datetime64[M]')
+        day_offset = (first_emi - first_month.astype('datetime64[D]')).astype(np.int64)
+        
+        def due_date(n):
+            month = first_month + n.astype('timedelta64[M]')
+            month_start = month.astype('datetime64[D]')
+            month_days = ((month + 1).astype('datetime64[D]') - month_start).astype(np.int64)
+            return month_start + np.minimum(day_offset, month_days - 1).astype('timedelta64[D]')
+        
+        months_elapsed = (as_of_day.astype('datetime64[M]') - first_month).astype(np.int64)
+        due_count = months_elapsed + (due_date(np.maximum(months_elapsed, 0)) <= as_of_day)
+        due_count = np.clip(due_count, 0, tenure)
+        
+        paid_count = np.where(emi > 0, np.floor((paid + 0.005) / np.where(emi > 0, emi, 1)), tenure)
+        paid_count = np.clip(paid_count.astype(np.int64), 0, tenure)
+        
+        in_arrears = paid_count < due_count
+        oldest_unpaid = due_date(np.minimum(paid_count, np.maximum(tenure - 1, 0)))
+        dpd = np.where(in_arrears, (as_of_day - oldest_unpaid).astype(np.int64), 0)
+        
+        thresholds = np.array([low for _, low in DPD_BUCKETS[1:]])
+        bucket = np.searchsorted(thresholds, dpd, side='right')
+        
+        return {
+            'loan_id': np.fromiter(loan_ids, dtype=np.int64, count=count),
+            'status': np.array(statuses, dtype=object),
+            'outstanding_amount': np.fromiter(outstanding, dtype=np.float64, count=count),
+            'dpd': dpd,
+            'bucket': bucket,
+            'overdue_amount': np.maximum(due_count * emi - paid, 0).round(2)
+        }
+    
+    def classify(self, as_of=None):
+        """
+        Classify the loan book without writing anything
+        Args:
+            as_of (date): Classification date (default: today)
+        Returns:
+            dict: Per-loan arrays from compute_dpd()
+        """
+        return self.compute_dpd(self.load_loan_book(), as_of or date.today())
+    
+    @staticmethod
+    def summarize(book):
+        """
+        Aggregate a classified book by DPD bucket
+        Returns:
+            list: Dicts with bucket, loans, outstanding and overdue per bucket
+        """
+        import numpy as np
+        
+        buckets = len(DPD_BUCKETS)
+        loans = np.bincount(book['bucket'], minlength=buckets)
+        outstanding = np.bincount(book['bucket'], weights=book['outstanding_amount'], minlength=buckets)
+        overdue = np.bincount(book['bucket'], weights=book['overdue_amount'], minlength=buckets)
+        
+        return [
+            {'bucket': name, 'loans': int(loans[i]),
+             'outstanding': float(outstanding[i]), 'overdue': float(overdue[i])}
+            for i, name in enumerate(BUCKET_NAMES)
+        ]
+    
+    def update_statuses(self, book):
+        """
+        Move loans past NPA_DAYS to DEFAULTED and cured loans back to DISBURSED
+        Returns:
+            tuple: (loans defaulted, loans cured)
+        """
+        to_default = book['loan_id'][(book['dpd'] > NPA_DAYS) & (book['status'] == 'DISBURSED')].tolist()
+        to_cure = book['loan_id'][(book['dpd'] <= NPA_DAYS) & (book['status'] == 'DEFAULTED')].tolist()
+        
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        try:
+            connection.start_transaction()
+            
+            for new_status, old_status, loan_ids in (('DEFAULTED', 'DISBURSED', to_default),
+                                                     ('DISBURSED', 'DEFAULTED', to_cure)):
+                for i in range(0, len(loan_ids), self.batch_size):
+                    batch = loan_ids[i:i + self.batch_size]
+                    placeholders = ", ".join(["%s"] * len(batch))
+                    cursor.execute(f"""
+                        UPDATE loans SET status = %s
+                        WHERE status = %s AND loan_id IN ({placeholders})
+                    """, [new_status, old_status] + batch)
+            
+            connection.commit()
+            cursor.close()
+        
+        except Error as e:
+            connection.rollback()
+            logger.error(f"Error updating loan statuses: {e}")
+            raise
+        
+        return len(to_default), len(to_cure)
+    
+    def write_snapshot(self, book, as_of):
+        """
+        Write the classified book to loan_dpd_snapshots for trend analysis
+        Returns:
+            int: Number of snapshot rows written
+        """
+        rows = [
+            (as_of, loan_id, dpd, BUCKET_NAMES[bucket], outstanding, overdue)
+            for loan_id, dpd, bucket, outstanding, overdue in zip(
+                book['loan_id'].tolist(), book['dpd'].tolist(), book['bucket'].tolist(),
+                book['outstanding_amount'].tolist(), book['overdue_amount'].tolist()
+            )
+        ]
+        
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        try:
+            connection.start_transaction()
+            
+            for i in range(0, len(rows), self.batch_size):
+                cursor.executemany("""
+                    INSERT INTO loan_dpd_snapshots (
+                        snapshot_date, loan_id, days_past_due, dpd_bucket,
+                        outstanding_amount, overdue_amount
+                    ) VALUES (%s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        days_past_due = VALUES(days_past_due),
+                        dpd_bucket = VALUES(dpd_bucket),
+                        outstanding_amount = VALUES(outstanding_amount),
+                        overdue_amount = VALUES(overdue_amount)
+                """, rows[i:i + self.batch_size])
+            
+            connection.commit()
+            cursor.close()
+        
+        except Error as e:
+            connection.rollback()
+            logger.error(f"Error writing DPD snapshot for {as_of}: {e}")
+            raise
+        
+        return len(rows)
+    
+    def run(self, as_of=None, dry_run=False):
+        """
+        Classify the loan book, update loan statuses and write the day's snapshot
+        Args:
+            as_of (date): Classification date (default: today)
+            dry_run (bool): Compute and summarize only
+        Returns:
+            dict: Bucket summary and counts of loans defaulted and cured
+        """
+        as_of = as_of or date.today()
+        book = self.classify(as_of)
+        result = {'as_of': as_of, 'loans': len(book['loan_id']), 'buckets': self.summarize(book),
+                  'defaulted': 0, 'cured': 0}
+        
+        if not dry_run:
+            result['defaulted'], result['cured'] = self.update_statuses(book)
+            self.write_snapshot(book, as_of)
+        
+        logger.info(f"Loan classification for {as_of}: {result['loans']} loans, "
+                    f"{result['defaulted']} defaulted, {result['cured']} cured")
+        return result
+    
+    def get_trend(self, snapshots=6):
+        """
+        Get bucket totals for the most recent snapshot dates
+        Args:
+            snapshots (int): Number of snapshot dates to return
+        Returns:
+            list: Rows with snapshot_date, dpd_bucket, loans, outstanding and overdue
+        """
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor(dictionary=True)
+            
+            cursor.execute("""
+                SELECT s.snapshot_date, s.dpd_bucket, COUNT(*) as loans,
+                       SUM(s.outstanding_amount) as outstanding, SUM(s.overdue_amount) as overdue
+                FROM loan_dpd_snapshots s
+                JOIN (
+                    SELECT DISTINCT snapshot_date FROM loan_dpd_snapshots
+                    ORDER BY snapshot_date DESC LIMIT %s
+                ) d ON d.snapshot_date = s.snapshot_date
+                GROUP BY s.snapshot_date, s.dpd_bucket
+                ORDER BY s.snapshot_date, s.dpd_bucket
+            """, (snapshots,))
+            trend = cursor.fetchall()
+            cursor.close()
+            
+            return trend
+        
+        except Error as e:
+            logger.error(f"Error fetching DPD trend: {e}")
+            return []
+    
+    def __del__(self):
+        """Destructor to ensure connection is closed"""
+        self.close_connection()
+
+
+def main():
+    """Command line entry point for the nightly loan classification"""
+    parser = argparse.ArgumentParser(description='Classify loans by days past due')
+    parser.add_argument('--date', help='Classification date, YYYY-MM-DD (default: today)')
+    parser.add_argument('--dry-run', action='store_true', help='Print the summary without writing')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    as_of = datetime.strptime(args.date, "%Y-%m-%d").date() if args.date else None
+    result = LoanClassifier().run(as_of, args.dry_run)
+    
+    for row in result['buckets']:
+        print(f"{row['bucket']:<10}{row['loans']:>10}{row['outstanding']:>20,.2f}{row['overdue']:>18,.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
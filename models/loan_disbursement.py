@@ -0,0 +1,216 @@
+"""
+Loan Disbursement Model for Bank Management System
+Releases approved loans: loan status change, account credit and EMI schedule in one transaction
+"""
+
+from mysql.connector import Error
+from models.database import get_pooled_connection
+from models.loan_payment import generate_reference, claim_references
+from models.emi_scheduler import materialize_schedule
+from utils.constants import MIN_LOAN_TENURE_MONTHS, MAX_LOAN_TENURE_MONTHS
+from datetime import datetime, date
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DisbursementRejected(Exception):
+    """A disbursement failed validation; the transaction is rolled back"""
+    pass
+
+
+class LoanDisbursement:
+    """Disburses approved loans in single database transactions, one at a time or in batches"""
+    
+    def __init__(self, batch_size=200):
+        self.connection = None
+        self.batch_size = batch_size
+    
+    def get_connection(self):
+        """Get a pooled database connection"""
+        try:
+            if self.connection is None or not self.connection.is_connected():
+                self.connection = get_pooled_connection()
+            return self.connection
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+    
+    def close_connection(self):
+        """Return the connection to the pool"""
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+    
+    def _disburse(self, cursor, loan_id, account_id, disbursement_date=None, reference=None):
+        """
+        Disburse one loan on an open transaction
+        Raises DisbursementRejected when the disbursement is not allowed
+        Returns:
+            dict: Disbursement details
+        """
+        disbursement_date = disbursement_date or date.today()
+        
+        cursor.execute("""
+            SELECT loan_number, customer_id, status, principal_amount, approved_by, tenure_months
+            FROM loans WHERE loan_id = %s FOR UPDATE
+        """, (loan_id,))
+        loan = cursor.fetchone()
+        if not loan:
+            raise DisbursementRejected("Loan not found")
+        
+        loan_number, customer_id, status, principal, approved_by, tenure_months = loan
+        if status != 'APPROVED':
+            raise DisbursementRejected(f"Loan {loan_number} is not approved (status {status})")
+        if not MIN_LOAN_TENURE_MONTHS <= tenure_months <= MAX_LOAN_TENURE_MONTHS:
+            raise DisbursementRejected(f"Loan {loan_number} tenure of {tenure_months} months is outside "
+                                       f"{MIN_LOAN_TENURE_MONTHS}-{MAX_LOAN_TENURE_MONTHS}")
+        
+        cursor.execute(
+            "SELECT balance, status, customer_id FROM accounts WHERE account_id = %s FOR UPDATE",
+            (account_id,)
+        )
+        account = cursor.fetchone()
+        if not account:
+            raise DisbursementRejected("Account not found")
+        
+        balance, account_status, account_customer_id = account
+        if account_status != 'ACTIVE':
+            raise DisbursementRejected(f"Account is {account_status}")
+        if account_customer_id != customer_id:
+            raise DisbursementRejected("Account does not belong to the borrower")
+        
+        cursor.execute("""
+            UPDATE loans
+            SET status = 'DISBURSED', disbursement_date = %s, outstanding_amount = principal_amount,
+                first_emi_date = COALESCE(first_emi_date, DATE_ADD(%s, INTERVAL 1 MONTH))
+            WHERE loan_id = %s
+        """, (disbursement_date, disbursement_date, loan_id))
+        
+        reference = reference or generate_reference('D')
+        new_balance = balance + principal
+        claim_references(cursor, [reference])
+        
+        cursor.execute("""
+            INSERT INTO transactions (
+                transaction_number, account_id, transaction_type, amount,
+                balance_before, balance_after, description, transaction_date, processed_by, status
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (
+            reference, account_id, 'DEPOSIT', principal, balance, new_balance,
+            f"Loan disbursement - {loan_number}", datetime.now(), approved_by, 'COMPLETED'
+        ))
+        cursor.execute(
+            "UPDATE accounts SET balance = %s WHERE account_id = %s",
+            (new_balance, account_id)
+        )
+        
+        return {
+            "success": True,
+            "message": f"Loan disbursed successfully. Amount ₹{principal} credited to account.",
+            "loan_id": loan_id,
+            "loan_number": loan_number,
+            "amount": principal,
+            "new_balance": new_balance,
+            "reference": reference
+        }
+    
+    def disburse(self, loan_id, account_id, disbursement_date=None, reference=None):
+        """
+        Disburse an approved loan into the borrower's account in one transaction
+        Args:
+            loan_id (int): Approved loan
+            account_id (int): Borrower's account to credit
+            disbursement_date (date): Disbursement date (default: today)
+            reference (str): Transaction reference for the credit
+        Returns:
+            dict: Result with success flag, message and disbursement details
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        try:
+            connection.start_transaction()
+            result = self._disburse(cursor, loan_id, account_id, disbursement_date, reference)
+            materialize_schedule(cursor, [loan_id])
+            connection.commit()
+            cursor.close()
+            
+            logger.info(f"Loan disbursed - Loan: {loan_id}, Account: {account_id}, Amount: {result['amount']}")
+            return result
+        
+        except DisbursementRejected as e:
+            connection.rollback()
+            cursor.close()
+            return {"success": False, "message": str(e), "loan_id": loan_id}
+        
+        except Error as e:
+            connection.rollback()
+            cursor.close()
+            logger.error(f"Loan disbursement error: {e}")
+            return {"success": False, "message": f"Disbursement failed: {str(e)}", "loan_id": loan_id}
+        
+        finally:
+            self.close_connection()
+    
+    def disburse_batch(self, disbursements):
+        """
+        Disburse many approved loans, committing once per batch_size loans
+        Each loan runs under its own savepoint, so a rejected loan does not undo
+        the rest of its batch; EMI schedules are created once per batch
+        Args:
+            disbursements (list): Dicts with loan_id, account_id and optional
+                disbursement_date and reference
+        Returns:
+            dict: Disbursed and failed counts with per-loan results
+        """
+        ordered = sorted(disbursements, key=lambda d: d['loan_id'])
+        summary = {"disbursed": 0, "failed": 0, "results": []}
+        
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        try:
+            for start in range(0, len(ordered), self.batch_size):
+                chunk = ordered[start:start + self.batch_size]
+                results = []
+                
+                try:
+                    connection.start_transaction()
+                    
+                    for item in chunk:
+                        cursor.execute("SAVEPOINT loan_disbursement")
+                        try:
+                            results.append(self._disburse(
+                                cursor, item['loan_id'], item['account_id'],
+                                item.get('disbursement_date'), item.get('reference')
+                            ))
+                        except (DisbursementRejected, Error) as e:
+                            cursor.execute("ROLLBACK TO SAVEPOINT loan_disbursement")
+                            results.append({"success": False, "message": str(e), "loan_id": item['loan_id']})
+                    
+                    disbursed_ids = [r['loan_id'] for r in results if r['success']]
+                    if disbursed_ids:
+                        materialize_schedule(cursor, disbursed_ids)
+                    
+                    connection.commit()
+                
+                except Error as e:
+                    connection.rollback()
+                    logger.error(f"Loan disbursement batch failed: {e}")
+                    results = [{"success": False, "message": f"Batch failed: {str(e)}", "loan_id": d['loan_id']}
+                               for d in chunk]
+                
+                disbursed = sum(1 for r in results if r['success'])
+                summary['disbursed'] += disbursed
+                summary['failed'] += len(results) - disbursed
+                summary['results'].extend(results)
+            
+            cursor.close()
+        
+        finally:
+            self.close_connection()
+        
+        logger.info(f"Loan disbursement batch complete - Disbursed: {summary['disbursed']}, "
+                    f"Failed: {summary['failed']}")
+        return summary
@@ -0,0 +1,317 @@
+"""
+Loan Payment Model for Bank Management System
+Posts loan repayments atomically: account debit, loan_payments row and loan roll-forward
+"""
+
+from mysql.connector import Error
+from models.database import get_pooled_connection
+from datetime import datetime, date
+from decimal import Decimal, ROUND_HALF_UP
+import logging
+import random
+import string
+import time
+
+logger = logging.getLogger(__name__)
+
+# Loans that can take repayments
+PAYABLE_STATUSES = ('DISBURSED', 'DEFAULTED')
+
+CENT = Decimal('0.01')
+
+
+class PaymentRejected(Exception):
+    """A payment failed validation; the transaction is rolled back"""
+    pass
+
+
+def generate_reference(prefix):
+    """
+    Generate a transaction reference (max 20 chars) without a uniqueness round-trip
+    Uniqueness is enforced when the posting claims it with claim_references()
+    """
+    timestamp = int(time.time() * 1000) % 10000000000
+    random_suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
+    return f"{prefix}{timestamp}{random_suffix}"
+
+
+def claim_references(cursor, numbers):
+    """
+    Record transaction numbers in transaction_references in the posting transaction
+    The transactions table is partitioned and can only keep a number unique per
+    transaction_date, so this primary key is what makes numbers unique; a reused
+    number raises IntegrityError and the posting rolls back
+    """
+    cursor.executemany("INSERT INTO transaction_references (transaction_number) VALUES (%s)",
+                       [(number,) for number in numbers])
+
+
+def to_money(value):
+    """Convert a number to a Decimal rounded to paise"""
+    return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def split_payment(outstanding, annual_rate, amount, days=None):
+    """
+    Split a payment into interest and principal
+    Interest accrues on the outstanding principal for the days since the last
+    payment, or for one month when no previous date is known
+    Args:
+        outstanding (Decimal): Outstanding principal before the payment
+        annual_rate (Decimal): Annual interest rate in percent
+        amount (Decimal): Payment amount
+        days (int): Days of interest accrual
+    Returns:
+        tuple: (principal, interest) as Decimals
+    """
+    if days is None:
+        interest = outstanding * annual_rate / Decimal(1200)
+    else:
+        interest = outstanding * annual_rate / Decimal(100) * Decimal(max(days, 0)) / Decimal(365)
+    interest = min(interest.quantize(CENT, rounding=ROUND_HALF_UP), amount)
+    return amount - interest, interest
+
+
+class LoanPaymentPoster:
+    """Posts loan payments in single database transactions, one at a time or in batches"""
+    
+    def __init__(self, batch_size=500):
+        self.connection = None
+        self.batch_size = batch_size
+    
+    def get_connection(self):
+        """Get a pooled database connection"""
+        try:
+            if self.connection is None or not self.connection.is_connected():
+                self.connection = get_pooled_connection()
+            return self.connection
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+    
+    def close_connection(self):
+        """Return the connection to the pool"""
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+    
+    def generate_reference(self):
+        """Generate a reference for a loan repayment debit"""
+        return generate_reference('L')
+    
+    def _post(self, cursor, loan_id, amount, account_id=None, payment_date=None,
+              payment_mode=None, reference=None, cap_to_payoff=False):
+        """
+        Post one payment on an open transaction
+        Raises PaymentRejected when the payment is not allowed
+        With cap_to_payoff, a payment larger than the payoff amount is reduced to it
+        Returns:
+            dict: Posted payment details
+        """
+        amount = to_money(amount)
+        payment_date = payment_date or date.today()
+        payment_mode = payment_mode or ('ONLINE' if account_id else 'CASH')
+        
+        if amount <= 0:
+            raise PaymentRejected("Payment amount must be positive")
+        
+        # The loan row lock serializes payments on the same loan
+        cursor.execute("""
+            SELECT loan_number, status, outstanding_amount, interest_rate,
+                   disbursement_date, last_payment_date
+            FROM loans WHERE loan_id = %s FOR UPDATE
+        """, (loan_id,))
+        loan = cursor.fetchone()
+        if not loan:
+            raise PaymentRejected("Loan not found")
+        
+        loan_number, status, outstanding, rate, disbursed_on, last_paid_on = loan
+        if status not in PAYABLE_STATUSES:
+            raise PaymentRejected(f"Loan {loan_number} is not repayable (status {status})")
+        
+        accrued_from = last_paid_on or disbursed_on
+        days = (payment_date - accrued_from).days if accrued_from else None
+        principal, interest = split_payment(outstanding, rate, amount, days)
+        
+        if principal > outstanding and cap_to_payoff:
+            principal, amount = outstanding, outstanding + interest
+        
+        if principal > outstanding:
+            raise PaymentRejected(f"Payment amount exceeds payoff amount ₹{outstanding + interest}")
+        
+        new_outstanding = outstanding - principal
+        
+        if account_id:
+            cursor.execute(
+                "SELECT balance, status FROM accounts WHERE account_id = %s FOR UPDATE",
+                (account_id,)
+            )
+            account = cursor.fetchone()
+            if not account:
+                raise PaymentRejected("Account not found")
+            
+            balance, account_status = account
+            if account_status != 'ACTIVE':
+                raise PaymentRejected(f"Account is {account_status}")
+            if balance < amount:
+                raise PaymentRejected("Insufficient balance")
+            
+            reference = reference or self.generate_reference()
+            new_balance = balance - amount
+            claim_references(cursor, [reference])
+            
+            # Insert the ledger row before touching the balance so the
+            # prevent_negative_balance trigger sees the pre-debit balance
+            cursor.execute("""
+                INSERT INTO transactions (
+                    transaction_number, account_id, transaction_type, amount,
+                    balance_before, balance_after, description, transaction_date, status
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (
+                reference, account_id, 'WITHDRAWAL', amount,
+                balance, new_balance, f"Loan repayment - {loan_number}", datetime.now(), 'COMPLETED'
+            ))
+            cursor.execute(
+                "UPDATE accounts SET balance = %s WHERE account_id = %s",
+                (new_balance, account_id)
+            )
+        
+        cursor.execute(
+            "SELECT COALESCE(MAX(payment_number), 0) + 1 FROM loan_payments WHERE loan_id = %s",
+            (loan_id,)
+        )
+        payment_number = cursor.fetchone()[0]
+        
+        # The update_loan_outstanding trigger rolls the loan forward and closes it at zero
+        cursor.execute("""
+            INSERT INTO loan_payments (
+                loan_id, payment_number, payment_date, principal_amount, interest_amount,
+                total_amount, outstanding_balance, payment_mode, reference_number, status
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'PAID')
+        """, (
+            loan_id, payment_number, payment_date, principal, interest,
+            amount, new_outstanding, payment_mode, reference
+        ))
+        
+        return {
+            "success": True,
+            "message": "Payment posted",
+            "loan_id": loan_id,
+            "payment_id": cursor.lastrowid,
+            "payment_number": payment_number,
+            "principal_amount": principal,
+            "interest_amount": interest,
+            "outstanding_balance": new_outstanding,
+            "closed": new_outstanding <= 0,
+            "amount": amount,
+            "reference": reference
+        }
+    
+    def post_payment(self, loan_id, amount, account_id=None, payment_date=None,
+                     payment_mode=None, reference=None):
+        """
+        Post a single loan payment in one transaction
+        Args:
+            loan_id (int): Loan being repaid
+            amount (float): Payment amount
+            account_id (int): Account to debit; None for payments received in cash
+            payment_date (date): Payment date (default: today)
+            payment_mode (str): CASH, CHEQUE, ONLINE or AUTO_DEBIT
+            reference (str): Transaction reference for the account debit
+        Returns:
+            dict: Result with success flag, message and posted payment details
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        try:
+            connection.start_transaction()
+            result = self._post(cursor, loan_id, amount, account_id, payment_date, payment_mode, reference)
+            connection.commit()
+            cursor.close()
+            
+            logger.info(f"Loan payment posted - Loan: {loan_id}, Amount: {amount}, "
+                        f"Outstanding: {result['outstanding_balance']}")
+            return result
+        
+        except PaymentRejected as e:
+            connection.rollback()
+            cursor.close()
+            return {"success": False, "message": str(e), "loan_id": loan_id}
+        
+        except Error as e:
+            connection.rollback()
+            cursor.close()
+            logger.error(f"Loan payment error: {e}")
+            return {"success": False, "message": f"Payment failed: {str(e)}", "loan_id": loan_id}
+        
+        finally:
+            self.close_connection()
+    
+    def post_batch(self, payments, payment_mode='AUTO_DEBIT', on_batch=None):
+        """
+        Post many payments, committing once per batch_size payments
+        Each payment runs under its own savepoint, so a rejected payment does not
+        undo the rest of its batch
+        Args:
+            payments (list): Dicts with loan_id, amount and optional account_id,
+                payment_date, reference, cap_to_payoff and key (copied onto the result)
+            payment_mode (str): Payment mode recorded on each payment
+            on_batch (callable): Called as on_batch(cursor, results) before each
+                batch commits, so callers can record outcomes in the same transaction
+        Returns:
+            dict: Posted and failed counts with per-payment results
+        """
+        # Lock loans in a consistent order so concurrent batches cannot deadlock
+        ordered = sorted(payments, key=lambda p: p['loan_id'])
+        summary = {"posted": 0, "failed": 0, "results": []}
+        
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        try:
+            for start in range(0, len(ordered), self.batch_size):
+                chunk = ordered[start:start + self.batch_size]
+                results = []
+                
+                try:
+                    connection.start_transaction()
+                    
+                    for payment in chunk:
+                        cursor.execute("SAVEPOINT loan_payment")
+                        try:
+                            result = self._post(
+                                cursor, payment['loan_id'], payment['amount'], payment.get('account_id'),
+                                payment.get('payment_date'), payment_mode, payment.get('reference'),
+                                payment.get('cap_to_payoff', False)
+                            )
+                        except (PaymentRejected, Error) as e:
+                            cursor.execute("ROLLBACK TO SAVEPOINT loan_payment")
+                            result = {"success": False, "message": str(e), "loan_id": payment['loan_id']}
+                        result['key'] = payment.get('key')
+                        results.append(result)
+                    
+                    if on_batch:
+                        on_batch(cursor, results)
+                    
+                    connection.commit()
+                
+                except Error as e:
+                    connection.rollback()
+                    logger.error(f"Loan payment batch failed: {e}")
+                    results = [{"success": False, "message": f"Batch failed: {str(e)}",
+                                "loan_id": p['loan_id'], "key": p.get('key')}
+                               for p in chunk]
+                
+                posted = sum(1 for r in results if r['success'])
+                summary['posted'] += posted
+                summary['failed'] += len(results) - posted
+                summary['results'].extend(results)
+            
+            cursor.close()
+        
+        finally:
+            self.close_connection()
+        
+        logger.info(f"Loan payment batch complete - Posted: {summary['posted']}, Failed: {summary['failed']}")
+        return summary
@@ -0,0 +1,379 @@
+"""
+Transaction Partition Manager for Bank Management System
+Keeps the transactions table in monthly RANGE partitions and archives cold months
+
+Usage:
+    python -m models.partition_manager                      # roll partitions ahead
+    python -m models.partition_manager --convert            # one-off conversion of an existing table
+    python -m models.partition_manager --archive-before 2024-01 --target file --directory archives
+"""
+
+import mysql.connector
+from mysql.connector import Error
+from config import DB_CONFIG
+from datetime import datetime, date
+import argparse
+import csv
+import gzip
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLE = 'transactions'
+ARCHIVE_TABLE = 'transactions_archive'
+MAX_PARTITION = 'pmax'
+# Unique key on transaction numbers that partitioning allows
+NUMBER_INDEX = 'idx_transaction_number_date'
+
+# Months of empty partitions kept ahead of the current month
+MONTHS_AHEAD = 3
+
+
+def month_start(day):
+    """First day of the month containing day"""
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, count):
+    """First day of the month count months after month"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    """Partition holding the given month, e.g. p202507"""
+    return f"p{month:%Y%m}"
+
+
+def partition_definition(month):
+    """Partition definition for one month; it holds rows before the next month starts"""
+    upper = add_months(month, 1)
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN (UNIX_TIMESTAMP('{upper:%Y-%m-%d} 00:00:00'))"
+
+
+def partition_clause(first_month, last_month):
+    """
+    PARTITION BY clause with one partition per month from first_month to last_month
+    Rows older than first_month land in the first partition; rows past last_month in pmax
+    """
+    definitions = []
+    month = month_start(first_month)
+    while month <= last_month:
+        definitions.append(partition_definition(month))
+        month = add_months(month, 1)
+    definitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+    
+    return "PARTITION BY RANGE (UNIX_TIMESTAMP(transaction_date)) (\n    " + ",\n    ".join(definitions) + "\n)"
+
+
+def initial_partition_clause():
+    """Partitions for a new transactions table: this month plus MONTHS_AHEAD"""
+    current = month_start(date.today())
+    return partition_clause(current, add_months(current, MONTHS_AHEAD))
+
+
+class TransactionPartitionManager:
+    """Creates, rolls forward and archives monthly partitions of the transactions table"""
+    
+    def __init__(self, connection=None, months_ahead=MONTHS_AHEAD):
+        self.connection = connection
+        # A connection handed in by the caller is left open for the caller to close
+        self.owns_connection = connection is None
+        self.months_ahead = months_ahead
+    
+    def get_connection(self):
+        """Get database connection"""
+        try:
+            if self.connection is None or not self.connection.is_connected():
+                self.connection = mysql.connector.connect(**DB_CONFIG)
+            return self.connection
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+    
+    def close_connection(self):
+        """Close database connection"""
+        if self.owns_connection and self.connection and self.connection.is_connected():
+            self.connection.close()
+    
+    def get_partitions(self):
+        """
+        Get the partitions of the transactions table in order
+        Returns:
+            list: (name, upper bound as UNIX timestamp or None for MAXVALUE, approximate rows)
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        cursor.execute("""
+            SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+        """, (PARTITIONED_TABLE,))
+        partitions = [
+            (name, None if description == 'MAXVALUE' else int(description), rows)
+            for name, description, rows in cursor.fetchall()
+        ]
+        cursor.close()
+        return partitions
+    
+    def is_partitioned(self):
+        """Check whether the transactions table is partitioned"""
+        return bool(self.get_partitions())
+    
+    def convert(self):
+        """
+        Convert an unpartitioned transactions table in place
+        Partitioned InnoDB tables cannot have foreign keys, and every unique key must
+        include transaction_date. The foreign keys are dropped (posting code locks the
+        account rows FOR UPDATE before inserting), the unique index on transaction_number
+        is replaced by one on (transaction_number, transaction_date), with
+        transaction_references keeping numbers unique across dates, and the primary key
+        becomes (transaction_id, transaction_date). The table is rebuilt: run in a
+        maintenance window.
+        Returns:
+            bool: True if the table was converted, False if already partitioned
+        """
+        if self.is_partitioned():
+            logger.info("Transactions table is already partitioned")
+            return False
+        
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        cursor.execute("""
+            SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_TYPE = 'FOREIGN KEY'
+        """, (PARTITIONED_TABLE,))
+        foreign_keys = [row[0] for row in cursor.fetchall()]
+        
+        # Unique indexes that do not include transaction_date
+        cursor.execute("""
+            SELECT INDEX_NAME FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+              AND NON_UNIQUE = 0 AND INDEX_NAME <> 'PRIMARY'
+            GROUP BY INDEX_NAME
+            HAVING SUM(COLUMN_NAME = 'transaction_date') = 0
+        """, (PARTITIONED_TABLE,))
+        unique_indexes = [row[0] for row in cursor.fetchall()]
+        
+        cursor.execute("""
+            SELECT 1 FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1
+        """, (PARTITIONED_TABLE, NUMBER_INDEX))
+        has_number_index = cursor.fetchone() is not None
+        
+        cursor.execute(f"SELECT MIN(transaction_date) FROM {PARTITIONED_TABLE}")
+        oldest = cursor.fetchone()[0]
+        
+        changes = [f"DROP FOREIGN KEY `{name}`" for name in foreign_keys]
+        changes += [f"DROP INDEX `{name}`" for name in unique_indexes]
+        changes += [
+            "MODIFY transaction_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP",
+            "DROP PRIMARY KEY",
+            "ADD PRIMARY KEY (transaction_id, transaction_date)"
+        ]
+        if not has_number_index:
+            changes.append(f"ADD UNIQUE INDEX {NUMBER_INDEX} (transaction_number, transaction_date)")
+        logger.info(f"Preparing {PARTITIONED_TABLE} for partitioning: {', '.join(changes)}")
+        cursor.execute(f"ALTER TABLE {PARTITIONED_TABLE} " + ", ".join(changes))
+        
+        current = month_start(date.today())
+        first = month_start(oldest.date()) if oldest else current
+        cursor.execute(f"ALTER TABLE {PARTITIONED_TABLE} " +
+                       partition_clause(first, add_months(current, self.months_ahead)))
+        cursor.close()
+        
+        logger.info(f"Transactions table partitioned monthly from {first:%Y-%m}")
+        return True
+    
+    def roll_ahead(self, today=None):
+        """
+        Split pmax so monthly partitions exist through months_ahead months from today
+        pmax is kept empty by running this on schedule, so the split is metadata-only
+        Returns:
+            list: Names of the partitions created
+        """
+        partitions = self.get_partitions()
+        if not partitions:
+            logger.warning("Transactions table is not partitioned; run with --convert first")
+            return []
+        
+        bounds = [upper for _, upper, _ in partitions if upper is not None]
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        target = add_months(month_start(today or date.today()), self.months_ahead)
+        cursor.execute("SELECT UNIX_TIMESTAMP(%s)", (datetime.combine(add_months(target, 1), datetime.min.time()),))
+        target_bound = int(cursor.fetchone()[0])
+        
+        if bounds and max(bounds) >= target_bound:
+            cursor.close()
+            return []
+        
+        # The month after the highest existing bound is the first one to create
+        if bounds:
+            cursor.execute("SELECT DATE(FROM_UNIXTIME(%s))", (max(bounds),))
+            month = month_start(cursor.fetchone()[0])
+        else:
+            month = month_start(today or date.today())
+        
+        definitions, created = [], []
+        while month <= target:
+            definitions.append(partition_definition(month))
+            created.append(partition_name(month))
+            month = add_months(month, 1)
+        definitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+        
+        cursor.execute(f"ALTER TABLE {PARTITIONED_TABLE} REORGANIZE PARTITION {MAX_PARTITION} INTO (" +
+                       ", ".join(definitions) + ")")
+        cursor.close()
+        
+        logger.info(f"Created transaction partitions: {', '.join(created)}")
+        return created
+    
+    def _table_exists(self, cursor, table):
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """, (table,))
+        return cursor.fetchone()[0] > 0
+    
+    def _has_rows(self, cursor, query):
+        cursor.execute(query)
+        return cursor.fetchone() is not None
+    
+    def _export_to_file(self, staging, filepath, fetch_size=10000):
+        """Stream a staging table into a gzip CSV, replacing the file atomically"""
+        connection = self.get_connection()
+        reader = connection.cursor(buffered=False)
+        reader.execute(f"SELECT * FROM `{staging}` ORDER BY transaction_id")
+        columns = [c[0] for c in reader.description]
+        
+        temp_path = filepath + ".part"
+        with gzip.open(temp_path, 'wt', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            while True:
+                rows = reader.fetchmany(fetch_size)
+                if not rows:
+                    break
+                writer.writerows(rows)
+        reader.close()
+        os.replace(temp_path, filepath)
+    
+    def archive_partition(self, name, target='table', directory='archives'):
+        """
+        Move one partition out of the live table and archive it
+        EXCHANGE PARTITION swaps the partition with an empty staging table in one
+        metadata operation, so the live table never runs a bulk DELETE. Each step
+        can be rerun: an interrupted archive resumes from the staging table.
+        Args:
+            name (str): Partition name
+            target (str): 'table' to append to transactions_archive, 'file' for a gzip CSV
+            directory (str): Directory for archive files
+        Returns:
+            str: Where the rows were archived
+        """
+        staging = f"{PARTITIONED_TABLE}_x_{name}"
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        partition_has_rows = self._has_rows(
+            cursor, f"SELECT 1 FROM {PARTITIONED_TABLE} PARTITION ({name}) LIMIT 1")
+        
+        if not self._table_exists(cursor, staging):
+            cursor.execute(f"CREATE TABLE `{staging}` LIKE {PARTITIONED_TABLE}")
+            cursor.execute(f"ALTER TABLE `{staging}` REMOVE PARTITIONING")
+        
+        staging_has_rows = self._has_rows(cursor, f"SELECT 1 FROM `{staging}` LIMIT 1")
+        if partition_has_rows and staging_has_rows:
+            cursor.close()
+            raise RuntimeError(f"Both partition {name} and {staging} hold rows; resolve manually")
+        
+        if partition_has_rows:
+            cursor.execute(f"ALTER TABLE {PARTITIONED_TABLE} EXCHANGE PARTITION {name} WITH TABLE `{staging}`")
+        
+        if target == 'file':
+            os.makedirs(directory, exist_ok=True)
+            location = os.path.join(directory, f"{PARTITIONED_TABLE}_{name}.csv.gz")
+            self._export_to_file(staging, location)
+        elif target == 'table':
+            if not self._table_exists(cursor, ARCHIVE_TABLE):
+                cursor.execute(f"CREATE TABLE {ARCHIVE_TABLE} LIKE `{staging}`")
+                cursor.execute(f"ALTER TABLE {ARCHIVE_TABLE} ROW_FORMAT=COMPRESSED")
+            # IGNORE makes a rerun after a crash between copy and cleanup harmless
+            cursor.execute(f"INSERT IGNORE INTO {ARCHIVE_TABLE} SELECT * FROM `{staging}`")
+            location = ARCHIVE_TABLE
+        else:
+            cursor.close()
+            raise ValueError(f"Unknown archive target: {target}")
+        
+        cursor.execute(f"DROP TABLE `{staging}`")
+        cursor.execute(f"ALTER TABLE {PARTITIONED_TABLE} DROP PARTITION {name}")
+        cursor.close()
+        
+        logger.info(f"Archived partition {name} to {location}")
+        return location
+    
+    def archive_before(self, before_month, target='table', directory='archives'):
+        """
+        Archive every partition that ends on or before the start of before_month
+        Args:
+            before_month (date): First month to keep in the live table
+            target (str): 'table' or 'file'
+            directory (str): Directory for archive files
+        Returns:
+            list: Names of the archived partitions
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        cursor.execute("SELECT UNIX_TIMESTAMP(%s)",
+                       (datetime.combine(month_start(before_month), datetime.min.time()),))
+        cutoff = int(cursor.fetchone()[0])
+        cursor.close()
+        
+        partitions = self.get_partitions()
+        # Always keep at least one bounded partition plus pmax in the live table
+        candidates = [name for name, upper, _ in partitions[:-2] if upper is not None and upper <= cutoff]
+        
+        archived = []
+        for name in candidates:
+            self.archive_partition(name, target, directory)
+            archived.append(name)
+        return archived
+    
+    def __del__(self):
+        """Destructor to ensure connection is closed"""
+        self.close_connection()
+
+
+def main():
+    """Command line entry point for scheduled partition maintenance"""
+    parser = argparse.ArgumentParser(description='Maintain monthly partitions of the transactions table')
+    parser.add_argument('--convert', action='store_true', help='Partition an existing unpartitioned table')
+    parser.add_argument('--months-ahead', type=int, default=MONTHS_AHEAD, help='Empty months kept ahead')
+    parser.add_argument('--archive-before', help='Archive partitions before this month, YYYY-MM')
+    parser.add_argument('--target', choices=['table', 'file'], default='table', help='Archive destination')
+    parser.add_argument('--directory', default='archives', help='Directory for archive files')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    manager = TransactionPartitionManager(months_ahead=args.months_ahead)
+    if args.convert:
+        manager.convert()
+    
+    manager.roll_ahead()
+    
+    if args.archive_before:
+        before_month = datetime.strptime(args.archive_before, "%Y-%m").date()
+        archived = manager.archive_before(before_month, args.target, args.directory)
+        logger.info(f"Archived {len(archived)} partition(s)")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,322 @@
+"""
+Posting Dispatcher for Bank Management System
+Serializes postings per account shard so hot accounts are locked once per batch, not once per posting
+
+A payroll source or cash-pool account can receive thousands of postings at
+once. Posted one by one, every deposit or transfer waits on the same
+FOR UPDATE row lock and throughput collapses. The dispatcher routes each
+posting to one of a few worker queues by its busiest account, and each worker
+drains whatever has queued up behind the current batch into a single
+Transaction.post_batch call: one lock, one commit, many postings.
+
+An account stays on the shard it was routed to while it has postings queued
+there, so its postings are applied in submission order by one worker. A
+transfer between accounts pinned to different shards waits in submit until
+one of them drains, and later postings to either account wait behind it. A batch
+that fails on a database error is split in half and retried until the bad
+posting fails on its own, so one bad row does not fail other clients' postings.
+
+Usage:
+    dispatcher = PostingDispatcher(shards=4)
+    dispatcher.start()
+    result = dispatcher.post({'type': 'DEPOSIT', 'account_id': 42, 'amount': 100})
+    dispatcher.stop()
+"""
+
+from collections import Counter, deque
+from concurrent.futures import Future
+from models.transaction import Transaction, check_operation
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds of submissions used to decide which leg of a transfer is the hot one
+HOT_WINDOW_SECONDS = 10
+
+_STOP = object()
+
+
+class PostingDispatcher:
+    """Per-account-shard posting queues that coalesce postings into locked batches"""
+    
+    def __init__(self, shards=4, max_batch=200, linger_ms=2, max_queue=10000, window=1000):
+        """
+        Args:
+            shards (int): Worker threads; each holds one pooled connection while posting
+            max_batch (int): Most postings committed together
+            linger_ms (float): How long a worker waits for more postings before posting
+                a batch that is not full; 0 posts whatever is already queued
+            max_queue (int): Postings a shard holds before submit refuses more
+            window (int): Recent batches kept for the percentile metrics
+        """
+        self.shards = shards
+        self.max_batch = max_batch
+        self.linger = linger_ms / 1000
+        self.queues = [queue.Queue(maxsize=max_queue) for _ in range(shards)]
+        self.workers = []
+        self.running = False
+        
+        self.lock = threading.Lock()
+        # Notified when an account's route is released, for transfers waiting to move one
+        self.rerouted = threading.Condition(self.lock)
+        self.window_started = time.monotonic()
+        self.recent_accounts = Counter()
+        self.previous_accounts = Counter()
+        # account_id -> [shard, postings queued or posting there]
+        self.routes = {}
+        # account_id -> transfers waiting for it to be released so they can move it
+        self.moving = Counter()
+        self.stats = {
+            'submitted': 0, 'rejected': 0, 'posted': 0, 'failed': 0, 'batches': 0, 'split_batches': 0,
+            'max_batch': 0,
+            'shard_postings': [0] * shards, 'shard_batches': [0] * shards,
+            'batch_sizes': deque(maxlen=window), 'queue_wait_ms': deque(maxlen=window),
+            'post_ms': deque(maxlen=window)
+        }
+    
+    def start(self):
+        """Start the shard workers"""
+        if self.running:
+            return
+        self.running = True
+        self.workers = [
+            threading.Thread(target=self._run_shard, args=(shard,), name=f'posting-shard-{shard}', daemon=True)
+            for shard in range(self.shards)
+        ]
+        for worker in self.workers:
+            worker.start()
+        logger.info(f"Posting dispatcher started with {self.shards} shards")
+    
+    def stop(self, wait=True):
+        """Post everything already queued, then stop the workers"""
+        with self.lock:
+            if not self.running:
+                return
+            # Taken with the lock, so no submit can queue behind the stop marker
+            self.running = False
+            self.rerouted.notify_all()
+        for shard_queue in self.queues:
+            shard_queue.put(_STOP)
+        if wait:
+            for worker in self.workers:
+                worker.join()
+        logger.info("Posting dispatcher stopped")
+    
+    def _route(self, operation):
+        """
+        Pick the shard for a posting and count it against its accounts (lock held)
+        An account with postings still queued keeps its shard; otherwise transfers
+        follow whichever leg has been busier lately, so every posting that touches
+        a hot account lands on the same queue. A transfer whose legs are queued on
+        different shards waits until they are not
+        Returns:
+            tuple: (shard, accounts routed to it, to pass to _unroute),
+                   or (None, []) if the dispatcher stopped while waiting
+        """
+        legs = [operation.get('account_id')]
+        if operation.get('to_account_id') is not None:
+            legs.append(operation['to_account_id'])
+        
+        now = time.monotonic()
+        if now - self.window_started >= HOT_WINDOW_SECONDS:
+            self.previous_accounts = self.recent_accounts
+            self.recent_accounts = Counter()
+            self.window_started = now
+        hot = max(legs, key=lambda a: self.recent_accounts[a] + self.previous_accounts[a])
+        for account_id in legs:
+            self.recent_accounts[account_id] += 1
+        
+        moving = False
+        try:
+            while True:
+                if not self.running:
+                    return None, []
+                pinned = {self.routes[a][0] for a in legs if a in self.routes}
+                if len(pinned) > 1:
+                    if not moving:
+                        # Later postings to these accounts queue up behind this one
+                        moving = True
+                        self.moving.update(legs)
+                elif moving or not any(self.moving[a] for a in legs):
+                    break
+                self.rerouted.wait()
+        finally:
+            if moving:
+                for account_id in legs:
+                    self.moving[account_id] -= 1
+                    if not self.moving[account_id]:
+                        del self.moving[account_id]
+                self.rerouted.notify_all()
+        
+        shard = pinned.pop() if pinned else hash(hot) % self.shards
+        for account_id in legs:
+            self.routes.setdefault(account_id, [shard, 0])[1] += 1
+        return shard, legs
+    
+    def _unroute(self, routed):
+        """Release accounts routed for postings that have been resolved (lock held)"""
+        for account_id in routed:
+            route = self.routes[account_id]
+            route[1] -= 1
+            if not route[1]:
+                del self.routes[account_id]
+                self.rerouted.notify_all()
+    
+    def submit(self, operation):
+        """
+        Queue one posting
+        Waits only for a transfer between accounts queued on different shards
+        Args:
+            operation (dict): As for Transaction.post_batch: type, account_id, amount
+                and optional to_account_id, description, reference, idempotency_key
+        Returns:
+            Future: Resolves to the posting's result dict
+        """
+        future = Future()
+        # Refused here rather than in the batch, where a value the database
+        # cannot store would fail every posting batched with it
+        _, _, message = check_operation(operation)
+        if message:
+            future.set_result({"success": False, "message": message})
+            return future
+        
+        with self.lock:
+            shard, routed = self._route(operation)
+            if shard is None:
+                future.set_result({"success": False, "message": "Posting dispatcher is not running"})
+                return future
+            try:
+                self.queues[shard].put_nowait((operation, future, time.perf_counter(), routed))
+            except queue.Full:
+                self._unroute(routed)
+                self.stats['rejected'] += 1
+                future.set_result({"success": False, "message": "Posting queue is full, please try again"})
+                return future
+            self.stats['submitted'] += 1
+        return future
+    
+    def post(self, operation, timeout=None):
+        """Queue one posting and wait for its result"""
+        return self.submit(operation).result(timeout)
+    
+    def _next_batch(self, shard_queue, first):
+        """
+        Collect postings queued behind the first one, up to max_batch
+        Returns:
+            tuple: (batch, stop) where stop is True once the stop marker was taken
+        """
+        batch = [first]
+        deadline = time.perf_counter() + self.linger
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                item = shard_queue.get(timeout=remaining) if remaining > 0 else shard_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+    
+    def _run_shard(self, shard):
+        """Worker loop: take a batch off this shard's queue and post it in one transaction"""
+        shard_queue = self.queues[shard]
+        transaction = Transaction()
+        stop = False
+        while not stop:
+            first = shard_queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._next_batch(shard_queue, first)
+            self._post(shard, transaction, batch)
+    
+    def _post_operations(self, shard, transaction, operations):
+        """
+        Post operations as one batch, splitting it in half and retrying each half
+        when the batch fails on a database error
+        The failed batch was rolled back, so its idempotency keys are free to retry
+        Returns:
+            list: One result dict per operation
+        """
+        try:
+            results = transaction.post_batch(operations, self.max_batch)['results']
+        except Exception as e:
+            # A pool or connection failure before the batch began; nothing was posted
+            logger.error(f"Posting shard {shard} failed: {e}")
+            return [{"success": False, "message": f"Posting failed: {str(e)}"} for _ in operations]
+        
+        if len(operations) > 1 and results and results[0].get('batch_failed'):
+            with self.lock:
+                self.stats['split_batches'] += 1
+            middle = len(operations) // 2
+            return (self._post_operations(shard, transaction, operations[:middle])
+                    + self._post_operations(shard, transaction, operations[middle:]))
+        return results
+    
+    def _post(self, shard, transaction, batch):
+        """Post one batch and resolve its futures"""
+        started = time.perf_counter()
+        results = self._post_operations(shard, transaction, [op for op, _, _, _ in batch])
+        finished = time.perf_counter()
+        
+        with self.lock:
+            for _, _, _, routed in batch:
+                self._unroute(routed)
+        for (_, future, _, _), result in zip(batch, results):
+            future.set_result(result)
+        
+        posted = sum(1 for r in results if r['success'])
+        with self.lock:
+            stats = self.stats
+            stats['posted'] += posted
+            stats['failed'] += len(results) - posted
+            stats['batches'] += 1
+            stats['max_batch'] = max(stats['max_batch'], len(batch))
+            stats['shard_postings'][shard] += len(batch)
+            stats['shard_batches'][shard] += 1
+            stats['batch_sizes'].append(len(batch))
+            stats['post_ms'].append((finished - started) * 1000)
+            stats['queue_wait_ms'].extend((started - queued) * 1000 for _, _, queued, _ in batch)
+    
+    def metrics(self):
+        """
+        Contention metrics as a JSON-ready dict
+        postings_per_lock is how many postings shared each account lock and commit;
+        queue waits that grow while it stays near 1 mean more shards would help
+        """
+        def percentile(values, fraction):
+            return round(values[min(len(values) - 1, int(len(values) * fraction))], 2) if values else 0
+        
+        with self.lock:
+            stats = self.stats
+            sizes = list(stats['batch_sizes'])
+            waits = sorted(stats['queue_wait_ms'])
+            post_ms = sorted(stats['post_ms'])
+            hot = (self.recent_accounts + self.previous_accounts).most_common(5)
+            shards = [
+                {'shard': shard, 'queued': self.queues[shard].qsize(),
+                 'postings': stats['shard_postings'][shard], 'batches': stats['shard_batches'][shard]}
+                for shard in range(self.shards)
+            ]
+            return {
+                'running': self.running,
+                'submitted': stats['submitted'],
+                'rejected': stats['rejected'],
+                'posted': stats['posted'],
+                'failed': stats['failed'],
+                'batches': stats['batches'],
+                'split_batches': stats['split_batches'],
+                'max_batch': stats['max_batch'],
+                'postings_per_lock': round(sum(sizes) / len(sizes), 2) if sizes else 0,
+                'queue_wait_p50_ms': percentile(waits, 0.5),
+                'queue_wait_p95_ms': percentile(waits, 0.95),
+                'queue_wait_max_ms': round(waits[-1], 2) if waits else 0,
+                'post_p50_ms': percentile(post_ms, 0.5),
+                'post_p95_ms': percentile(post_ms, 0.95),
+                'hot_accounts': [{'account_id': account_id, 'postings': count} for account_id, count in hot],
+                'routed_accounts': len(self.routes),
+                'shards': shards
+            }
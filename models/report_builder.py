@@ -0,0 +1,470 @@
+"""
+Report Builder for Bank Management System
+Produces the text of each standard report; shared by ReportsWindow and the headless report scheduler
+"""
+
+from mysql.connector import Error
+from models.customer import Customer
+from models.account import Account
+from models.transaction import Transaction
+from models.analytics import TransactionAnalytics
+from models.loan_classification import LoanClassifier
+from models.report_cache import get_report_cache
+from models.transaction_rollup import TransactionRollup
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Report key -> title and the tables whose watermark invalidates its cached text
+REPORTS = {
+    'system_overview': {'title': "System Overview", 'tables': ('customers', 'accounts')},
+    # Built from the rollup, so it is cached against how far the rollup reaches,
+    # not against raw transactions the rollup has not folded in yet
+    'daily_summary': {'title': "Daily Summary", 'tables': ('rollup_watermarks', 'daily_transaction_stats'),
+                      'rollup': True},
+    'account_status': {'title': "Account Status Report", 'tables': ('accounts', 'customers')},
+    'customer_demographics': {'title': "Customer Demographics", 'tables': ('customers',)},
+    'transaction_history': {'title': "Transaction History", 'tables': ('transactions', 'accounts', 'customers')},
+    'customer_list': {'title': "Customer List", 'tables': ('customers', 'branches')},
+    'monthly_analysis': {'title': "Monthly Analysis", 'tables': ('transactions',)},
+    'growth_analysis': {'title': "Growth Analysis", 'tables': ('transactions', 'accounts', 'customers')},
+    'seasonal_trends': {'title': "Seasonal Trends", 'tables': ('transactions',)},
+    'risk_assessment': {'title': "Risk Assessment",
+                        'tables': ('loans', 'loan_payments', 'emi_schedule', 'loan_dpd_snapshots')}
+}
+
+
+def default_params(report, today=None):
+    """
+    Parameters a report runs with when nobody picks them, e.g. from the scheduler
+    Args:
+        report (str): Report key from REPORTS
+        today (date): Run date (default: today)
+    Returns:
+        tuple: Arguments for the report's build method
+    """
+    today = today or datetime.now().date()
+    if report in ('daily_summary', 'risk_assessment'):
+        return (today,)
+    if report == 'transaction_history':
+        yesterday = today - timedelta(days=1)
+        return (yesterday, yesterday)
+    if report in ('monthly_analysis', 'growth_analysis', 'seasonal_trends'):
+        return (TransactionAnalytics.default_start_date(),)
+    return ()
+
+
+class ReportBuilder:
+    """Builds report text from the models, without any Tk dependency"""
+    
+    def __init__(self):
+        self.customer_model = Customer()
+        self.account_model = Account()
+        self.transaction_model = Transaction()
+        self.analytics = TransactionAnalytics()
+        self.loan_classifier = LoanClassifier()
+        self.report_cache = get_report_cache()
+    
+    def run_report(self, report, *params):
+        """
+        Get a report's text, from the report cache while its tables are unchanged
+        Args:
+            report (str): Report key from REPORTS
+            *params: Arguments for the report's build method
+        Returns:
+            str: Report text
+        """
+        definition = REPORTS[report]
+        build = getattr(self, f"build_{report}")
+        if definition.get('rollup'):
+            # Fold in settled transactions first, so a cached build is only served
+            # while it still matches the rollup
+            try:
+                TransactionRollup(self.transaction_model.get_connection()).refresh()
+            except Error as e:
+                logger.warning(f"Transaction rollup not refreshed before {definition['title']}: {e}")
+        return self.report_cache.get_or_build(
+            definition['title'], params, definition['tables'],
+            lambda: build(*params)
+        )
+    
+    def build_system_overview(self):
+        """Build the text of the system overview report"""
+        customers = self.customer_model.get_all_customers()
+        accounts = self.account_model.get_all_accounts()
+        
+        report_data = []
+        report_data.append("=" * 60)
+        report_data.append("BANK MANAGEMENT SYSTEM - OVERVIEW REPORT")
+        report_data.append("=" * 60)
+        report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        report_data.append("")
+        
+        # Customer Statistics
+        report_data.append("CUSTOMER STATISTICS:")
+        report_data.append("-" * 20)
+        report_data.append(f"Total Customers: {len(customers)}")
+        active_customers = len([c for c in customers if c.get('status') == 'ACTIVE'])
+        report_data.append(f"Active Customers: {active_customers}")
+        report_data.append("")
+        
+        # Account Statistics
+        report_data.append("ACCOUNT STATISTICS:")
+        report_data.append("-" * 20)
+        report_data.append(f"Total Accounts: {len(accounts)}")
+        
+        account_types = {}
+        active_accounts = 0
+        total_balance = 0.0
+        
+        for acc in accounts:
+            acc_type = acc.get('account_type', 'UNKNOWN')
+            account_types[acc_type] = account_types.get(acc_type, 0) + 1
+            
+            if acc.get('status') == 'ACTIVE':
+                active_accounts += 1
+            
+            balance = float(acc.get('balance', 0))
+            total_balance += balance
+        
+        report_data.append(f"Active Accounts: {active_accounts}")
+        report_data.append(f"Total Balance: ₹{total_balance:,.2f}")
+        report_data.append("")
+        
+        report_data.append("ACCOUNT TYPES BREAKDOWN:")
+        report_data.append("-" * 25)
+        for acc_type, count in account_types.items():
+            report_data.append(f"{acc_type}: {count}")
+        
+        return "\n".join(report_data)
+    
+    def build_daily_summary(self, today):
+        """Build the text of the daily summary report"""
+        # Today's totals come from the daily rollup rather than raw transactions
+        summary = {row['transaction_type']: row for row in self.transaction_model.get_transaction_summary(days=0)}
+        
+        def totals(transaction_type):
+            row = summary.get(transaction_type)
+            if not row:
+                return 0, 0.0
+            return int(row['count']), float(row['total_amount'] or 0)
+        
+        report_data = []
+        report_data.append("=" * 60)
+        report_data.append("DAILY SUMMARY REPORT")
+        report_data.append("=" * 60)
+        report_data.append(f"Date: {today.strftime('%Y-%m-%d')}")
+        report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        report_data.append("")
+        
+        total_count = sum(int(row['count']) for row in summary.values())
+        
+        if not total_count:
+            report_data.append("No transactions found for today.")
+        else:
+            # Analyze transactions
+            deposit_count, total_deposits = totals('DEPOSIT')
+            withdrawal_count, total_withdrawals = totals('WITHDRAWAL')
+            transfer_count, total_transfers = totals('TRANSFER_OUT')
+            
+            report_data.append("TRANSACTION SUMMARY:")
+            report_data.append("-" * 20)
+            report_data.append(f"Total Transactions: {total_count}")
+            report_data.append(f"Deposits: {deposit_count} (₹{total_deposits:,.2f})")
+            report_data.append(f"Withdrawals: {withdrawal_count} (₹{total_withdrawals:,.2f})")
+            report_data.append(f"Transfers: {transfer_count} (₹{total_transfers:,.2f})")
+            report_data.append("")
+            
+            net_flow = total_deposits - total_withdrawals
+            report_data.append(f"Net Cash Flow: ₹{net_flow:,.2f}")
+        
+        return "\n".join(report_data)
+    
+    def build_account_status(self):
+        """Build the text of the account status report"""
+        accounts = self.account_model.get_all_accounts()
+        
+        report_data = []
+        report_data.append("=" * 60)
+        report_data.append("ACCOUNT STATUS REPORT")
+        report_data.append("=" * 60)
+        report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        report_data.append("")
+        
+        # Group by status
+        status_groups = {}
+        for acc in accounts:
+            status = acc.get('status', 'UNKNOWN')
+            if status not in status_groups:
+                status_groups[status] = []
+            status_groups[status].append(acc)
+        
+        for status, acc_list in status_groups.items():
+            report_data.append(f"{status} ACCOUNTS ({len(acc_list)}):")
+            report_data.append("-" * (len(status) + 12))
+            
+            total_balance = 0.0
+            for acc in acc_list:
+                balance = float(acc.get('balance', 0))
+                total_balance += balance
+                report_data.append(f"  {acc.get('account_number', 'N/A')} - {acc.get('customer_name', 'N/A')} - ₹{balance:,.2f}")
+            
+            report_data.append(f"  Total Balance: ₹{total_balance:,.2f}")
+            report_data.append("")
+        
+        return "\n".join(report_data)
+    
+    def build_customer_demographics(self):
+        """Build the text of the customer demographics report"""
+        customers = self.customer_model.get_all_customers()
+        
+        report_data = []
+        report_data.append("=" * 60)
+        report_data.append("CUSTOMER DEMOGRAPHICS REPORT")
+        report_data.append("=" * 60)
+        report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        report_data.append("")
+        
+        # City distribution
+        cities = {}
+        for customer in customers:
+            city = customer.get('city', 'Unknown')
+            cities[city] = cities.get(city, 0) + 1
+        
+        report_data.append("CUSTOMERS BY CITY:")
+        report_data.append("-" * 20)
+        for city, count in sorted(cities.items()):
+            report_data.append(f"{city}: {count}")
+        report_data.append("")
+        
+        # Status distribution
+        statuses = {}
+        for customer in customers:
+            status = customer.get('status', 'Unknown')
+            statuses[status] = statuses.get(status, 0) + 1
+        
+        report_data.append("CUSTOMERS BY STATUS:")
+        report_data.append("-" * 21)
+        for status, count in statuses.items():
+            report_data.append(f"{status}: {count}")
+        
+        return "\n".join(report_data)
+    
+    def build_transaction_history(self, from_date, to_date):
+        """Build the text of the transaction history report for a date range"""
+        filtered_transactions = self.transaction_model.get_transactions_by_date_range(from_date, to_date)
+        
+        report_data = []
+        report_data.append("=" * 80)
+        report_data.append("TRANSACTION HISTORY REPORT")
+        report_data.append("=" * 80)
+        report_data.append(f"Period: {from_date} to {to_date}")
+        report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        report_data.append("")
+        
+        if not filtered_transactions:
+            report_data.append("No transactions found for the selected period.")
+        else:
+            report_data.append(f"Total Transactions: {len(filtered_transactions)}")
+            report_data.append("")
+            report_data.append(f"{'Date':<12} {'Account':<15} {'Type':<12} {'Amount':<15} {'Balance':<15} {'Description':<20}")
+            report_data.append("-" * 80)
+            
+            for trans in filtered_transactions:
+                date_str = trans.get('transaction_date', '').strftime('%Y-%m-%d') if trans.get('transaction_date') else 'N/A'
+                account = trans.get('account_number', 'N/A')[:12]
+                trans_type = trans.get('transaction_type', 'N/A')[:10]
+                amount = f"₹{float(trans.get('amount', 0)):,.2f}"
+                balance = f"₹{float(trans.get('balance_after', 0)):,.2f}"
+                desc = (trans.get('description', 'N/A')[:18] + '..') if len(str(trans.get('description', ''))) > 20 else str(trans.get('description', 'N/A'))
+                
+                report_data.append(f"{date_str:<12} {account:<15} {trans_type:<12} {amount:<15} {balance:<15} {desc:<20}")
+        
+        return "\n".join(report_data)
+    
+    def build_customer_list(self):
+        """Build the text of the complete customer list"""
+        customers = self.customer_model.get_all_customers()
+        
+        report_data = []
+        report_data.append("=" * 80)
+        report_data.append("CUSTOMER LIST REPORT")
+        report_data.append("=" * 80)
+        report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        report_data.append(f"Total Customers: {len(customers)}")
+        report_data.append("")
+        
+        if customers:
+            report_data.append(f"{'ID':<5} {'Name':<25} {'Phone':<15} {'City':<15} {'Status':<8}")
+            report_data.append("-" * 80)
+            
+            for customer in customers:
+                cust_id = str(customer.get('customer_id', 'N/A'))
+                name = f"{customer.get('first_name', '')} {customer.get('last_name', '')}"[:23]
+                phone = customer.get('phone', 'N/A')[:13]
+                city = customer.get('city', 'N/A')[:13]
+                status = customer.get('status', 'N/A')
+                
+                report_data.append(f"{cust_id:<5} {name:<25} {phone:<15} {city:<15} {status:<8}")
+        else:
+            report_data.append("No customers found.")
+        
+        return "\n".join(report_data)
+    
+    def build_monthly_analysis(self, start_date):
+        """Build the text of the monthly transaction analysis report"""
+        monthly = self.analytics.monthly_analysis(start_date)
+        
+        report_data = []
+        report_data.append("=" * 100)
+        report_data.append("MONTHLY ANALYSIS REPORT")
+        report_data.append("=" * 100)
+        report_data.append(f"Period: {start_date.strftime('%Y-%m')} to {datetime.now().strftime('%Y-%m')}")
+        report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        report_data.append("")
+        
+        if monthly.empty:
+            report_data.append("No transactions found for this period.")
+        else:
+            report_data.append(f"{'Month':<10}{'Count':>10}{'Credits':>18}{'Debits':>18}{'Net Flow':>18}{'Accounts':>10}{'Average':>14}")
+            report_data.append("-" * 100)
+            for month, row in monthly.iterrows():
+                report_data.append(
+                    f"{str(month):<10}{int(row['transactions']):>10}"
+                    f"{'₹' + format(row['credits'], ',.2f'):>18}{'₹' + format(row['debits'], ',.2f'):>18}"
+                    f"{'₹' + format(row['net_flow'], ',.2f'):>18}{int(row['active_accounts']):>10}"
+                    f"{'₹' + format(row['average_amount'], ',.2f'):>14}"
+                )
+            report_data.append("-" * 100)
+            report_data.append(f"Total Transactions: {int(monthly['transactions'].sum())}")
+            report_data.append(f"Total Volume: ₹{monthly['volume'].sum():,.2f}")
+            report_data.append(f"Net Cash Flow: ₹{monthly['net_flow'].sum():,.2f}")
+            busiest = monthly['transactions'].idxmax()
+            report_data.append(f"Busiest Month: {busiest} ({int(monthly.loc[busiest, 'transactions'])} transactions)")
+        
+        return "\n".join(report_data)
+    
+    def build_growth_analysis(self, start_date):
+        """Build the text of the customer and account growth report"""
+        growth = self.analytics.growth_analysis(start_date)
+        
+        report_data = []
+        report_data.append("=" * 100)
+        report_data.append("GROWTH ANALYSIS REPORT")
+        report_data.append("=" * 100)
+        report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        report_data.append("")
+        
+        report_data.append(f"{'Month':<10}{'New Cust.':>10}{'Customers':>11}{'New Acc.':>10}{'Accounts':>10}{'Active':>9}{'Volume':>20}{'Growth':>10}")
+        report_data.append("-" * 100)
+        for month, row in growth.iterrows():
+            change = row['volume_growth_pct']
+            change_text = "-" if change != change else f"{change:+.1f}%"
+            report_data.append(
+                f"{str(month):<10}{int(row['new_customers']):>10}{int(row['total_customers']):>11}"
+                f"{int(row['new_accounts']):>10}{int(row['total_accounts']):>10}{int(row['active_accounts']):>9}"
+                f"{'₹' + format(row['volume'], ',.2f'):>20}{change_text:>10}"
+            )
+        report_data.append("-" * 100)
+        
+        if len(growth) > 0:
+            first, last = growth.iloc[0], growth.iloc[-1]
+            opening_customers = first['total_customers'] - first['new_customers']
+            opening_accounts = first['total_accounts'] - first['new_accounts']
+            report_data.append(f"New Customers: {int(growth['new_customers'].sum())} "
+                               f"({int(opening_customers)} -> {int(last['total_customers'])})")
+            report_data.append(f"New Accounts: {int(growth['new_accounts'].sum())} "
+                               f"({int(opening_accounts)} -> {int(last['total_accounts'])})")
+        
+        return "\n".join(report_data)
+    
+    def build_seasonal_trends(self, start_date):
+        """Build the text of the seasonal transaction trends report"""
+        trends = self.analytics.seasonal_trends(start_date)
+        month_names = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+                       'August', 'September', 'October', 'November', 'December']
+        
+        report_data = []
+        report_data.append("=" * 70)
+        report_data.append("SEASONAL TRENDS REPORT")
+        report_data.append("=" * 70)
+        report_data.append(f"Period: last 12 months from {start_date.strftime('%Y-%m-%d')}")
+        report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        sections = [
+            ("BY SEASON", trends['season'], lambda key: key),
+            ("BY MONTH", trends['month'], lambda key: month_names[key - 1]),
+            ("BY DAY OF WEEK", trends['weekday'], lambda key: key)
+        ]
+        
+        for title, frame, label in sections:
+            total = frame['transactions'].sum()
+            report_data.append("")
+            report_data.append(f"{title}:")
+            report_data.append("-" * 70)
+            report_data.append(f"{'':<14}{'Count':>10}{'Share':>9}{'Volume':>20}{'Average':>16}")
+            for key, row in frame.iterrows():
+                share = row['transactions'] / total * 100 if total else 0
+                report_data.append(
+                    f"{label(key):<14}{int(row['transactions']):>10}{share:>8.1f}%"
+                    f"{'₹' + format(row['volume'], ',.2f'):>20}{'₹' + format(row['average_amount'], ',.2f'):>16}"
+                )
+        
+        return "\n".join(report_data)
+    
+    def build_risk_assessment(self, today):
+        """Build the text of the loan book risk assessment report"""
+        book = self.loan_classifier.classify(today)
+        buckets = self.loan_classifier.summarize(book)
+        trend = self.loan_classifier.get_trend()
+        
+        total_loans = sum(row['loans'] for row in buckets)
+        total_outstanding = sum(row['outstanding'] for row in buckets)
+        
+        report_data = []
+        report_data.append("=" * 80)
+        report_data.append("LOAN RISK ASSESSMENT REPORT")
+        report_data.append("=" * 80)
+        report_data.append(f"As of: {today.strftime('%Y-%m-%d')}")
+        report_data.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        report_data.append("")
+        
+        if not total_loans:
+            report_data.append("No disbursed loans found.")
+        else:
+            report_data.append("DAYS PAST DUE CLASSIFICATION:")
+            report_data.append("-" * 80)
+            report_data.append(f"{'Bucket':<12}{'Loans':>8}{'Share':>9}{'Outstanding':>22}{'Overdue':>20}")
+            for row in buckets:
+                share = row['outstanding'] / total_outstanding * 100 if total_outstanding else 0
+                report_data.append(
+                    f"{row['bucket']:<12}{row['loans']:>8}{share:>8.1f}%"
+                    f"{'₹' + format(row['outstanding'], ',.2f'):>22}{'₹' + format(row['overdue'], ',.2f'):>20}"
+                )
+            report_data.append("-" * 80)
+            
+            npa = buckets[-1]
+            report_data.append(f"Total Loans: {total_loans}")
+            report_data.append(f"Total Outstanding: ₹{total_outstanding:,.2f}")
+            report_data.append(f"Gross NPA: {npa['loans']} loans, ₹{npa['outstanding']:,.2f} "
+                               f"({npa['outstanding'] / total_outstanding * 100 if total_outstanding else 0:.2f}% of book)")
+            report_data.append(f"Loans 1-90 days past due: {sum(row['loans'] for row in buckets[1:-1])}")
+        
+        if trend:
+            report_data.append("")
+            report_data.append("NPA TREND (from daily snapshots):")
+            report_data.append("-" * 80)
+            by_date = {}
+            for row in trend:
+                totals = by_date.setdefault(row['snapshot_date'], {'outstanding': 0.0, 'npa': 0.0, 'npa_loans': 0})
+                totals['outstanding'] += float(row['outstanding'] or 0)
+                if row['dpd_bucket'] == 'NPA':
+                    totals['npa'] += float(row['outstanding'] or 0)
+                    totals['npa_loans'] += int(row['loans'])
+            for snapshot_date, totals in by_date.items():
+                ratio = totals['npa'] / totals['outstanding'] * 100 if totals['outstanding'] else 0
+                report_data.append(f"{snapshot_date}: {totals['npa_loans']} NPA loans, "
+                                   f"₹{totals['npa']:,.2f} ({ratio:.2f}%)")
+        
+        return "\n".join(report_data)
@@ -0,0 +1,261 @@
+"""
+Report Cache for Bank Management System
+Keeps generated report text until the data behind it changes, in memory and on disk
+
+Usage:
+    cache = get_report_cache()
+    content = cache.get_or_build("System Overview", (), ('customers', 'accounts'), build)
+"""
+
+import mysql.connector
+from mysql.connector import Error
+from config import DB_CONFIG
+from collections import OrderedDict
+from datetime import date, datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# One file per entry, so a miss writes only the report it built
+CACHE_DIR = os.path.join("reports", ".cache", "report_cache")
+CACHE_VERSION = 2
+
+# Columns that move whenever a table changes: the highest auto-increment ID catches
+# inserts and updated_date catches updates. Tables without one of them use NULL
+WATERMARK_COLUMNS = {
+    'branches': ('branch_id', None),
+    'customers': ('customer_id', 'updated_date'),
+    'accounts': ('account_id', 'updated_date'),
+    'transactions': ('transaction_id', None),
+    'daily_transaction_stats': (None, 'updated_date'),
+    # How far the transaction rollup has folded transactions in
+    'rollup_watermarks': ('last_transaction_id', 'updated_date'),
+    'loans': ('loan_id', 'updated_date'),
+    'loan_payments': ('payment_id', None),
+    'emi_schedule': ('schedule_id', 'updated_date'),
+    'loan_dpd_snapshots': (None, 'updated_date')
+}
+
+
+def _json_value(value):
+    """Render a watermark or parameter value so it survives a JSON round trip unchanged"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [_json_value(v) for v in value]
+    return value
+
+
+def cache_key(name, params):
+    """Cache key for a report and its parameters"""
+    return json.dumps([name, _json_value(list(params))], sort_keys=True)
+
+
+class ReportCache:
+    """
+    Bounded LRU of report text keyed by report name and parameters
+    Each entry remembers the watermark of the tables it was built from and is
+    only served while that watermark is unchanged
+    """
+    
+    def __init__(self, path=CACHE_DIR, max_entries=64):
+        self.connection = None
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.loaded = False
+        self.lock = threading.Lock()
+        # The watermark connection is shared by every thread using the cache
+        self.query_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get_connection(self):
+        """Get database connection"""
+        try:
+            if self.connection is None or not self.connection.is_connected():
+                self.connection = mysql.connector.connect(**DB_CONFIG)
+            return self.connection
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+    
+    def close_connection(self):
+        """Close database connection"""
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+    
+    def get_watermark(self, tables):
+        """
+        Read the change watermark of several tables in one round trip
+        Args:
+            tables (iterable): Table names from WATERMARK_COLUMNS
+        Returns:
+            list: [table, max_id, max_updated] per table, in table name order
+        """
+        tables = sorted(set(tables))
+        parts = []
+        for table in tables:
+            id_column, updated_column = WATERMARK_COLUMNS[table]
+            parts.append(
+                f"SELECT '{table}', {f'MAX({id_column})' if id_column else 'NULL'}, "
+                f"{f'MAX({updated_column})' if updated_column else 'NULL'} FROM {table}"
+            )
+        
+        with self.query_lock:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            cursor.execute(" UNION ALL ".join(parts))
+            rows = cursor.fetchall()
+            cursor.close()
+            
+            # Without autocommit the open read snapshot would hide later commits
+            if not connection.autocommit:
+                connection.commit()
+        
+        return _json_value(sorted([list(row) for row in rows]))
+    
+    def _entry_path(self, key):
+        """File holding one persisted entry"""
+        return os.path.join(self.path, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+    
+    def _load(self):
+        """Read persisted entries once, oldest first so the LRU order survives restarts"""
+        self.loaded = True
+        if not os.path.isdir(self.path):
+            return
+        
+        entries = []
+        for file_name in os.listdir(self.path):
+            if not file_name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.path, file_name), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == CACHE_VERSION:
+                    entries.append((data['entry']['built_at'], data['key'], data['entry']))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # A damaged entry is only a miss
+                logger.warning(f"Ignoring unreadable report cache entry {file_name}: {e}")
+        
+        for _, key, entry in sorted(entries)[-self.max_entries:]:
+            self.entries[key] = entry
+    
+    def _save(self, key, entry, evicted):
+        """
+        Write one entry through a temporary file so a crash never leaves a torn entry,
+        and delete the files of evicted entries. Called without the lock held
+        """
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            path = self._entry_path(key)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'key': key, 'entry': entry}, f)
+            os.replace(temp_path, path)
+            for evicted_key in evicted:
+                evicted_path = self._entry_path(evicted_key)
+                if os.path.exists(evicted_path):
+                    os.remove(evicted_path)
+        except OSError as e:
+            logger.warning(f"Could not persist report cache entry to {self.path}: {e}")
+    
+    def get(self, name, params, watermark):
+        """
+        Get cached report text if it was built at this watermark
+        Returns:
+            str: Cached content, or None on a miss
+        """
+        key = cache_key(name, params)
+        with self.lock:
+            if not self.loaded:
+                self._load()
+            entry = self.entries.get(key)
+            if entry is None or entry['watermark'] != watermark:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry['content']
+    
+    def put(self, name, params, watermark, content):
+        """Store report text, replacing any older build of the same report and parameters"""
+        key = cache_key(name, params)
+        entry = {'watermark': watermark, 'content': content, 'built_at': time.time()}
+        evicted = []
+        with self.lock:
+            if not self.loaded:
+                self._load()
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                evicted.append(self.entries.popitem(last=False)[0])
+        # Readers are not held up while a large report is written to disk
+        self._save(key, entry, evicted)
+    
+    def get_or_build(self, name, params, tables, build):
+        """
+        Return cached report text, or build and cache it
+        Args:
+            name (str): Report name
+            params (tuple): Report parameters that change its content
+            tables (tuple): Tables the report reads, from WATERMARK_COLUMNS
+            build (callable): Called with no arguments to produce the report text
+        Returns:
+            str: Report text
+        """
+        try:
+            watermark = self.get_watermark(tables)
+        except Error as e:
+            logger.warning(f"Report cache bypassed for {name}: {e}")
+            return build()
+        
+        content = self.get(name, params, watermark)
+        if content is not None:
+            logger.info(f"Report cache hit for {name}")
+            return content
+        
+        content = build()
+        # A table that changed while the report was built may or may not be in it,
+        # so that text is not cached; the next request builds again
+        try:
+            if self.get_watermark(tables) == watermark:
+                self.put(name, params, watermark, content)
+        except Error as e:
+            logger.warning(f"Report cache not updated for {name}: {e}")
+        return content
+    
+    def clear(self):
+        """Drop every cached report, in memory and on disk"""
+        with self.lock:
+            self.entries.clear()
+            self.loaded = True
+            if os.path.isdir(self.path):
+                for file_name in os.listdir(self.path):
+                    os.remove(os.path.join(self.path, file_name))
+    
+    def __del__(self):
+        """Destructor to ensure connection is closed"""
+        self.close_connection()
+
+
+_report_cache = None
+_report_cache_lock = threading.Lock()
+
+
+def get_report_cache():
+    """
+    Get the report cache shared by every reports window
+    Returns:
+        ReportCache: Process-wide cache instance
+    """
+    global _report_cache
+    with _report_cache_lock:
+        if _report_cache is None:
+            _report_cache = ReportCache()
+    return _report_cache
@@ -0,0 +1,377 @@
+"""
+Headless Report Scheduler for Bank Management System
+Runs the standard reports on a cron-like schedule without Tk and writes them to files
+
+Usage:
+    python -m models.report_scheduler
+    python -m models.report_scheduler --schedule report_schedule.json --workers 4
+    python -m models.report_scheduler --run-once daily_summary risk_assessment
+"""
+
+import mysql.connector
+from mysql.connector import Error
+from config import DB_CONFIG
+from models.report_builder import ReportBuilder, REPORTS, default_params
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import argparse
+import csv
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+RUN_LOCK_NAME = 'report_scheduler'
+SCHEDULED_DIR = os.path.join("reports", "scheduled")
+METRICS_FILE = "report_metrics.csv"
+METRICS_COLUMNS = ['report', 'scheduled_for', 'started_at', 'queue_seconds',
+                   'elapsed_seconds', 'status', 'bytes', 'path', 'error']
+
+# Heavy reports run off-peak; cron fields are minute hour day-of-month month day-of-week
+DEFAULT_SCHEDULE = [
+    {'report': 'transaction_history', 'cron': '15 1 * * *'},
+    {'report': 'monthly_analysis', 'cron': '0 2 1 * *'},
+    {'report': 'growth_analysis', 'cron': '0 2 1 * *'},
+    {'report': 'seasonal_trends', 'cron': '0 2 1 * *'},
+    {'report': 'customer_demographics', 'cron': '0 5 * * 1'},
+    {'report': 'customer_list', 'cron': '0 5 * * 1'},
+    {'report': 'system_overview', 'cron': '0 6 * * *'},
+    {'report': 'account_status', 'cron': '0 6 * * *'},
+    {'report': 'risk_assessment', 'cron': '0 7 * * *'},
+    {'report': 'daily_summary', 'cron': '30 22 * * *'}
+]
+
+# (low, high) per cron field; day-of-week 7 is also Sunday
+CRON_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+class CronSchedule:
+    """A five-field cron expression supporting *, lists, ranges and steps"""
+    
+    def __init__(self, expression):
+        self.expression = expression
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        
+        parsed = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {d % 7 for d in weekdays}
+        # Standard cron: if both day fields are restricted, either one matching is enough
+        self.day_restricted = fields[2] != '*'
+        self.weekday_restricted = fields[4] != '*'
+    
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_text = part.split('/', 1)
+                step = int(step_text)
+                if step < 1:
+                    raise ValueError(f"Invalid cron step: {field!r}")
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(v) for v in part.split('-', 1))
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if not low <= start <= end <= high:
+                raise ValueError(f"Cron field {field!r} out of range {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return values
+    
+    def matches(self, moment):
+        """Whether the schedule fires in the minute of moment"""
+        if moment.minute not in self.minutes or moment.hour not in self.hours:
+            return False
+        if moment.month not in self.months:
+            return False
+        
+        day_match = moment.day in self.days
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return day_match or weekday_match
+        return day_match and weekday_match
+
+
+def load_schedule(path=None):
+    """
+    Load and validate a schedule
+    Args:
+        path (str): JSON file with a list of {"report", "cron"} jobs (default: DEFAULT_SCHEDULE)
+    Returns:
+        list: (report, CronSchedule) pairs
+    """
+    jobs = DEFAULT_SCHEDULE
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            jobs = json.load(f)
+    
+    schedule = []
+    for job in jobs:
+        if job['report'] not in REPORTS:
+            raise ValueError(f"Unknown report in schedule: {job['report']}")
+        schedule.append((job['report'], CronSchedule(job['cron'])))
+    return schedule
+
+
+# One ReportBuilder per worker thread; the models hold one connection each
+_local = threading.local()
+
+
+def get_builder():
+    """The calling thread's ReportBuilder"""
+    if not hasattr(_local, 'builder'):
+        _local.builder = ReportBuilder()
+    return _local.builder
+
+
+def run_report_job(report, scheduled_for, output_dir):
+    """
+    Build one report and write it to a text file
+    Runs on a worker thread
+    Args:
+        report (str): Report key from REPORTS
+        scheduled_for (datetime): Minute the run was due
+        output_dir (str): Root directory for report files
+    Returns:
+        dict: Runtime metrics for the run
+    """
+    started = time.time()
+    metrics = {
+        'report': report,
+        'scheduled_for': scheduled_for.strftime('%Y-%m-%d %H:%M'),
+        'started_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'queue_seconds': round(max(0.0, started - scheduled_for.timestamp()), 2),
+        'elapsed_seconds': 0.0,
+        'status': 'FAILED',
+        'bytes': 0,
+        'path': '',
+        'error': ''
+    }
+    
+    try:
+        content = get_builder().run_report(report, *default_params(report, scheduled_for.date()))
+        
+        title = REPORTS[report]['title']
+        folder = os.path.join(output_dir, scheduled_for.strftime('%Y-%m-%d'))
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{title.replace(' ', '_')}_{scheduled_for.strftime('%H%M')}.txt")
+        temp_path = path + '.part'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+        
+        metrics.update(status='OK', bytes=os.path.getsize(path), path=path)
+    
+    except Exception as e:
+        logger.error(f"Scheduled report {report} failed: {e}")
+        metrics['error'] = str(e)[:500]
+    
+    metrics['elapsed_seconds'] = round(time.time() - started, 2)
+    return metrics
+
+
+class ReportScheduler:
+    """Fires due reports each minute onto a bounded thread pool and records their metrics"""
+    
+    def __init__(self, schedule=None, workers=4, output_dir=SCHEDULED_DIR):
+        self.connection = None
+        self.schedule = schedule if schedule is not None else load_schedule()
+        self.workers = max(1, workers)
+        self.output_dir = output_dir
+        self.metrics_path = os.path.join(output_dir, METRICS_FILE)
+        self.metrics_lock = threading.Lock()
+        self.running = set()
+        self.running_lock = threading.Lock()
+        self.stop_event = threading.Event()
+    
+    def get_connection(self):
+        """Get database connection"""
+        try:
+            if self.connection is None or not self.connection.is_connected():
+                self.connection = mysql.connector.connect(**DB_CONFIG)
+            return self.connection
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+    
+    def close_connection(self):
+        """Close database connection"""
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+    
+    def due_reports(self, moment):
+        """Reports whose schedule fires in the minute of moment, each once"""
+        due = []
+        for report, cron in self.schedule:
+            if cron.matches(moment) and report not in due:
+                due.append(report)
+        return due
+    
+    def record_metrics(self, metrics):
+        """Append one run's metrics to the metrics CSV and the log"""
+        logger.info(
+            f"Report {metrics['report']} {metrics['status']} - Elapsed: {metrics['elapsed_seconds']}s, "
+            f"Queued: {metrics['queue_seconds']}s, Bytes: {metrics['bytes']}"
+        )
+        with self.metrics_lock:
+            os.makedirs(self.output_dir, exist_ok=True)
+            new_file = not os.path.exists(self.metrics_path)
+            with open(self.metrics_path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=METRICS_COLUMNS)
+                if new_file:
+                    writer.writeheader()
+                writer.writerow(metrics)
+    
+    def run_now(self, reports=None):
+        """
+        Run reports immediately and wait for them
+        Args:
+            reports (list): Report keys (default: every report in the schedule)
+        Returns:
+            list: Metrics for each run
+        """
+        reports = reports or list(dict.fromkeys(report for report, _ in self.schedule))
+        moment = datetime.now()
+        results = []
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(run_report_job, report, moment, self.output_dir) for report in reports]
+            for future in as_completed(futures):
+                metrics = future.result()
+                self.record_metrics(metrics)
+                results.append(metrics)
+        
+        return results
+    
+    def _submit(self, executor, report, moment):
+        with self.running_lock:
+            if report in self.running:
+                # A slow run is never stacked with the next one
+                logger.warning(f"Skipping {report} at {moment:%H:%M}: previous run still in progress")
+                return
+            self.running.add(report)
+        
+        def done(future):
+            with self.running_lock:
+                self.running.discard(report)
+            self.record_metrics(future.result())
+        
+        executor.submit(run_report_job, report, moment, self.output_dir).add_done_callback(done)
+    
+    def _holds_lock(self, cursor):
+        """
+        Check that the run lock is still held by this scheduler's connection
+        Querying every loop also keeps the connection from idling into wait_timeout,
+        which would drop it and free the lock without notice
+        """
+        try:
+            cursor.execute("SELECT IS_USED_LOCK(%s) = CONNECTION_ID()", (RUN_LOCK_NAME,))
+            return cursor.fetchone()[0] == 1
+        except Error as e:
+            logger.error(f"Lost the report scheduler connection: {e}")
+            return False
+    
+    def serve(self):
+        """
+        Run the schedule until stop() is called
+        Holds a named lock so only one scheduler serves at a time, and stops
+        serving if the lock is lost
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (RUN_LOCK_NAME,))
+        if cursor.fetchone()[0] != 1:
+            cursor.close()
+            raise RuntimeError("Another report scheduler is already running")
+        
+        logger.info(f"Report scheduler started with {len(self.schedule)} jobs on {self.workers} workers")
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        last_minute = datetime.now().replace(second=0, microsecond=0) - timedelta(minutes=1)
+        
+        lock_held = True
+        try:
+            while not self.stop_event.is_set():
+                lock_held = self._holds_lock(cursor)
+                if not lock_held:
+                    raise RuntimeError("Report scheduler lost its run lock; another scheduler may be running")
+                
+                now = datetime.now()
+                current = now.replace(second=0, microsecond=0)
+                
+                # Catch up on minutes missed while the process was busy or suspended, up to an hour
+                moment = max(last_minute + timedelta(minutes=1), current - timedelta(minutes=59))
+                while moment <= current:
+                    for report in self.due_reports(moment):
+                        self._submit(executor, report, moment)
+                    moment += timedelta(minutes=1)
+                last_minute = current
+                
+                self.stop_event.wait(60 - now.second - now.microsecond / 1e6)
+        
+        finally:
+            executor.shutdown(wait=True)
+            if lock_held:
+                try:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (RUN_LOCK_NAME,))
+                    cursor.fetchone()
+                    cursor.close()
+                except Error as e:
+                    logger.error(f"Error releasing the report scheduler lock: {e}")
+            logger.info("Report scheduler stopped")
+    
+    def stop(self):
+        """Ask serve() to return after the runs in progress finish"""
+        self.stop_event.set()
+    
+    def __del__(self):
+        """Destructor to ensure connection is closed"""
+        self.close_connection()
+
+
+def main():
+    """Command line entry point for the report scheduler"""
+    parser = argparse.ArgumentParser(description='Run reports on a schedule without the GUI')
+    parser.add_argument('--schedule', help='JSON schedule file (default: built-in schedule)')
+    parser.add_argument('--workers', type=int, default=4, help='Reports run at the same time')
+    parser.add_argument('--output', default=SCHEDULED_DIR, help='Root directory for report files')
+    parser.add_argument('--run-once', nargs='*', metavar='REPORT',
+                        help='Run these reports (default: all scheduled) now and exit')
+    parser.add_argument('--list', action='store_true', help='Show the schedule and exit')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(threadName)s - %(message)s')
+    
+    scheduler = ReportScheduler(load_schedule(args.schedule), args.workers, args.output)
+    
+    if args.list:
+        for report, cron in scheduler.schedule:
+            print(f"{cron.expression:<20} {report}")
+        return 0
+    
+    if args.run_once is not None:
+        unknown = [r for r in args.run_once if r not in REPORTS]
+        if unknown:
+            parser.error(f"Unknown reports: {', '.join(unknown)} (choose from {', '.join(REPORTS)})")
+        results = scheduler.run_now(args.run_once)
+        return 1 if any(m['status'] != 'OK' for m in results) else 0
+    
+    try:
+        scheduler.serve()
+    except KeyboardInterrupt:
+        scheduler.stop()
+    except RuntimeError as e:
+        logger.error(str(e))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,452 @@
+"""
+Account Statement Engine for Bank Management System
+Renders monthly PDF account statements with reportlab across a process pool
+
+Usage:
+    python -m models.statement
+    python -m models.statement --month 2025-07 --workers 8
+    python -m models.statement --month 2025-07 --account 123456789012
+"""
+
+import mysql.connector
+from mysql.connector import Error
+from config import DB_CONFIG, APP_CONFIG
+from models.ledger import signed_amount
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, date, time as dt_time
+from decimal import Decimal
+from xml.sax.saxutils import escape
+import argparse
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+STATEMENTS_DIR = os.path.join("reports", "statements")
+
+# Accounts open at any point during the period, with the customer and branch on the letterhead
+ACCOUNTS_SQL = """
+    SELECT
+        a.account_id, a.account_number, a.account_type, a.balance, a.status,
+        c.customer_number, CONCAT(c.first_name, ' ', c.last_name) as customer_name,
+        c.address, c.city, c.state, c.pincode,
+        COALESCE(b.branch_name, 'Unknown') as branch_name,
+        COALESCE(b.branch_code, 'N/A') as branch_code
+    FROM accounts a
+    JOIN customers c ON a.customer_id = c.customer_id
+    LEFT JOIN branches b ON c.branch_id = b.branch_id
+    WHERE a.account_id BETWEEN %s AND %s
+      AND a.opening_date < %s
+      AND (a.closing_date IS NULL OR a.closing_date >= %s)
+    ORDER BY a.account_id
+"""
+
+# One range read for the whole batch, served by idx_transaction_account_date. Rows
+# after the period are only netted off the current balance to find the closing balance;
+# for a month-end run that is a few days of activity
+TRANSACTIONS_SQL = """
+    SELECT account_id, transaction_date, transaction_number, transaction_type, amount, description
+    FROM transactions
+    WHERE account_id BETWEEN %s AND %s
+      AND transaction_date >= %s
+      AND status = 'COMPLETED'
+    ORDER BY account_id, transaction_date, transaction_id
+"""
+
+
+def month_bounds(year, month):
+    """First day of the month and first day of the next month"""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def previous_month(today=None):
+    """(year, month) of the month before today"""
+    today = today or date.today()
+    if today.month == 1:
+        return today.year - 1, 12
+    return today.year, today.month - 1
+
+
+def statement_path(output_dir, account_number, period_start):
+    """Where an account's statement for a period is written"""
+    folder = os.path.join(output_dir, period_start.strftime("%Y-%m"))
+    return os.path.join(folder, f"{account_number}_{period_start.strftime('%Y%m')}.pdf")
+
+
+def build_statements(accounts, rows, period_start, period_end):
+    """
+    Split a batch's transaction rows into per-account statements
+    Args:
+        accounts (list): Account dicts from ACCOUNTS_SQL
+        rows (list): Transaction tuples from TRANSACTIONS_SQL, ordered by account
+        period_start (date): First day of the period
+        period_end (date): First day after the period
+    Returns:
+        list: Statement dicts with opening/closing balances and period entries
+    """
+    cutoff = datetime.combine(period_end, dt_time.min)
+    by_account = {}
+    for row in rows:
+        by_account.setdefault(row[0], []).append(row)
+    
+    statements = []
+    for account in accounts:
+        entries = []
+        later_net = Decimal('0.00')
+        credits = Decimal('0.00')
+        debits = Decimal('0.00')
+        
+        for _, txn_date, number, txn_type, amount, description in by_account.get(account['account_id'], []):
+            delta = signed_amount(txn_type, amount) or 0
+            if txn_date >= cutoff:
+                later_net += delta
+                continue
+            entries.append((txn_date, number, txn_type, description, delta))
+            if delta > 0:
+                credits += delta
+            else:
+                debits -= delta
+        
+        closing = account['balance'] - later_net
+        opening = closing - credits + debits
+        statements.append({
+            'account': account,
+            'period_start': period_start,
+            'period_end': period_end,
+            'opening_balance': opening,
+            'closing_balance': closing,
+            'total_credits': credits,
+            'total_debits': debits,
+            'entries': entries
+        })
+    
+    return statements
+
+
+class StatementTemplate:
+    """
+    Page layout, paragraph styles and table styling for a statement
+    Building these is a noticeable share of rendering a short statement, so each
+    worker process builds one and reuses it for every PDF it renders
+    """
+    
+    COLUMNS = ['Date', 'Reference', 'Description', 'Debit', 'Credit', 'Balance']
+    
+    def __init__(self):
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import mm
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+        
+        self.doc_class = SimpleDocTemplate
+        self.paragraph = Paragraph
+        self.spacer = Spacer
+        self.table = Table
+        self.page_size = A4
+        self.margin = 15 * mm
+        
+        styles = getSampleStyleSheet()
+        self.title_style = styles['Title']
+        self.body_style = styles['Normal']
+        self.small_style = ParagraphStyle('StatementSmall', parent=styles['Normal'], fontSize=8, leading=10)
+        
+        width = A4[0] - 2 * self.margin
+        self.col_widths = [w * width for w in (0.12, 0.17, 0.32, 0.13, 0.13, 0.13)]
+        self.summary_widths = [width / 4] * 4
+        
+        self.entries_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1F3A5F')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('ALIGN', (3, 0), (-1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F2F5F9')]),
+            ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.HexColor('#C8D0DA'))
+        ])
+        self.summary_style = TableStyle([
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('BOX', (0, 0), (-1, -1), 0.5, colors.HexColor('#1F3A5F')),
+            ('INNERGRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#C8D0DA'))
+        ])
+        self.rule_color = colors.HexColor('#1F3A5F')
+    
+    def _draw_page(self, canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Helvetica-Bold', 11)
+        canvas.setFillColor(self.rule_color)
+        canvas.drawString(self.margin, self.page_size[1] - self.margin / 2, APP_CONFIG['title'])
+        canvas.setFont('Helvetica', 8)
+        canvas.drawRightString(self.page_size[0] - self.margin, self.margin / 2,
+                               f"{doc.account_number} - Page {doc.page}")
+        canvas.restoreState()
+    
+    def render(self, statement, path):
+        """
+        Render one statement to a PDF file
+        Args:
+            statement (dict): Statement from build_statements
+            path (str): Output PDF path
+        """
+        account = statement['account']
+        period_start = statement['period_start']
+        last_day = date.fromordinal(statement['period_end'].toordinal() - 1)
+        
+        address = ", ".join(p for p in (account['address'], account['city'],
+                                        account['state'], account['pincode']) if p)
+        story = [
+            self.paragraph("Account Statement", self.title_style),
+            self.paragraph(f"<b>{escape(account['customer_name'])}</b> ({account['customer_number']})", self.body_style),
+            self.paragraph(escape(address), self.small_style),
+            self.spacer(1, 6),
+            self.paragraph(
+                f"Account <b>{account['account_number']}</b> - {account['account_type']} - "
+                f"Branch {escape(account['branch_name'])} ({account['branch_code']})", self.body_style),
+            self.paragraph(f"Period {period_start.strftime('%d %b %Y')} to {last_day.strftime('%d %b %Y')}",
+                           self.body_style),
+            self.spacer(1, 10)
+        ]
+        
+        summary = self.table([
+            ['Opening Balance', 'Total Credits', 'Total Debits', 'Closing Balance'],
+            # The standard PDF fonts have no rupee glyph
+            [f"INR {statement['opening_balance']:,.2f}", f"INR {statement['total_credits']:,.2f}",
+             f"INR {statement['total_debits']:,.2f}", f"INR {statement['closing_balance']:,.2f}"]
+        ], colWidths=self.summary_widths)
+        summary.setStyle(self.summary_style)
+        story += [summary, self.spacer(1, 12)]
+        
+        data = [self.COLUMNS]
+        balance = statement['opening_balance']
+        for txn_date, number, txn_type, description, delta in statement['entries']:
+            balance += delta
+            data.append([
+                txn_date.strftime('%d-%m-%Y'),
+                number,
+                self.paragraph(escape(description or txn_type.replace('_', ' ').title()), self.small_style),
+                f"{-delta:,.2f}" if delta < 0 else '',
+                f"{delta:,.2f}" if delta > 0 else '',
+                f"{balance:,.2f}"
+            ])
+        if len(data) == 1:
+            data.append(['', '', 'No transactions in this period', '', '', ''])
+        
+        entries = self.table(data, colWidths=self.col_widths, repeatRows=1)
+        entries.setStyle(self.entries_style)
+        story.append(entries)
+        
+        doc = self.doc_class(path, pagesize=self.page_size,
+                             leftMargin=self.margin, rightMargin=self.margin,
+                             topMargin=self.margin, bottomMargin=self.margin,
+                             title=f"Statement {account['account_number']} {period_start.strftime('%Y-%m')}")
+        doc.account_number = account['account_number']
+        doc.build(story, onFirstPage=self._draw_page, onLaterPages=self._draw_page)
+
+
+# Built once per process by init_worker, or on first use in the parent
+_template = None
+
+
+def get_template():
+    """The process's cached StatementTemplate"""
+    global _template
+    if _template is None:
+        _template = StatementTemplate()
+    return _template
+
+
+def init_worker():
+    """Process pool initializer: build the template before the first batch arrives"""
+    get_template()
+
+
+def render_account_range(start_id, end_id, period_start, period_end, output_dir):
+    """
+    Render statements for all accounts with start_id <= account_id <= end_id
+    Runs inside a worker process, so it opens its own connection
+    Args:
+        start_id (int): First account ID of the batch
+        end_id (int): Last account ID of the batch
+        period_start (date): First day of the period
+        period_end (date): First day after the period
+        output_dir (str): Root directory for statements
+    Returns:
+        dict: Rendered count, failed account numbers and paths written
+    """
+    connection = mysql.connector.connect(**DB_CONFIG)
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(ACCOUNTS_SQL, (start_id, end_id, period_end, period_start))
+        accounts = cursor.fetchall()
+        cursor.close()
+        
+        if not accounts:
+            return {'rendered': 0, 'failed': [], 'paths': []}
+        
+        cursor = connection.cursor()
+        cursor.execute(TRANSACTIONS_SQL, (start_id, end_id, datetime.combine(period_start, dt_time.min)))
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    
+    template = get_template()
+    result = {'rendered': 0, 'failed': [], 'paths': []}
+    
+    for statement in build_statements(accounts, rows, period_start, period_end):
+        account_number = statement['account']['account_number']
+        path = statement_path(output_dir, account_number, period_start)
+        temp_path = path + '.part'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            template.render(statement, temp_path)
+            os.replace(temp_path, path)
+            result['rendered'] += 1
+            result['paths'].append(path)
+        except Exception as e:
+            logger.error(f"Statement for account {account_number} failed: {e}")
+            result['failed'].append(account_number)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    return result
+
+
+class StatementGenerator:
+    """Splits accounts into ID-range batches and renders their statements on a process pool"""
+    
+    def __init__(self, workers=None, batch_size=200, output_dir=STATEMENTS_DIR):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.output_dir = output_dir
+    
+    def get_batches(self, period_start, period_end):
+        """Split the IDs of accounts open during the period into batches of batch_size accounts"""
+        try:
+            connection = mysql.connector.connect(**DB_CONFIG)
+            cursor = connection.cursor()
+            cursor.execute("""
+                SELECT account_id FROM accounts
+                WHERE opening_date < %s AND (closing_date IS NULL OR closing_date >= %s)
+                ORDER BY account_id
+            """, (period_end, period_start))
+            ids = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+            connection.close()
+        except Error as e:
+            logger.error(f"Error fetching accounts for statements: {e}")
+            raise
+        
+        return [(ids[i], ids[min(i + self.batch_size, len(ids)) - 1])
+                for i in range(0, len(ids), self.batch_size)]
+    
+    def generate_account(self, account_id, year, month):
+        """
+        Render one account's statement in this process
+        Args:
+            account_id (int): Account ID
+            year (int): Statement year
+            month (int): Statement month
+        Returns:
+            dict: Result with success flag, message and path
+        """
+        period_start, period_end = month_bounds(year, month)
+        try:
+            part = render_account_range(account_id, account_id, period_start, period_end, self.output_dir)
+        except Error as e:
+            logger.error(f"Error generating statement for account {account_id}: {e}")
+            return {"success": False, "message": f"Statement failed: {str(e)}", "path": None}
+        
+        if part['failed']:
+            return {"success": False, "path": None,
+                    "message": f"Statement for account {part['failed'][0]} could not be rendered; see the log"}
+        if not part['paths']:
+            return {"success": False, "message": "Account was not open during this period", "path": None}
+        return {"success": True, "message": f"Statement saved to {part['paths'][0]}", "path": part['paths'][0]}
+    
+    def run(self, year, month):
+        """
+        Render month-end statements for every account open during the month
+        Args:
+            year (int): Statement year
+            month (int): Statement month
+        Returns:
+            dict: Summary with rendered and failed counts
+        """
+        started = time.time()
+        period_start, period_end = month_bounds(year, month)
+        batches = self.get_batches(period_start, period_end)
+        summary = {'period': period_start.strftime('%Y-%m'), 'batches': len(batches),
+                   'rendered': 0, 'failed_accounts': [], 'failed_batches': []}
+        
+        logger.info(f"Rendering {summary['period']} statements in {len(batches)} batches "
+                    f"with {self.workers} workers")
+        
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker) as executor:
+            futures = {
+                executor.submit(render_account_range, start, end, period_start, period_end,
+                                self.output_dir): (start, end)
+                for start, end in batches
+            }
+            
+            for future in as_completed(futures):
+                start, end = futures[future]
+                try:
+                    part = future.result()
+                except Exception as e:
+                    logger.error(f"Statement batch for accounts {start}-{end} failed: {e}")
+                    summary['failed_batches'].append((start, end, str(e)))
+                    continue
+                summary['rendered'] += part['rendered']
+                summary['failed_accounts'].extend(part['failed'])
+        
+        summary['elapsed_seconds'] = round(time.time() - started, 2)
+        logger.info(
+            f"Statements finished - Rendered: {summary['rendered']}, "
+            f"Failed: {len(summary['failed_accounts'])}, Elapsed: {summary['elapsed_seconds']}s"
+        )
+        return summary
+
+
+def main():
+    """Command line entry point for the month-end statement run"""
+    parser = argparse.ArgumentParser(description='Render monthly PDF account statements')
+    parser.add_argument('--month', help='Statement month, YYYY-MM (default: previous month)')
+    parser.add_argument('--account', help='Render a single account number in-process')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--batch-size', type=int, default=200, help='Accounts per work unit')
+    parser.add_argument('--output', default=STATEMENTS_DIR, help='Root directory for statements')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    if args.month:
+        period = datetime.strptime(args.month, "%Y-%m")
+        year, month = period.year, period.month
+    else:
+        year, month = previous_month()
+    
+    generator = StatementGenerator(args.workers, args.batch_size, args.output)
+    
+    if args.account:
+        from models.account import Account
+        account = Account().get_account_by_number(args.account)
+        if not account:
+            logger.error(f"Account {args.account} not found")
+            return 1
+        result = generator.generate_account(account['account_id'], year, month)
+        logger.info(result['message'])
+        return 0 if result['success'] else 1
+    
+    summary = generator.run(year, month)
+    return 1 if summary['failed_accounts'] or summary['failed_batches'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,355 @@
+"""
+Loan Portfolio Stress Test for Bank Management System
+Monte Carlo simulation of defaults and prepayments under interest rate shocks
+
+Usage:
+    python -m models.stress_test
+    python -m models.stress_test --scenarios 10000 --rate-shock 2.0 --rate-vol 1.0 --workers 8
+"""
+
+import mysql.connector
+from mysql.connector import Error
+from config import DB_CONFIG
+from models.loan_classification import BUCKET_NAMES
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from statistics import NormalDist
+from datetime import datetime
+import argparse
+import csv
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+LOAN_TYPES = ('PERSONAL', 'HOME', 'CAR', 'EDUCATION', 'BUSINESS')
+
+# One-year probability of default, loss given default and prepayment rate by loan type
+BASE_PD = {'PERSONAL': 0.040, 'HOME': 0.010, 'CAR': 0.025, 'EDUCATION': 0.035, 'BUSINESS': 0.050}
+BASE_LGD = {'PERSONAL': 0.65, 'HOME': 0.25, 'CAR': 0.45, 'EDUCATION': 0.60, 'BUSINESS': 0.55}
+BASE_CPR = {'PERSONAL': 0.08, 'HOME': 0.06, 'CAR': 0.10, 'EDUCATION': 0.04, 'BUSINESS': 0.07}
+
+# PD multiplier for each DPD bucket; NPA loans are already in default
+BUCKET_PD_MULTIPLIER = {'STANDARD': 1.0, 'SMA-0': 2.0, 'SMA-1': 4.0, 'SMA-2': 8.0, 'NPA': None}
+
+DEFAULT_PARAMS = {
+    'rate_shock': 2.0,              # mean rate shock, percentage points
+    'rate_vol': 1.0,                # standard deviation of the rate shock
+    'correlation': 0.15,            # asset correlation of the one-factor default model
+    'pd_rate_sensitivity': 0.25,    # relative PD increase per point of rate shock
+    'cpr_rate_sensitivity': 0.20    # relative prepayment decrease per point of rate shock
+}
+
+# Worker process state, set once by _attach_worker
+_worker = {}
+
+
+def _attach_worker(shm_specs, params, risk_classes, n_segments):
+    """Pool initializer: map the shared loan arrays into this worker without copying"""
+    import numpy as np
+    
+    _worker['blocks'] = []
+    for name, (shm_name, dtype, length) in shm_specs.items():
+        block = shared_memory.SharedMemory(name=shm_name)
+        _worker['blocks'].append(block)
+        _worker[name] = np.ndarray((length,), dtype=dtype, buffer=block.buf)
+    
+    _worker['params'] = params
+    _worker['risk_classes'] = risk_classes
+    _worker['n_segments'] = n_segments
+
+
+def conditional_pd(base_pd, z, shock, params):
+    """
+    Probability of default given the systematic factor and rate shock
+    Args:
+        base_pd (float): Unconditional one-year PD
+        z (float): Systematic factor draw; negative is a downturn
+        shock (float): Rate shock in percentage points
+        params (dict): Simulation parameters
+    Returns:
+        float: Stressed conditional PD
+    """
+    if base_pd >= 1.0:
+        return 1.0
+    stressed = min(base_pd * max(1.0 + params['pd_rate_sensitivity'] * shock, 0.0), 0.999)
+    if stressed <= 0.0:
+        return 0.0
+    rho = params['correlation']
+    normal = NormalDist()
+    return normal.cdf((normal.inv_cdf(stressed) - rho ** 0.5 * z) / (1.0 - rho) ** 0.5)
+
+
+def simulate_scenarios(first_scenario, count, seed):
+    """
+    Simulate a block of scenarios against the shared loan arrays
+    Each loan takes a single uniform draw: below its PD it defaults, above
+    1 - prepayment rate it prepays and leaves the book before it can default
+    Args:
+        first_scenario (int): Index of the first scenario in the block
+        count (int): Number of scenarios
+        seed (int): Base seed; each scenario gets its own stream
+    Returns:
+        tuple: (first_scenario, losses[count, n_segments], prepaid[count])
+    """
+    import numpy as np
+    
+    params = _worker['params']
+    risk_classes = _worker['risk_classes']
+    exposure_loss = _worker['exposure_loss']
+    exposure = _worker['exposure']
+    risk_class = _worker['risk_class']
+    segment = _worker['segment']
+    n_segments = _worker['n_segments']
+    
+    losses = np.zeros((count, n_segments))
+    prepaid = np.zeros(count)
+    
+    for i in range(count):
+        rng = np.random.default_rng([seed, first_scenario + i])
+        shock = rng.normal(params['rate_shock'], params['rate_vol'])
+        z = rng.standard_normal()
+        
+        prepay_factor = max(1.0 - params['cpr_rate_sensitivity'] * shock, 0.0)
+        class_pd = np.array([conditional_pd(pd, z, shock, params) for pd, _ in risk_classes], dtype=np.float32)
+        class_cpr = np.array([cpr * prepay_factor for _, cpr in risk_classes], dtype=np.float32)
+        
+        draw = rng.random(len(exposure), dtype=np.float32)
+        defaulted = draw < class_pd[risk_class]
+        prepays = draw > 1.0 - class_cpr[risk_class]
+        
+        # Defaults are a small fraction of the book, so gather them before summing
+        hit = np.flatnonzero(defaulted)
+        losses[i] = np.bincount(segment[hit], weights=exposure_loss[hit], minlength=n_segments)
+        prepaid[i] = exposure[np.flatnonzero(prepays)].sum()
+    
+    return first_scenario, losses, prepaid
+
+
+class PortfolioStressTest:
+    """Loads the loan book into NumPy arrays and runs scenarios across a process pool"""
+    
+    def __init__(self, scenarios=10000, workers=None, params=None, seed=42, block_size=50):
+        self.connection = None
+        self.scenarios = scenarios
+        self.workers = workers or os.cpu_count() or 1
+        self.params = dict(DEFAULT_PARAMS, **(params or {}))
+        self.seed = seed
+        self.block_size = block_size
+    
+    def get_connection(self):
+        """Get database connection"""
+        try:
+            if self.connection is None or not self.connection.is_connected():
+                self.connection = mysql.connector.connect(**DB_CONFIG)
+            return self.connection
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+    
+    def close_connection(self):
+        """Close database connection"""
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+    
+    def load_portfolio(self, fetch_size=50000):
+        """
+        Load active loans as columns, with the DPD bucket from the latest classification
+        Returns:
+            dict: NumPy arrays and the branch IDs behind the segment codes
+        """
+        import numpy as np
+        
+        connection = self.get_connection()
+        cursor = connection.cursor(buffered=False)
+        cursor.execute("""
+            SELECT l.loan_type, l.branch_id, l.outstanding_amount, COALESCE(s.dpd_bucket, 'STANDARD')
+            FROM loans l
+            LEFT JOIN loan_dpd_snapshots s
+              ON s.loan_id = l.loan_id
+             AND s.snapshot_date = (SELECT MAX(snapshot_date) FROM loan_dpd_snapshots)
+            WHERE l.status IN ('DISBURSED', 'DEFAULTED') AND l.outstanding_amount > 0
+        """)
+        
+        loan_types, branches, outstanding, buckets = [], [], [], []
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for loan_type, branch_id, amount, bucket in rows:
+                loan_types.append(LOAN_TYPES.index(loan_type))
+                branches.append(branch_id or 0)
+                outstanding.append(amount)
+                buckets.append(BUCKET_NAMES.index(bucket))
+        cursor.close()
+        
+        loan_types = np.array(loan_types, dtype=np.int32)
+        branch_ids, branch_codes = np.unique(np.array(branches, dtype=np.int64), return_inverse=True)
+        buckets = np.array(buckets, dtype=np.int32)
+        exposure = np.array(outstanding, dtype=np.float64)
+        lgd = np.array([BASE_LGD[t] for t in LOAN_TYPES])[loan_types]
+        
+        return {
+            'exposure': exposure,
+            'exposure_loss': exposure * lgd,
+            'risk_class': (loan_types * len(BUCKET_NAMES) + buckets).astype(np.int32),
+            'segment': (loan_types * len(branch_ids) + branch_codes).astype(np.int32),
+            'branch_ids': branch_ids.tolist()
+        }
+    
+    @staticmethod
+    def risk_class_table():
+        """(PD, prepayment rate) for every loan type and DPD bucket, indexed like risk_class"""
+        table = []
+        for loan_type in LOAN_TYPES:
+            for bucket in BUCKET_NAMES:
+                multiplier = BUCKET_PD_MULTIPLIER[bucket]
+                pd = 1.0 if multiplier is None else min(BASE_PD[loan_type] * multiplier, 0.999)
+                table.append((pd, 0.0 if multiplier is None else BASE_CPR[loan_type]))
+        return table
+    
+    def run(self, portfolio=None):
+        """
+        Run all scenarios
+        Args:
+            portfolio (dict): Arrays from load_portfolio() (loaded if not given)
+        Returns:
+            dict: Loss distributions by portfolio, loan type and branch
+        """
+        import numpy as np
+        
+        started = time.time()
+        portfolio = portfolio or self.load_portfolio()
+        n_branches = len(portfolio['branch_ids'])
+        n_segments = len(LOAN_TYPES) * max(n_branches, 1)
+        losses = np.zeros((self.scenarios, n_segments))
+        prepaid = np.zeros(self.scenarios)
+        
+        # Loan arrays go into shared memory once; workers map them instead of
+        # receiving a pickled copy with every task
+        blocks = []
+        shm_specs = {}
+        try:
+            for name in ('exposure', 'exposure_loss', 'risk_class', 'segment'):
+                array = portfolio[name]
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+                blocks.append(block)
+                shm_specs[name] = (block.name, array.dtype.str, len(array))
+            
+            logger.info(f"Stress testing {len(portfolio['exposure'])} loans over {self.scenarios} "
+                        f"scenarios with {self.workers} workers")
+            
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_attach_worker,
+                initargs=(shm_specs, self.params, self.risk_class_table(), n_segments)
+            ) as executor:
+                futures = [
+                    executor.submit(simulate_scenarios, start, min(self.block_size, self.scenarios - start), self.seed)
+                    for start in range(0, self.scenarios, self.block_size)
+                ]
+                for future in as_completed(futures):
+                    start, block_losses, block_prepaid = future.result()
+                    losses[start:start + len(block_losses)] = block_losses
+                    prepaid[start:start + len(block_prepaid)] = block_prepaid
+        
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+        
+        by_segment = losses.reshape(self.scenarios, len(LOAN_TYPES), max(n_branches, 1))
+        result = {
+            'started_at': datetime.now(),
+            'loans': len(portfolio['exposure']),
+            'exposure': float(portfolio['exposure'].sum()),
+            'scenarios': self.scenarios,
+            'params': self.params,
+            'portfolio': self.distribution(losses.sum(axis=1)),
+            'by_loan_type': {t: self.distribution(by_segment[:, i, :].sum(axis=1)) for i, t in enumerate(LOAN_TYPES)},
+            'by_branch': {b: self.distribution(by_segment[:, :, i].sum(axis=1))
+                          for i, b in enumerate(portfolio['branch_ids'])},
+            'mean_prepaid': float(prepaid.mean()) if self.scenarios else 0.0,
+            'elapsed_seconds': round(time.time() - started, 2)
+        }
+        
+        logger.info(f"Stress test finished in {result['elapsed_seconds']}s - "
+                    f"Mean loss: {result['portfolio']['mean']:,.2f}, 99% VaR: {result['portfolio']['var_99']:,.2f}")
+        return result
+    
+    @staticmethod
+    def distribution(losses):
+        """Summarize a loss vector: mean, percentiles and 99% expected shortfall"""
+        import numpy as np
+        
+        if len(losses) == 0:
+            return {'mean': 0.0, 'median': 0.0, 'var_95': 0.0, 'var_99': 0.0, 'es_99': 0.0, 'max': 0.0}
+        
+        var_95, var_99 = np.percentile(losses, [95, 99])
+        tail = losses[losses >= var_99]
+        return {
+            'mean': float(losses.mean()),
+            'median': float(np.median(losses)),
+            'var_95': float(var_95),
+            'var_99': float(var_99),
+            'es_99': float(tail.mean()) if len(tail) else float(var_99),
+            'max': float(losses.max())
+        }
+    
+    def write_report(self, result, reports_dir="reports"):
+        """
+        Write loss distributions as CSV
+        Returns:
+            str: Path of the written report
+        """
+        os.makedirs(reports_dir, exist_ok=True)
+        timestamp = result['started_at'].strftime("%Y%m%d_%H%M%S")
+        filepath = os.path.join(reports_dir, f"stress_test_{timestamp}.csv")
+        
+        with open(filepath, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['# loans', result['loans'], 'exposure', round(result['exposure'], 2),
+                             'scenarios', result['scenarios'], 'mean_prepaid', round(result['mean_prepaid'], 2)])
+            writer.writerow(['# params'] + [f"{k}={v}" for k, v in result['params'].items()])
+            writer.writerow(['dimension', 'key', 'mean', 'median', 'var_95', 'var_99', 'es_99', 'max'])
+            
+            rows = [('portfolio', 'ALL', result['portfolio'])]
+            rows += [('loan_type', k, v) for k, v in result['by_loan_type'].items()]
+            rows += [('branch', k, v) for k, v in result['by_branch'].items()]
+            for dimension, key, stats in rows:
+                writer.writerow([dimension, key] + [round(stats[c], 2) for c in
+                                                    ('mean', 'median', 'var_95', 'var_99', 'es_99', 'max')])
+        
+        logger.info(f"Stress test report written to: {filepath}")
+        return filepath
+    
+    def __del__(self):
+        """Destructor to ensure connection is closed"""
+        self.close_connection()
+
+
+def main():
+    """Command line entry point for a portfolio stress test"""
+    parser = argparse.ArgumentParser(description='Monte Carlo stress test of the loan portfolio')
+    parser.add_argument('--scenarios', type=int, default=10000, help='Number of scenarios')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--rate-shock', type=float, default=DEFAULT_PARAMS['rate_shock'], help='Mean rate shock, points')
+    parser.add_argument('--rate-vol', type=float, default=DEFAULT_PARAMS['rate_vol'], help='Rate shock std dev, points')
+    parser.add_argument('--correlation', type=float, default=DEFAULT_PARAMS['correlation'], help='Asset correlation')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--output', default='reports', help='Directory for the report')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    params = {'rate_shock': args.rate_shock, 'rate_vol': args.rate_vol, 'correlation': args.correlation}
+    stress_test = PortfolioStressTest(args.scenarios, args.workers, params, args.seed)
+    result = stress_test.run()
+    stress_test.write_report(result, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,13 +6,56 @@ Handles all transaction-related database operations
 import mysql.connector
 from mysql.connector import Error
 from config import DB_CONFIG
-from datetime import datetime
+from models.database import get_pooled_connection
+from models import idempotency
+from models.idempotency import recent_keys
+from models.daily_limits import daily_limits
+from models.fraud_screen import fraud_screen
+from models.loan_payment import generate_reference, claim_references
+from models.transaction_rollup import TransactionRollup
+from utils.constants import MAX_TRANSACTION_AMOUNT
+from datetime import datetime, date, timedelta
+from decimal import Decimal, InvalidOperation
 import logging
-import random
-import string
 
 logger = logging.getLogger(__name__)
 
+CENT = Decimal('0.01')
+MAX_AMOUNT = Decimal(str(MAX_TRANSACTION_AMOUNT))
+
+
+def check_amount(amount):
+    """
+    Read a posting amount
+    Returns:
+        tuple: (amount as Decimal, error message or None if it can be posted)
+    """
+    try:
+        amount = Decimal(str(amount)).quantize(CENT)
+    except InvalidOperation:
+        return None, "Invalid amount"
+    if not amount.is_finite():
+        return None, "Invalid amount"
+    if amount <= 0:
+        return amount, "Amount must be positive"
+    if amount > MAX_AMOUNT:
+        return amount, f"Amount must be at most {MAX_AMOUNT:,.2f}"
+    return amount, None
+
+
+def check_operation(op):
+    """
+    Read the type and amount of a batch operation
+    Returns:
+        tuple: (type, amount as Decimal, error message or None if the operation can be tried)
+    """
+    op_type = str(op.get('type', '')).upper()
+    if op_type not in ('DEPOSIT', 'WITHDRAWAL', 'TRANSFER'):
+        return op_type, None, f"Unknown operation type: {op.get('type')}"
+    amount, message = check_amount(op.get('amount'))
+    return op_type, amount, message
+
+
 class Transaction:
     """Transaction model for handling transaction-related operations"""
     
@@ -35,43 +78,11 @@ class Transaction:
             self.connection.close()
     
     def generate_transaction_reference(self):
-        """Generate unique transaction reference (max 20 chars)"""
-        import time
-        # Use milliseconds timestamp (10 digits) + 4 random chars = 14 chars max
-        timestamp = int(time.time() * 1000) % 10000000000  # Keep last 10 digits
-        random_suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-        reference = f"T{timestamp}{random_suffix}"
-        
-        # Ensure uniqueness by checking database
-        try:
-            connection = self.get_connection()
-            cursor = connection.cursor()
-            
-            # Keep generating until we get a unique reference
-            attempts = 0
-            while attempts < 5:  # Reduced attempts since collision is very unlikely
-                cursor.execute("SELECT COUNT(*) FROM transactions WHERE transaction_number = %s", (reference,))
-                count = cursor.fetchone()[0]
-                
-                if count == 0:
-                    cursor.close()
-                    return reference
-                
-                # Generate a new reference if collision detected
-                attempts += 1
-                time.sleep(0.001)  # Small delay to ensure different timestamp
-                timestamp = int(time.time() * 1000) % 10000000000
-                random_suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-                reference = f"T{timestamp}{random_suffix}"
-            
-            cursor.close()
-            # Fallback to simple timestamp + random if still colliding
-            return f"T{int(time.time()) % 1000000}{random.randint(1000, 9999)}"
-            
-        except Exception as e:
-            logger.error(f"Error generating unique reference: {e}")
-            # Fallback to timestamp + random number (fits in 20 chars)
-            return f"T{int(time.time()) % 1000000}{random.randint(1000, 9999)}"
+        """
+        Generate a transaction reference (max 20 chars)
+        Uniqueness is enforced when the posting claims it in transaction_references
+        """
+        return generate_reference('T')
     
     def get_accounts_for_dropdown(self):
         """Get all active accounts for dropdown selection"""
@@ -119,8 +130,107 @@ class Transaction:
             logger.error(f"Error getting account balance: {e}")
             return 0.0
     
-    def deposit(self, account_id, amount, description="Deposit", reference=None):
-        """Process a deposit transaction"""
+    def _check_key(self, idempotency_key, request):
+        """
+        Answer a retry from the recent keys cache, without touching the database
+        Returns:
+            dict: Result to return now, or None to go ahead and post
+        """
+        if idempotency_key is None:
+            return None
+        message = idempotency.invalid_key(idempotency_key)
+        if message:
+            return {"success": False, "message": message}
+        
+        entry = recent_keys.get(idempotency_key)
+        if entry is not None:
+            logger.info(f"Duplicate request for idempotency key {idempotency_key} answered from cache")
+            return idempotency.replay(request, *entry)
+        return None
+    
+    def _replay_key(self, idempotency_key, request):
+        """Result for a key another attempt has already committed"""
+        cursor = self.get_connection().cursor()
+        stored = idempotency.load(cursor, [idempotency_key])
+        cursor.close()
+        
+        if idempotency_key not in stored:
+            # The other attempt rolled back between our claim and this read
+            return {"success": False, "message": "Transaction is being retried concurrently, please try again"}
+        
+        logger.info(f"Duplicate request for idempotency key {idempotency_key}")
+        recent_keys.put(idempotency_key, *stored[idempotency_key])
+        return idempotency.replay(request, *stored[idempotency_key])
+    
+    def _commit_with_key(self, connection, cursor, idempotency_key, request, result):
+        """Store the result with its idempotency key in the posting transaction, then commit"""
+        if idempotency_key:
+            idempotency.complete(cursor, idempotency_key, result)
+        connection.commit()
+        cursor.close()
+        if idempotency_key:
+            recent_keys.put(idempotency_key, request, result)
+    
+    def _admitted(self, posting_type, account_id, amount, post):
+        """
+        Post a single transaction that must pass the fraud screen and, for withdrawals
+        and transfers, the account's daily limit
+        post is called with an admit(cursor) function, which it calls once its
+        idempotency key is claimed, so a replayed retry is never refused or counted.
+        The screen count and the limit amount are given back if the posting then fails
+        Args:
+            posting_type (str): DEPOSIT, WITHDRAWAL or TRANSFER
+            account_id (int): Account the money is posted to or leaves
+            post (callable): Posts the transaction and returns its result dict
+        """
+        admitted = {}
+        
+        def admit(cursor):
+            """Screen the posting and count it against the limit; returns an error message if refused"""
+            verdict = fraud_screen.screen(account_id, posting_type, amount)
+            if verdict['action'] == 'REJECT':
+                return verdict['message']
+            admitted['verdict'] = verdict
+            if posting_type == 'DEPOSIT':
+                return None
+            message = daily_limits.reserve(account_id, posting_type, amount, cursor)
+            if message:
+                logger.warning(f"{posting_type.title()} refused - Account: {account_id}, Amount: {amount}: {message}")
+            else:
+                admitted['reserved'] = True
+            return message
+        
+        result = None
+        try:
+            result = post(admit)
+            return result
+        finally:
+            if result is None or not result['success']:
+                fraud_screen.forget(admitted.get('verdict'))
+                if admitted.get('reserved'):
+                    daily_limits.release(account_id, posting_type, amount)
+    
+    def deposit(self, account_id, amount, description="Deposit", reference=None, idempotency_key=None):
+        """
+        Process a deposit transaction
+        Retrying with the same idempotency_key returns the first attempt's result
+        instead of depositing again
+        """
+        amount, message = check_amount(amount)
+        if message:
+            return {"success": False, "message": message}
+        
+        request = idempotency.fingerprint('DEPOSIT', account_id, amount) if idempotency_key else None
+        early = self._check_key(idempotency_key, request)
+        if early:
+            return early
+        
+        return self._admitted('DEPOSIT', account_id, amount, lambda admit: self._post_deposit(
+            account_id, amount, description, reference, idempotency_key, request, admit
+        ))
+    
+    def _post_deposit(self, account_id, amount, description, reference, idempotency_key, request, admit):
+        """Post a deposit, admitting it once its idempotency key is claimed"""
         try:
             if reference is None:
                 reference = self.generate_transaction_reference()
@@ -131,14 +241,26 @@ class Transaction:
             # Start transaction
             connection.start_transaction()
             
+            if idempotency_key and not idempotency.claim(cursor, idempotency_key, request, reference):
+                connection.rollback()
+                return self._replay_key(idempotency_key, request)
+            
+            message = admit(cursor)
+            if message:
+                connection.rollback()
+                return {"success": False, "message": message}
+            
             # Get current balance
-            cursor.execute("SELECT balance FROM accounts WHERE account_id = %s FOR UPDATE", (account_id,))
+            cursor.execute("SELECT balance, status FROM accounts WHERE account_id = %s FOR UPDATE", (account_id,))
             result = cursor.fetchone()
             if not result:
                 connection.rollback()
                 return {"success": False, "message": "Account not found"}
+            if result[1] != 'ACTIVE':
+                connection.rollback()
+                return {"success": False, "message": f"Account {account_id} is {result[1]}"}
             
-            current_balance = float(result[0])
+            current_balance = result[0]
             new_balance = current_balance + amount
             
             # Update account balance
@@ -148,6 +270,7 @@ class Transaction:
             )
             
             # Insert transaction record
+            claim_references(cursor, [reference])
             cursor.execute("""
                 INSERT INTO transactions (
                     transaction_number, account_id, transaction_type, amount, 
@@ -158,24 +281,43 @@ class Transaction:
                 current_balance, new_balance, description, datetime.now(), 'COMPLETED'
             ))
             
-            connection.commit()
-            cursor.close()
-            
-            logger.info(f"Deposit successful - Account: {account_id}, Amount: {amount}, New Balance: {new_balance}")
-            return {
+            result = {
                 "success": True, 
                 "message": "Deposit successful",
-                "new_balance": new_balance,
+                "new_balance": float(new_balance),
                 "reference": reference
             }
+            self._commit_with_key(connection, cursor, idempotency_key, request, result)
+            
+            logger.info(f"Deposit successful - Account: {account_id}, Amount: {amount}, New Balance: {new_balance}")
+            return result
             
         except Error as e:
             connection.rollback()
             logger.error(f"Deposit error: {e}")
             return {"success": False, "message": f"Deposit failed: {str(e)}"}
     
-    def withdraw(self, account_id, amount, description="Withdrawal", reference=None):
-        """Process a withdrawal transaction"""
+    def withdraw(self, account_id, amount, description="Withdrawal", reference=None, idempotency_key=None):
+        """
+        Process a withdrawal transaction
+        Retrying with the same idempotency_key returns the first attempt's result
+        instead of withdrawing again
+        """
+        amount, message = check_amount(amount)
+        if message:
+            return {"success": False, "message": message}
+        
+        request = idempotency.fingerprint('WITHDRAWAL', account_id, amount) if idempotency_key else None
+        early = self._check_key(idempotency_key, request)
+        if early:
+            return early
+        
+        return self._admitted('WITHDRAWAL', account_id, amount, lambda admit: self._post_withdrawal(
+            account_id, amount, description, reference, idempotency_key, request, admit
+        ))
+    
+    def _post_withdrawal(self, account_id, amount, description, reference, idempotency_key, request, admit):
+        """Post a withdrawal, admitting it once its idempotency key is claimed"""
         try:
             if reference is None:
                 reference = self.generate_transaction_reference()
@@ -186,14 +328,26 @@ class Transaction:
             # Start transaction
             connection.start_transaction()
             
+            if idempotency_key and not idempotency.claim(cursor, idempotency_key, request, reference):
+                connection.rollback()
+                return self._replay_key(idempotency_key, request)
+            
+            message = admit(cursor)
+            if message:
+                connection.rollback()
+                return {"success": False, "message": message}
+            
             # Get current balance
-            cursor.execute("SELECT balance FROM accounts WHERE account_id = %s FOR UPDATE", (account_id,))
+            cursor.execute("SELECT balance, status FROM accounts WHERE account_id = %s FOR UPDATE", (account_id,))
             result = cursor.fetchone()
             if not result:
                 connection.rollback()
                 return {"success": False, "message": "Account not found"}
+            if result[1] != 'ACTIVE':
+                connection.rollback()
+                return {"success": False, "message": f"Account {account_id} is {result[1]}"}
             
-            current_balance = float(result[0])
+            current_balance = result[0]
             
             # Check sufficient balance
             if current_balance < amount:
@@ -209,6 +363,7 @@ class Transaction:
             )
             
             # Insert transaction record
+            claim_references(cursor, [reference])
             cursor.execute("""
                 INSERT INTO transactions (
                     transaction_number, account_id, transaction_type, amount, 
@@ -219,24 +374,49 @@ class Transaction:
                 current_balance, new_balance, description, datetime.now(), 'COMPLETED'
             ))
             
-            connection.commit()
-            cursor.close()
-            
-            logger.info(f"Withdrawal successful - Account: {account_id}, Amount: {amount}, New Balance: {new_balance}")
-            return {
+            result = {
                 "success": True, 
                 "message": "Withdrawal successful",
-                "new_balance": new_balance,
+                "new_balance": float(new_balance),
                 "reference": reference
             }
+            self._commit_with_key(connection, cursor, idempotency_key, request, result)
+            
+            logger.info(f"Withdrawal successful - Account: {account_id}, Amount: {amount}, New Balance: {new_balance}")
+            return result
             
         except Error as e:
             connection.rollback()
             logger.error(f"Withdrawal error: {e}")
             return {"success": False, "message": f"Withdrawal failed: {str(e)}"}
     
-    def transfer(self, from_account_id, to_account_id, amount, description="Transfer", reference=None):
-        """Process a transfer between accounts"""
+    def transfer(self, from_account_id, to_account_id, amount, description="Transfer", reference=None,
+                 idempotency_key=None):
+        """
+        Process a transfer between accounts
+        Retrying with the same idempotency_key returns the first attempt's result
+        instead of transferring again
+        """
+        amount, message = check_amount(amount)
+        if message:
+            return {"success": False, "message": message}
+        if from_account_id == to_account_id:
+            return {"success": False, "message": "Cannot transfer to the same account"}
+        
+        request = None
+        if idempotency_key:
+            request = idempotency.fingerprint('TRANSFER', from_account_id, amount, to_account_id)
+        early = self._check_key(idempotency_key, request)
+        if early:
+            return early
+        
+        return self._admitted('TRANSFER', from_account_id, amount, lambda admit: self._post_transfer(
+            from_account_id, to_account_id, amount, description, reference, idempotency_key, request, admit
+        ))
+    
+    def _post_transfer(self, from_account_id, to_account_id, amount, description, reference,
+                       idempotency_key, request, admit):
+        """Post a transfer, admitting it once its idempotency key is claimed"""
         try:
             if reference is None:
                 reference = self.generate_transaction_reference()
@@ -247,24 +427,33 @@ class Transaction:
             # Start transaction
             connection.start_transaction()
             
+            if idempotency_key and not idempotency.claim(cursor, idempotency_key, request, reference):
+                connection.rollback()
+                return self._replay_key(idempotency_key, request)
+            
+            message = admit(cursor)
+            if message:
+                connection.rollback()
+                return {"success": False, "message": message}
+            
             # Get both account balances with locks
             cursor.execute("""
-                SELECT balance FROM accounts 
+                SELECT account_id, balance, status FROM accounts 
                 WHERE account_id IN (%s, %s) 
                 ORDER BY account_id FOR UPDATE
             """, (from_account_id, to_account_id))
             
-            results = cursor.fetchall()
-            if len(results) != 2:
+            accounts = {account_id: (balance, status) for account_id, balance, status in cursor.fetchall()}
+            if len(accounts) != 2:
                 connection.rollback()
                 return {"success": False, "message": "One or both accounts not found"}
+            inactive = [a for a in (from_account_id, to_account_id) if accounts[a][1] != 'ACTIVE']
+            if inactive:
+                connection.rollback()
+                return {"success": False, "message": f"Account {inactive[0]} is {accounts[inactive[0]][1]}"}
             
-            # Get current balances
-            cursor.execute("SELECT balance FROM accounts WHERE account_id = %s", (from_account_id,))
-            from_balance = float(cursor.fetchone()[0])
-            
-            cursor.execute("SELECT balance FROM accounts WHERE account_id = %s", (to_account_id,))
-            to_balance = float(cursor.fetchone()[0])
+            from_balance = accounts[from_account_id][0]
+            to_balance = accounts[to_account_id][0]
             
             # Check sufficient balance in from_account
             if from_balance < amount:
@@ -292,6 +481,8 @@ class Transaction:
             debit_reference = f"{reference}O"  # O for Out (shorter suffix)
             credit_reference = f"{reference}I"  # I for In (shorter suffix)
             
+            claim_references(cursor, [debit_reference, credit_reference])
+            
             # Debit transaction for from_account
             cursor.execute("""
                 INSERT INTO transactions (
@@ -314,23 +505,250 @@ class Transaction:
                 to_balance, new_to_balance, f"{description} - From Account", transaction_time, 'COMPLETED'
             ))
             
-            connection.commit()
-            cursor.close()
-            
-            logger.info(f"Transfer successful - From: {from_account_id} To: {to_account_id}, Amount: {amount}")
-            return {
+            result = {
                 "success": True, 
                 "message": "Transfer successful",
-                "from_balance": new_from_balance,
-                "to_balance": new_to_balance,
+                "from_balance": float(new_from_balance),
+                "to_balance": float(new_to_balance),
                 "reference": reference
             }
+            self._commit_with_key(connection, cursor, idempotency_key, request, result)
+            
+            logger.info(f"Transfer successful - From: {from_account_id} To: {to_account_id}, Amount: {amount}")
+            return result
             
         except Error as e:
             connection.rollback()
             logger.error(f"Transfer error: {e}")
             return {"success": False, "message": f"Transfer failed: {str(e)}"}
     
+    def _batch_rejection(self, op_type, legs, amount, accounts):
+        """
+        Check one batch operation against the locked accounts
+        Returns:
+            str: Why the operation is rejected, or None if it can post
+        """
+        missing = [a for a in legs if a not in accounts]
+        if missing:
+            return "Account not found"
+        inactive = [a for a in legs if accounts[a][1] != 'ACTIVE']
+        if inactive:
+            return f"Account {inactive[0]} is {accounts[inactive[0]][1]}"
+        if op_type == 'TRANSFER' and legs[0] == legs[1]:
+            return "Cannot transfer to the same account"
+        if op_type != 'DEPOSIT' and accounts[legs[0]][0] < amount:
+            return "Insufficient balance"
+        return None
+    
+    def _apply_batch(self, cursor, operations, now, reserved, screened, screen=True):
+        """
+        Validate and post one batch of operations on an open transaction
+        Every account the batch touches is locked up front in account_id order, so
+        concurrent batches cannot deadlock; balances are then tracked in memory
+        Args:
+            reserved (list): Receives (account_id, kind, amount) for each amount counted
+                against daily limits, as it is counted, so the caller can give them back
+                if the batch fails part way
+            screened (list): Receives the fraud screen verdict of each operation the
+                screen counted, for fraud_screen.forget() if the batch fails
+        Returns:
+            tuple: (one result dict per operation in input order,
+                    idempotency key -> (request, result) for the keys this batch used)
+        """
+        account_ids = set()
+        for op in operations:
+            account_ids.update(a for a in (op.get('account_id'), op.get('to_account_id')) if a)
+        
+        accounts = {}
+        if account_ids:
+            placeholders = ", ".join(["%s"] * len(account_ids))
+            cursor.execute(f"""
+                SELECT account_id, balance, status FROM accounts
+                WHERE account_id IN ({placeholders})
+                ORDER BY account_id FOR UPDATE
+            """, sorted(account_ids))
+            accounts = {account_id: [balance, status] for account_id, balance, status in cursor.fetchall()}
+        
+        claimed = {}
+        
+        rows = []
+        results = []
+        for op in operations:
+            op_type, amount, message = check_operation(op)
+            legs = [op.get('account_id')] + ([op.get('to_account_id')] if op_type == 'TRANSFER' else [])
+            result = {"success": False, "key": op.get('key')}
+            results.append(result)
+            if message:
+                result['message'] = message
+                continue
+            
+            idempotency_key = op.get('idempotency_key')
+            if idempotency_key:
+                message = idempotency.invalid_key(idempotency_key)
+                if message:
+                    result['message'] = message
+                    continue
+                request = idempotency.fingerprint(op_type, legs[0], amount, legs[1] if len(legs) > 1 else None)
+                previous = claimed.get(idempotency_key) or recent_keys.get(idempotency_key)
+                if previous:
+                    result.update(idempotency.replay(request, *previous))
+                    continue
+            
+            reference = op.get('reference') or generate_reference('T')
+            if idempotency_key:
+                # The key's primary key insert decides, as in a single posting: a batch
+                # holding the same key makes this wait, then fail as a duplicate once it
+                # commits. The savepoint undoes the claim if this operation is rejected
+                cursor.execute("SAVEPOINT idempotency_claim")
+                if not idempotency.claim(cursor, idempotency_key, request, reference):
+                    # The key row exists, so this locking read takes no gap lock
+                    stored = idempotency.load(cursor, [idempotency_key], lock=True).get(idempotency_key)
+                    if stored:
+                        result.update(idempotency.replay(request, *stored))
+                    else:
+                        result['message'] = "Transaction is being retried concurrently, please try again"
+                    continue
+            
+            message = self._batch_rejection(op_type, legs, amount, accounts)
+            verdict = None
+            if message is None and screen:
+                verdict = fraud_screen.screen(legs[0], op_type, amount)
+                if verdict['action'] == 'REJECT':
+                    message = verdict['message']
+                    result['screen_rules'] = verdict['rules']
+                    verdict = None
+            if message is None and op_type != 'DEPOSIT':
+                message = daily_limits.reserve(legs[0], op_type, amount, cursor)
+                if message is None:
+                    reserved.append((legs[0], op_type, amount))
+                elif verdict is not None:
+                    fraud_screen.forget(verdict)
+                    verdict = None
+            if verdict is not None:
+                screened.append(verdict)
+            if message:
+                result['message'] = message
+                if idempotency_key:
+                    cursor.execute("ROLLBACK TO SAVEPOINT idempotency_claim")
+                continue
+            
+            description = op.get('description') or op_type.title()
+            
+            if op_type == 'DEPOSIT':
+                entries = [(legs[0], 'DEPOSIT', amount, reference, description)]
+            elif op_type == 'WITHDRAWAL':
+                entries = [(legs[0], 'WITHDRAWAL', -amount, reference, description)]
+            else:
+                entries = [(legs[0], 'TRANSFER_OUT', -amount, f"{reference}O", f"{description} - To Account"),
+                           (legs[1], 'TRANSFER_IN', amount, f"{reference}I", f"{description} - From Account")]
+            
+            for account_id, txn_type, delta, number, text in entries:
+                before = accounts[account_id][0]
+                accounts[account_id][0] = before + delta
+                rows.append((number, account_id, txn_type, abs(delta), before, before + delta,
+                             text[:255], now, 'COMPLETED'))
+            
+            result.update(success=True, message="Posted", reference=reference,
+                          new_balance=accounts[legs[0]][0])
+            if idempotency_key:
+                claimed[idempotency_key] = (request, dict(result))
+        
+        if rows:
+            # A reused reference fails the whole batch, as any database error does
+            claim_references(cursor, [row[0] for row in rows])
+            # Rows go in input order, so the prevent_negative_balance trigger sees each
+            # account's balance as of the row before it
+            cursor.executemany("""
+                INSERT INTO transactions (
+                    transaction_number, account_id, transaction_type, amount,
+                    balance_before, balance_after, description, transaction_date, status
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, rows)
+            touched = {row[1] for row in rows}
+            cursor.executemany(
+                "UPDATE accounts SET balance = %s WHERE account_id = %s",
+                [(accounts[account_id][0], account_id) for account_id in sorted(touched)]
+            )
+        if claimed:
+            idempotency.complete_many(cursor, claimed)
+        
+        return results, claimed
+    
+    def _abandon_batch(self, connection, reserved, screened):
+        """Roll back an uncommitted batch and release its daily limits and fraud screen verdicts"""
+        try:
+            connection.rollback()
+        except Error as e:
+            logger.error(f"Transaction batch rollback failed: {e}")
+        for account_id, kind, amount in reserved:
+            daily_limits.release(account_id, kind, amount)
+        for verdict in screened:
+            fraud_screen.forget(verdict)
+    
+    def post_batch(self, operations, batch_size=500, screen=True):
+        """
+        Post many deposits, withdrawals and transfers, committing once per batch
+        Operations are applied in input order on a pooled connection. A rejected
+        operation is skipped without undoing the rest of its batch; a database
+        error rolls back and fails the whole batch, with batch_failed set on each
+        result so the caller can retry the operations in smaller batches
+        Args:
+            operations (iterable): Dicts with type (DEPOSIT, WITHDRAWAL or TRANSFER),
+                account_id, amount and optional to_account_id, description, reference,
+                idempotency_key (a repeat returns the first result, marked duplicate)
+                and key (copied onto the result)
+            batch_size (int): Operations per commit
+            screen (bool): Run each operation through the fraud screen; rejected
+                operations fail with the rules that fired as screen_rules
+        Returns:
+            dict: Posted and failed counts with per-operation results
+        """
+        summary = {"posted": 0, "failed": 0, "results": []}
+        operations = list(operations)
+        
+        connection = get_pooled_connection()
+        cursor = connection.cursor()
+        
+        try:
+            for start in range(0, len(operations), batch_size):
+                chunk = operations[start:start + batch_size]
+                
+                reserved = []
+                screened = []
+                committed = False
+                try:
+                    connection.start_transaction()
+                    results, claimed = self._apply_batch(cursor, chunk, datetime.now(), reserved, screened, screen)
+                    connection.commit()
+                    committed = True
+                    for idempotency_key, (request, result) in claimed.items():
+                        recent_keys.put(idempotency_key, request, result)
+                
+                except Error as e:
+                    logger.error(f"Transaction batch failed: {e}")
+                    results = [{"success": False, "message": f"Batch failed: {str(e)}", "key": op.get('key'),
+                                "batch_failed": True} for op in chunk]
+                
+                finally:
+                    # Any failure, including one that is not a database error and is
+                    # re-raised, undoes the chunk and hands back its limits and verdicts
+                    if not committed:
+                        self._abandon_batch(connection, reserved, screened)
+                
+                posted = sum(1 for r in results if r['success'])
+                summary['posted'] += posted
+                summary['failed'] += len(results) - posted
+                summary['results'].extend(results)
+            
+            cursor.close()
+        
+        finally:
+            # Returns the connection to the pool
+            connection.close()
+        
+        logger.info(f"Transaction batch complete - Posted: {summary['posted']}, Failed: {summary['failed']}")
+        return summary
+    
     def get_all_transactions(self, limit=1000):
         """Get all transactions with account and customer information"""
         try:
@@ -462,7 +880,7 @@ class Transaction:
                 FROM transactions t
                 JOIN accounts a ON t.account_id = a.account_id
                 JOIN customers c ON a.customer_id = c.customer_id
-                WHERE DATE(t.transaction_date) BETWEEN %s AND %s
+                WHERE t.transaction_date >= %s AND t.transaction_date < DATE_ADD(%s, INTERVAL 1 DAY)
             """
             
             params = [start_date, end_date]
@@ -483,10 +901,71 @@ class Transaction:
             logger.error(f"Error fetching transactions by date range: {e}")
             return []
     
+    def get_export_query(self, start_date=None, end_date=None, account_id=None, search_term=None):
+        """
+        Build the audit export query for QueryExporter
+        Args:
+            start_date (date): First day to include (default: all history)
+            end_date (date): Last day to include
+            account_id (int): Limit to one account
+            search_term (str): Same matching as search_transactions()
+        Returns:
+            tuple: (query, params)
+        """
+        query = """
+            SELECT
+                t.transaction_number,
+                t.transaction_date,
+                a.account_number,
+                CONCAT(c.first_name, ' ', c.last_name) as customer_name,
+                t.transaction_type,
+                t.amount,
+                t.balance_before,
+                t.balance_after,
+                t.status,
+                t.description
+            FROM transactions t
+            JOIN accounts a ON t.account_id = a.account_id
+            JOIN customers c ON a.customer_id = c.customer_id
+            WHERE 1 = 1
+        """
+        params = []
+        
+        if start_date:
+            query += " AND t.transaction_date >= %s"
+            params.append(start_date)
+        if end_date:
+            query += " AND t.transaction_date < DATE_ADD(%s, INTERVAL 1 DAY)"
+            params.append(end_date)
+        if account_id:
+            query += " AND t.account_id = %s"
+            params.append(account_id)
+        if search_term:
+            search_pattern = f"%{search_term}%"
+            query += """ AND (
+                a.account_number LIKE %s OR
+                CONCAT(c.first_name, ' ', c.last_name) LIKE %s OR
+                t.transaction_type LIKE %s OR
+                t.description LIKE %s OR
+                t.transaction_number LIKE %s
+            )"""
+            params.extend([search_pattern] * 5)
+        
+        query += " ORDER BY t.transaction_date, t.transaction_id"
+        return query, tuple(params)
+    
     def get_transaction_summary(self, account_id=None, days=30):
         """Get transaction summary for the last N days"""
         try:
             connection = self.get_connection()
+            
+            # Bank-wide summaries come from the daily rollup instead of raw transactions
+            if not account_id:
+                rollup = TransactionRollup(connection)
+                rollup.refresh()
+                today = date.today()
+                return rollup.get_summary(today - timedelta(days=days), today)
+            
             cursor = connection.cursor(dictionary=True)
             
             base_query = """
@@ -495,7 +974,7 @@ class Transaction:
                     COUNT(*) as count,
                     SUM(amount) as total_amount
                 FROM transactions t
-                WHERE DATE(t.transaction_date) >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+                WHERE t.transaction_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
             """
             
             params = [days]
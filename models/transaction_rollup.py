@@ -0,0 +1,224 @@
+"""
+Transaction Rollup Model for Bank Management System
+Maintains daily transaction statistics incrementally from a transaction_id high-water mark
+
+Usage:
+    python -m models.transaction_rollup
+"""
+
+import mysql.connector
+from mysql.connector import Error
+from config import DB_CONFIG
+import logging
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = 'daily_transaction_stats'
+
+
+class TransactionRollup:
+    """Materialized daily rollup of transactions by date, account type, branch and type"""
+    
+    def __init__(self, connection=None, settle_seconds=5):
+        self.connection = connection
+        # Rows younger than this are left for the next refresh; open transactions
+        # hold the watermark back further (see _cutoff)
+        self.settle_seconds = settle_seconds
+    
+    def get_connection(self):
+        """Get database connection"""
+        try:
+            if self.connection is None or not self.connection.is_connected():
+                self.connection = mysql.connector.connect(**DB_CONFIG)
+            return self.connection
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+    
+    def _cutoff(self, cursor):
+        """
+        Latest created_date the refresh may fold in
+        A transaction that is still open may hold transaction_ids it has not committed,
+        and every ID it took was assigned after it started. Rows created before the
+        oldest open writing transaction started are therefore all committed, however
+        long that transaction runs
+        Returns:
+            datetime: Fold rows created strictly before this time
+        """
+        cursor.execute("SELECT NOW() - INTERVAL %s SECOND", (self.settle_seconds,))
+        cutoff = cursor.fetchone()[0]
+        
+        try:
+            cursor.execute("""
+                SELECT MIN(trx_started) FROM information_schema.innodb_trx
+                WHERE trx_mysql_thread_id <> CONNECTION_ID()
+                  AND trx_rows_modified > 0
+            """)
+            oldest_open = cursor.fetchone()[0]
+        except Error as e:
+            # Needs the PROCESS privilege; without it only the settle delay applies
+            logger.warning(f"Cannot read open transactions, using settle delay only: {e}")
+            return cutoff
+        
+        if oldest_open is not None and oldest_open < cutoff:
+            logger.info(f"Transaction rollup held back by a transaction open since {oldest_open}")
+            return oldest_open
+        return cutoff
+    
+    def refresh(self):
+        """
+        Fold transactions committed since the last refresh into daily_transaction_stats
+        Returns:
+            int: New high-water transaction_id
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        try:
+            cursor.execute(
+                "INSERT IGNORE INTO rollup_watermarks (rollup_name, last_transaction_id) VALUES (%s, 0)",
+                (ROLLUP_NAME,)
+            )
+            
+            connection.start_transaction()
+            
+            # Lock the watermark so concurrent refreshes serialize instead of double counting
+            cursor.execute(
+                "SELECT last_transaction_id FROM rollup_watermarks WHERE rollup_name = %s FOR UPDATE",
+                (ROLLUP_NAME,)
+            )
+            high_water = cursor.fetchone()[0]
+            
+            cursor.execute("""
+                SELECT MAX(transaction_id) FROM transactions
+                WHERE transaction_id > %s
+                  AND created_date < %s
+            """, (high_water, self._cutoff(cursor)))
+            upper = cursor.fetchone()[0]
+            
+            if upper is None:
+                connection.rollback()
+                cursor.close()
+                return high_water
+            
+            cursor.execute("""
+                INSERT INTO daily_transaction_stats (
+                    stat_date, account_type, branch_id, transaction_type,
+                    transaction_count, total_amount
+                )
+                SELECT
+                    DATE(t.transaction_date), a.account_type, c.branch_id, t.transaction_type,
+                    COUNT(*), SUM(t.amount)
+                FROM transactions t
+                JOIN accounts a ON t.account_id = a.account_id
+                JOIN customers c ON a.customer_id = c.customer_id
+                WHERE t.transaction_id > %s AND t.transaction_id <= %s
+                  AND t.status = 'COMPLETED'
+                GROUP BY DATE(t.transaction_date), a.account_type, c.branch_id, t.transaction_type
+                ON DUPLICATE KEY UPDATE
+                    transaction_count = transaction_count + VALUES(transaction_count),
+                    total_amount = total_amount + VALUES(total_amount)
+            """, (high_water, upper))
+            
+            cursor.execute(
+                "UPDATE rollup_watermarks SET last_transaction_id = %s WHERE rollup_name = %s",
+                (upper, ROLLUP_NAME)
+            )
+            
+            connection.commit()
+            cursor.close()
+            
+            logger.info(f"Transaction rollup advanced from {high_water} to {upper}")
+            return upper
+        
+        except Error as e:
+            connection.rollback()
+            logger.error(f"Error refreshing transaction rollup: {e}")
+            raise
+    
+    def get_summary(self, start_date, end_date, account_type=None, branch_id=None):
+        """
+        Get transaction count and total amount by transaction type for a date range
+        Args:
+            start_date (date): First day (inclusive)
+            end_date (date): Last day (inclusive)
+            account_type (str): Optional account type filter
+            branch_id (int): Optional branch filter
+        Returns:
+            list: Rows with transaction_type, count and total_amount
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor(dictionary=True)
+        
+        query = """
+            SELECT
+                transaction_type,
+                SUM(transaction_count) as count,
+                SUM(total_amount) as total_amount
+            FROM daily_transaction_stats
+            WHERE stat_date BETWEEN %s AND %s
+        """
+        params = [start_date, end_date]
+        
+        if account_type:
+            query += " AND account_type = %s"
+            params.append(account_type)
+        
+        if branch_id:
+            query += " AND branch_id = %s"
+            params.append(branch_id)
+        
+        query += " GROUP BY transaction_type"
+        
+        cursor.execute(query, params)
+        summary = cursor.fetchall()
+        cursor.close()
+        
+        return summary
+    
+    def get_period_stats(self, start_date, end_date, period='month'):
+        """
+        Get transaction statistics per period and transaction type
+        Args:
+            start_date (date): First day (inclusive)
+            end_date (date): Last day (inclusive)
+            period (str): 'day', 'month' or 'year'
+        Returns:
+            list: Rows with period, transaction_type, count and total_amount
+        """
+        period_formats = {'day': '%Y-%m-%d', 'month': '%Y-%m', 'year': '%Y'}
+        if period not in period_formats:
+            raise ValueError(f"Unsupported period: {period}")
+        
+        connection = self.get_connection()
+        cursor = connection.cursor(dictionary=True)
+        
+        cursor.execute("""
+            SELECT
+                DATE_FORMAT(stat_date, %s) as period,
+                transaction_type,
+                SUM(transaction_count) as count,
+                SUM(total_amount) as total_amount
+            FROM daily_transaction_stats
+            WHERE stat_date BETWEEN %s AND %s
+            GROUP BY period, transaction_type
+            ORDER BY period, transaction_type
+        """, (period_formats[period], start_date, end_date))
+        stats = cursor.fetchall()
+        cursor.close()
+        
+        return stats
+
+
+def main():
+    """Command line entry point for a scheduled rollup refresh"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    rollup = TransactionRollup()
+    high_water = rollup.refresh()
+    logger.info(f"Rollup is current through transaction_id {high_water}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -15,6 +15,8 @@ import mysql.connector
 from mysql.connector import Error
 import logging
 from pathlib import Path
+from database_init import DatabaseInitializer, TABLE_ORDER
+from migrations.engine import MigrationEngine, MigrationError
 
 # Configure logging
 logging.basicConfig(
@@ -112,181 +114,9 @@ def drop_all_tables():
         return False
 
 def create_tables():
-    """Create all required tables"""
+    """Create all required tables from the application schema"""
     
-    tables_sql = {
-        'branches': """
-            CREATE TABLE branches (
-                branch_id INT AUTO_INCREMENT PRIMARY KEY,
-                branch_code VARCHAR(10) UNIQUE NOT NULL,
-                branch_name VARCHAR(100) NOT NULL,
-                address VARCHAR(200) NOT NULL,
-                city VARCHAR(50) NOT NULL,
-                state VARCHAR(50) NOT NULL,
-                pincode VARCHAR(10) NOT NULL,
-                phone VARCHAR(15) NOT NULL,
-                email VARCHAR(100),
-                manager_name VARCHAR(100),
-                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status ENUM('ACTIVE', 'INACTIVE') DEFAULT 'ACTIVE',
-                INDEX idx_branch_code (branch_code),
-                INDEX idx_branch_city (city)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """,
-        
-        'customers': """
-            CREATE TABLE customers (
-                customer_id INT AUTO_INCREMENT PRIMARY KEY,
-                customer_number VARCHAR(20) UNIQUE NOT NULL,
-                first_name VARCHAR(50) NOT NULL,
-                last_name VARCHAR(50) NOT NULL,
-                date_of_birth DATE NOT NULL,
-                gender ENUM('MALE', 'FEMALE', 'OTHER') NOT NULL,
-                phone VARCHAR(15) UNIQUE NOT NULL,
-                email VARCHAR(100) UNIQUE,
-                address VARCHAR(200) NOT NULL,
-                city VARCHAR(50) NOT NULL,
-                state VARCHAR(50) NOT NULL,
-                pincode VARCHAR(10) NOT NULL,
-                pan_number VARCHAR(10) UNIQUE,
-                aadhar_number VARCHAR(12) UNIQUE,
-                annual_income DECIMAL(15,2),
-                occupation VARCHAR(100),
-                branch_id INT NOT NULL,
-                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                status ENUM('ACTIVE', 'INACTIVE', 'SUSPENDED') DEFAULT 'ACTIVE',
-                FOREIGN KEY (branch_id) REFERENCES branches(branch_id) ON DELETE RESTRICT ON UPDATE CASCADE,
-                INDEX idx_customer_number (customer_number),
-                INDEX idx_customer_phone (phone),
-                INDEX idx_customer_email (email),
-                INDEX idx_customer_pan (pan_number),
-                INDEX idx_customer_branch (branch_id)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """,
-        
-        'accounts': """
-            CREATE TABLE accounts (
-                account_id INT AUTO_INCREMENT PRIMARY KEY,
-                account_number VARCHAR(20) UNIQUE NOT NULL,
-                customer_id INT NOT NULL,
-                account_type ENUM('SAVINGS', 'CURRENT', 'FD', 'RD') NOT NULL,
-                balance DECIMAL(15,2) NOT NULL DEFAULT 0.00,
-                opening_date DATE NOT NULL DEFAULT (CURDATE()),
-                closing_date DATE NULL,
-                interest_rate DECIMAL(5,2) NOT NULL DEFAULT 0.00,
-                minimum_balance DECIMAL(15,2) NOT NULL DEFAULT 0.00,
-                last_transaction_date TIMESTAMP NULL,
-                status ENUM('ACTIVE', 'INACTIVE', 'CLOSED', 'FROZEN') DEFAULT 'ACTIVE',
-                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                FOREIGN KEY (customer_id) REFERENCES customers(customer_id) ON DELETE RESTRICT ON UPDATE CASCADE,
-                INDEX idx_account_number (account_number),
-                INDEX idx_account_customer (customer_id),
-                INDEX idx_account_type (account_type),
-                INDEX idx_account_status (status)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """,
-        
-        'transactions': """
-            CREATE TABLE transactions (
-                transaction_id INT AUTO_INCREMENT PRIMARY KEY,
-                transaction_number VARCHAR(20) UNIQUE NOT NULL,
-                account_id INT NOT NULL,
-                transaction_type ENUM('DEPOSIT', 'WITHDRAWAL', 'TRANSFER_IN', 'TRANSFER_OUT', 'INTEREST_CREDIT', 'FEE_DEBIT') NOT NULL,
-                amount DECIMAL(15,2) NOT NULL,
-                balance_before DECIMAL(15,2) NOT NULL,
-                balance_after DECIMAL(15,2) NOT NULL,
-                transaction_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                description TEXT,
-                reference_account_id INT NULL,
-                processed_by INT NULL,
-                status ENUM('PENDING', 'COMPLETED', 'FAILED', 'CANCELLED') DEFAULT 'COMPLETED',
-                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (account_id) REFERENCES accounts(account_id) ON DELETE RESTRICT ON UPDATE CASCADE,
-                FOREIGN KEY (reference_account_id) REFERENCES accounts(account_id) ON DELETE RESTRICT ON UPDATE CASCADE,
-                INDEX idx_transaction_number (transaction_number),
-                INDEX idx_transaction_account (account_id),
-                INDEX idx_transaction_date (transaction_date),
-                INDEX idx_transaction_type (transaction_type),
-                INDEX idx_transaction_status (status)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """,
-        
-        'loans': """
-            CREATE TABLE loans (
-                loan_id INT AUTO_INCREMENT PRIMARY KEY,
-                loan_number VARCHAR(20) UNIQUE NOT NULL,
-                customer_id INT NOT NULL,
-                loan_type ENUM('PERSONAL', 'HOME', 'CAR', 'EDUCATION', 'BUSINESS') NOT NULL,
-                principal_amount DECIMAL(15,2) NOT NULL,
-                interest_rate DECIMAL(5,2) NOT NULL,
-                tenure_months INT NOT NULL,
-                emi_amount DECIMAL(15,2) NOT NULL,
-                outstanding_amount DECIMAL(15,2) NOT NULL,
-                disbursement_date DATE NULL,
-                first_emi_date DATE NULL,
-                last_payment_date DATE NULL,
-                application_date DATE NOT NULL DEFAULT (CURDATE()),
-                approval_date DATE NULL,
-                approved_by INT NULL,
-                purpose TEXT,
-                collateral_details TEXT,
-                status ENUM('APPLIED', 'APPROVED', 'DISBURSED', 'CLOSED', 'DEFAULTED') DEFAULT 'APPLIED',
-                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                FOREIGN KEY (customer_id) REFERENCES customers(customer_id) ON DELETE RESTRICT ON UPDATE CASCADE,
-                INDEX idx_loan_number (loan_number),
-                INDEX idx_loan_customer (customer_id),
-                INDEX idx_loan_type (loan_type),
-                INDEX idx_loan_status (status)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """,
-        
-        'loan_payments': """
-            CREATE TABLE loan_payments (
-                payment_id INT AUTO_INCREMENT PRIMARY KEY,
-                loan_id INT NOT NULL,
-                payment_number INT NOT NULL,
-                payment_date DATE NOT NULL,
-                principal_amount DECIMAL(15,2) NOT NULL,
-                interest_amount DECIMAL(15,2) NOT NULL,
-                total_amount DECIMAL(15,2) NOT NULL,
-                outstanding_balance DECIMAL(15,2) NOT NULL,
-                payment_mode ENUM('CASH', 'CHEQUE', 'ONLINE', 'AUTO_DEBIT') DEFAULT 'CASH',
-                reference_number VARCHAR(50),
-                status ENUM('PAID', 'PENDING', 'OVERDUE', 'CANCELLED') DEFAULT 'PAID',
-                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (loan_id) REFERENCES loans(loan_id) ON DELETE RESTRICT ON UPDATE CASCADE,
-                INDEX idx_payment_loan (loan_id),
-                INDEX idx_payment_date (payment_date),
-                INDEX idx_payment_status (status),
-                UNIQUE KEY unique_loan_payment (loan_id, payment_number)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """,
-        
-        'staff': """
-            CREATE TABLE staff (
-                staff_id INT AUTO_INCREMENT PRIMARY KEY,
-                employee_id VARCHAR(20) UNIQUE NOT NULL,
-                first_name VARCHAR(50) NOT NULL,
-                last_name VARCHAR(50) NOT NULL,
-                position VARCHAR(100) NOT NULL,
-                branch_id INT NOT NULL,
-                phone VARCHAR(15) UNIQUE NOT NULL,
-                email VARCHAR(100) UNIQUE,
-                hire_date DATE NOT NULL,
-                salary DECIMAL(10,2),
-                status ENUM('ACTIVE', 'INACTIVE', 'TERMINATED') DEFAULT 'ACTIVE',
-                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                FOREIGN KEY (branch_id) REFERENCES branches(branch_id) ON DELETE RESTRICT ON UPDATE CASCADE,
-                INDEX idx_employee_id (employee_id),
-                INDEX idx_staff_branch (branch_id),
-                INDEX idx_staff_position (position)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """
-    }
+    tables_sql = DatabaseInitializer().get_required_tables()
     
     try:
         config_with_db = DB_CONFIG.copy()
@@ -296,21 +126,25 @@ def create_tables():
         cursor = connection.cursor()
         
         # Create tables in order (respecting foreign key dependencies)
-        table_order = ['branches', 'customers', 'accounts', 'transactions', 'loans', 'loan_payments', 'staff']
-        
-        for table_name in table_order:
+        for table_name in TABLE_ORDER:
             logger.info(f"Creating table: {table_name}")
             cursor.execute(tables_sql[table_name])
             logger.info(f"✅ Table '{table_name}' created successfully")
         
         connection.commit()
         cursor.close()
+        
+        # The tables match the current schema, so record the migrations they include
+        engine = MigrationEngine(connection)
+        engine.baseline()
+        engine.migrate()
+        
         connection.close()
         
         logger.info("✅ All tables created successfully")
         return True
         
-    except Error as e:
+    except (Error, MigrationError) as e:
         logger.error(f"❌ Error creating tables: {e}")
         return False
 
@@ -404,6 +238,7 @@ def main():
     logger.info("🎉 Database setup completed successfully!")
     logger.info("=" * 50)
     logger.info("You can now run the main application: python main.py")
+    logger.info("Schedule monthly partition maintenance: python -m models.partition_manager")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Startup Time Benchmark for Bank Management System
+Measures what importing each entry point costs, using python -X importtime
+
+Each entry point is imported in a fresh interpreter several times. The median
+total is reported together with the slowest modules and any heavy dependency
+that was loaded eagerly (none should be: they belong to the windows and
+engines that need them).
+
+Usage:
+    python startup_benchmark.py
+    python startup_benchmark.py --runs 10 --top 15 gui.main_window
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = ('main', 'gui.main_window', 'bank_cli')
+
+# Packages that should only load when a feature that needs them is used
+HEAVY_MODULES = ('mysql.connector', 'pandas', 'numpy', 'reportlab', 'openpyxl')
+
+
+def measure_import(module):
+    """
+    Import a module in a fresh interpreter with -X importtime
+    Returns:
+        dict: total_us (cumulative time of top-level imports) and modules
+            (name -> (self_us, cumulative_us))
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    
+    modules = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+        # Nesting is shown by indentation; only top-level imports add to the total
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative_us)
+    
+    return {'total_us': total_us, 'modules': modules}
+
+
+def benchmark(module, runs, top):
+    """Print the median import time of a module, its slowest imports and heavy dependencies"""
+    samples = [measure_import(module) for _ in range(runs)]
+    totals = [s['total_us'] for s in samples]
+    last = samples[-1]['modules']
+    
+    print(f"import {module}")
+    print(f"  Median:  {statistics.median(totals) / 1000:8.1f} ms  "
+          f"(min {min(totals) / 1000:.1f}, max {max(totals) / 1000:.1f}, {runs} runs)")
+    print(f"  Modules: {len(last)}")
+    
+    print("  Slowest (self time):")
+    for name, (self_us, cumulative_us) in sorted(last.items(), key=lambda m: m[1][0], reverse=True)[:top]:
+        print(f"    {self_us / 1000:8.1f} ms  {name}")
+    
+    heavy = [name for name in HEAVY_MODULES if name in last]
+    print(f"  Heavy dependencies loaded: {', '.join(heavy) if heavy else 'none'}")
+    print()
+    return heavy
+
+
+def main():
+    """Command line entry point for the startup benchmark"""
+    parser = argparse.ArgumentParser(description='Measure application import time with python -X importtime')
+    parser.add_argument('modules', nargs='*', default=list(ENTRY_POINTS), help='Modules to import')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per module')
+    parser.add_argument('--top', type=int, default=10, help='Slowest modules to list')
+    args = parser.parse_args()
+    
+    eager = False
+    for module in args.modules:
+        try:
+            eager = bool(benchmark(module, args.runs, args.top)) or eager
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            return 2
+    
+    return 1 if eager else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -106,6 +106,8 @@ LOAN_INTEREST_RATES = {
 DAILY_WITHDRAWAL_LIMIT = 50000.0
 DAILY_TRANSFER_LIMIT = 100000.0
 ATM_WITHDRAWAL_LIMIT = 25000.0
+# Largest amount a DECIMAL(15,2) column holds
+MAX_TRANSACTION_AMOUNT = 9999999999999.99
 
 # Account opening requirements
 MIN_AGE_FOR_ACCOUNT = 18
@@ -124,6 +126,8 @@ MAX_LOAN_AMOUNT = {
     LoanType.EDUCATION: 1500000.0,   # 15 Lakh
     LoanType.BUSINESS: 5000000.0     # 50 Lakh
 }
+MIN_LOAN_TENURE_MONTHS = 1
+MAX_LOAN_TENURE_MONTHS = 360       # 30 years
 
 # Service charges
 SERVICE_CHARGES = {
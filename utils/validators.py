@@ -5,6 +5,7 @@ Validation utilities for Bank Management System
 import re
 from datetime import datetime, date
 from typing import List, Any, Optional
+from utils.constants import MIN_LOAN_TENURE_MONTHS, MAX_LOAN_TENURE_MONTHS
 
 class ValidationError(Exception):
     """Custom validation error"""
@@ -285,8 +286,9 @@ def validate_loan_data(loan_data: dict) -> List[str]:
     if loan_data.get('tenure_months'):
         try:
             tenure = int(loan_data['tenure_months'])
-            if tenure < 1 or tenure > 360:  # 30 years max
-                errors.append("Tenure must be between 1 and 360 months")
+            if tenure < MIN_LOAN_TENURE_MONTHS or tenure > MAX_LOAN_TENURE_MONTHS:
+                errors.append(f"Tenure must be between {MIN_LOAN_TENURE_MONTHS} and "
+                              f"{MAX_LOAN_TENURE_MONTHS} months")
         except (ValueError, TypeError):
             errors.append("Tenure must be a valid number")
     
@@ -8,6 +8,8 @@ import mysql.connector
 from mysql.connector import Error
 import logging
 from config import DB_CONFIG
+from database_init import TABLE_ORDER
+from migrations.engine import MigrationEngine
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -23,7 +25,7 @@ def verify_database():
         logger.info("🔍 Verifying database setup...")
         
         # Check if all required tables exist
-        required_tables = ['branches', 'customers', 'accounts', 'transactions', 'loans', 'loan_payments', 'staff']
+        required_tables = TABLE_ORDER
         
         cursor.execute("SHOW TABLES")
         existing_tables = [table[0] for table in cursor.fetchall()]
@@ -53,6 +55,14 @@ def verify_database():
         customer_branch_count = cursor.fetchone()[0]
         logger.info(f"🔗 Customer-Branch relationships: {customer_branch_count}")
         
+        # Check for pending or edited schema migrations
+        outstanding = [f"{m['version']:04d} ({m['state']})" for m in MigrationEngine(connection).status()
+                       if m['state'] in ('pending', 'modified')]
+        if outstanding:
+            logger.warning(f"⚠️ Schema migrations not applied: {outstanding}")
+        else:
+            logger.info("✅ Schema migrations are up to date")
+        
         cursor.close()
         connection.close()
         